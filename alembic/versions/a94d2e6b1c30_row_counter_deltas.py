@@ -0,0 +1,111 @@
+"""row_counters: per-statement delta rows instead of one hot row
+
+Revision ID: a94d2e6b1c30
+Revises: f3b8c1d4e6a7
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a94d2e6b1c30'
+down_revision: Union[str, Sequence[str], None] = 'f3b8c1d4e6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOLD_DELTAS = """
+    WITH moved AS (DELETE FROM row_counter_deltas RETURNING table_name, delta),
+         sums AS (SELECT table_name, sum(delta) AS delta FROM moved GROUP BY table_name)
+    UPDATE row_counters c SET row_count = c.row_count + sums.delta
+    FROM sums WHERE c.table_name = sums.table_name
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('row_counter_deltas',
+    sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('delta', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Триггеры только добавляют строку: UPDATE общей строки row_counters держал
+    # её блокировку до конца транзакции и выстраивал все вставки в очередь.
+    # Дельты сворачивает в row_counters фоновая задача (admin_stats).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_insert() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM new_rows;
+            IF n > 0 THEN
+                INSERT INTO row_counter_deltas (table_name, delta) VALUES (TG_TABLE_NAME, n);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_delete() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM old_rows;
+            IF n > 0 THEN
+                INSERT INTO row_counter_deltas (table_name, delta) VALUES (TG_TABLE_NAME, -n);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # TRUNCATE редкий (ручная чистка), здесь блокировка не мешает
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_truncate() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM row_counter_deltas WHERE table_name = TG_TABLE_NAME;
+            UPDATE row_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(FOLD_DELTAS)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_insert() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM new_rows;
+            IF n > 0 THEN
+                UPDATE row_counters SET row_count = row_count + n WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_delete() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM old_rows;
+            IF n > 0 THEN
+                UPDATE row_counters SET row_count = row_count - n WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION row_counters_truncate() RETURNS trigger AS $$
+        BEGIN
+            UPDATE row_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.drop_table('row_counter_deltas')
@@ -0,0 +1,47 @@
+"""create track_index table
+
+Revision ID: c41d7e2a9b10
+Revises: b8669ea8a40b
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2a9b10'
+down_revision: Union[str, Sequence[str], None] = 'b8669ea8a40b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'track_index' not in tables:
+        op.create_table('track_index',
+        sa.Column('track_key', sa.String(), nullable=False),
+        sa.Column('isrc', sa.String(length=32), nullable=False),
+        sa.Column('platform', sa.String(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('track_key')
+        )
+        op.create_index(op.f('ix_track_index_isrc'), 'track_index', ['isrc'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'track_index' in tables:
+        op.drop_index(op.f('ix_track_index_isrc'), table_name='track_index')
+        op.drop_table('track_index')
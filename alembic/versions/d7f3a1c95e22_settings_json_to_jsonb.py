@@ -0,0 +1,37 @@
+"""settings_json to jsonb
+
+Revision ID: d7f3a1c95e22
+Revises: c41d7e2a9b10
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a1c95e22'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e2a9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('users', 'chats'):
+        op.alter_column(table, 'settings_json',
+                   existing_type=sa.JSON(),
+                   type_=postgresql.JSONB(astext_type=sa.Text()),
+                   postgresql_using='settings_json::jsonb')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('users', 'chats'):
+        op.alter_column(table, 'settings_json',
+                   existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                   type_=sa.JSON(),
+                   postgresql_using='settings_json::json')
@@ -0,0 +1,94 @@
+"""create row_counters with count triggers
+
+Revision ID: e5a92c3f7b14
+Revises: d7f3a1c95e22
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a92c3f7b14'
+down_revision: Union[str, Sequence[str], None] = 'd7f3a1c95e22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTED_TABLES = ('users', 'chats', 'mediacache')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('row_counters',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('row_count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+    # Statement-level триггеры: одно обновление счётчика на INSERT/DELETE,
+    # а не на каждую строку. Пустые ON CONFLICT DO NOTHING строку не трогают.
+    op.execute("""
+        CREATE FUNCTION row_counters_insert() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM new_rows;
+            IF n > 0 THEN
+                UPDATE row_counters SET row_count = row_count + n WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION row_counters_delete() RETURNS trigger AS $$
+        DECLARE n bigint;
+        BEGIN
+            SELECT count(*) INTO n FROM old_rows;
+            IF n > 0 THEN
+                UPDATE row_counters SET row_count = row_count - n WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION row_counters_truncate() RETURNS trigger AS $$
+        BEGIN
+            UPDATE row_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table in COUNTED_TABLES:
+        op.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        op.execute(f"INSERT INTO row_counters (table_name, row_count) SELECT '{table}', count(*) FROM {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_count_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION row_counters_insert()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_count_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION row_counters_delete()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_count_truncate AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION row_counters_truncate()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COUNTED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_count_insert ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_count_delete ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_count_truncate ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS row_counters_insert()")
+    op.execute("DROP FUNCTION IF EXISTS row_counters_delete()")
+    op.execute("DROP FUNCTION IF EXISTS row_counters_truncate()")
+    op.drop_table('row_counters')
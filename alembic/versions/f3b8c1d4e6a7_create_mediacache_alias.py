@@ -0,0 +1,46 @@
+"""create mediacache_alias table
+
+Revision ID: f3b8c1d4e6a7
+Revises: e5a92c3f7b14
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8c1d4e6a7'
+down_revision: Union[str, Sequence[str], None] = 'e5a92c3f7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'mediacache_alias' not in tables:
+        op.create_table('mediacache_alias',
+        sa.Column('alias_key', sa.String(), nullable=False),
+        sa.Column('cache_key', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['cache_key'], ['mediacache.cache_key'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('alias_key')
+        )
+        op.create_index(op.f('ix_mediacache_alias_cache_key'), 'mediacache_alias', ['cache_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'mediacache_alias' in tables:
+        op.drop_index(op.f('ix_mediacache_alias_cache_key'), table_name='mediacache_alias')
+        op.drop_table('mediacache_alias')
@@ -0,0 +1,115 @@
+"""AIMD vs fixed concurrency against a fake backend.
+
+The fake backend serves ``capacity`` requests at a time and answers 503
+above that. Its capacity drops and recovers during the run, like
+media-core losing and regaining proxies. Both modes push the same load
+through AdaptiveLimitTransport; the fixed mode just pins min=max.
+
+Usage:
+    python -m benchmarks.aimd_simulation --users 40 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from tasks.adaptive_limiter import AdaptiveLimitTransport, BackendLimits
+
+URL = "http://media-core:9546/download/instagram"
+
+
+class FakeBackend:
+    def __init__(self, schedule: list[tuple[float, int]], service_ms: float):
+        self._schedule = schedule
+        self._service = service_ms / 1000
+        self._started = time.monotonic()
+        self.active = 0
+
+    def capacity(self) -> int:
+        elapsed = time.monotonic() - self._started
+        current = self._schedule[0][1]
+        for since, capacity in self._schedule:
+            if elapsed >= since:
+                current = capacity
+        return current
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.active >= self.capacity():
+            await asyncio.sleep(0.005)
+            return httpx.Response(503, json={"error": "busy"})
+
+        self.active += 1
+        try:
+            # Чем ближе к пределу, тем медленнее (общий CPU/канал)
+            load = self.active / max(1, self.capacity())
+            await asyncio.sleep(self._service * (1 + load) * random.uniform(0.8, 1.2))
+            return httpx.Response(200, json={"ok": True})
+        finally:
+            self.active -= 1
+
+
+async def _run_mode(name: str, limits: BackendLimits, args: argparse.Namespace) -> None:
+    schedule = [(0, args.capacity), (args.duration / 3, args.capacity // 4), (2 * args.duration / 3, args.capacity * 3 // 4)]
+    backend = FakeBackend(schedule, args.service_ms)
+    transport = AdaptiveLimitTransport(limits, httpx.MockTransport(backend.handle))
+
+    ok_latencies: list[float] = []
+    rejected = 0
+    limit_samples: list[tuple[float, float]] = []
+    deadline = time.monotonic() + args.duration
+
+    async with httpx.AsyncClient(transport=transport) as client:
+
+        async def user() -> None:
+            nonlocal rejected
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                response = await client.post(URL, json={})
+                if response.status_code == 200:
+                    ok_latencies.append(time.monotonic() - started)
+                else:
+                    rejected += 1
+                    await asyncio.sleep(0.05)  # клиент повторяет, как пользователь
+
+        async def sampler() -> None:
+            started = time.monotonic()
+            while time.monotonic() < deadline:
+                key = BackendLimits.key_for(URL)
+                limit_samples.append((time.monotonic() - started, limits.get(key).limit))
+                await asyncio.sleep(args.duration / 12)
+
+        await asyncio.gather(sampler(), *(user() for _ in range(args.users)))
+
+    ok_latencies.sort()
+    total = len(ok_latencies) + rejected
+    p = lambda q: ok_latencies[min(len(ok_latencies) - 1, int(len(ok_latencies) * q))] * 1000 if ok_latencies else 0
+    print(f"[{name}]")
+    print(f"  ok: {len(ok_latencies)} ({len(ok_latencies) / args.duration:.1f}/s), "
+          f"503: {rejected} ({rejected / total * 100 if total else 0:.1f}%)")
+    print(f"  latency ms: p50={p(0.5):.0f} p95={p(0.95):.0f} "
+          f"mean={statistics.mean(ok_latencies) * 1000 if ok_latencies else 0:.0f}")
+    print("  limit over time: " + " ".join(f"{t:.0f}s={limit:.1f}" for t, limit in limit_samples))
+
+
+async def _main(args: argparse.Namespace) -> None:
+    print(f"capacity schedule: {args.capacity} -> {args.capacity // 4} -> {args.capacity * 3 // 4}, "
+          f"{args.users} users, {args.duration}s per mode\n")
+    await _run_mode("fixed", BackendLimits(initial=args.fixed, min_limit=args.fixed, max_limit=args.fixed), args)
+    await _run_mode("aimd", BackendLimits(), args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--fixed", type=int, default=10, help="limit for the fixed mode")
+    parser.add_argument("--service-ms", type=float, default=100)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
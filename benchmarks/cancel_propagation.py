@@ -0,0 +1,150 @@
+"""Cancellation and deadline propagation to a fake core backend.
+
+The fake backend "transcodes" each /download job for ``--work`` seconds in
+a background task, like media-core keeps going after the bot gives up. It
+stops a job on POST /jobs/{id}/cancel or when the X-Deadline header passes.
+Four scenarios:
+
+    cancel    - the caller task is cancelled (/cancel) after --cancel-after s
+    deadline  - nobody cancels; the backend honours X-Deadline built from
+                the request's read timeout (--timeout s)
+    timeout   - the backend ignores X-Deadline and the read timeout fires on
+                the bot side (httpx.ReadTimeout); only the cancel request that
+                CoreJobTransport sends on timeout can stop the backend
+    baseline  - same as cancel, but through a plain transport without job headers
+
+For each scenario the script prints how long the backend kept working after
+the bot stopped waiting. With CoreJobTransport it should be ~0; the baseline
+keeps working for the full --work seconds. The script exits with status 1 if
+the cancel, deadline or timeout backend works longer than --tolerance
+seconds, if the cancel or timeout backend never received /jobs/{id}/cancel,
+or if the baseline does not keep working (then the benchmark measures nothing).
+
+Usage:
+    python -m benchmarks.cancel_propagation --work 5 --cancel-after 1 --timeout 1.5 --tolerance 0.5
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+from tasks.core_jobs import DEADLINE_HEADER, JOB_ID_HEADER, CoreJobTransport
+
+URL = "http://media-core:9546/download/youtube"
+
+
+class FakeCore:
+    def __init__(self, work: float, honour_deadline: bool = True):
+        self._work = work
+        self._honour_deadline = honour_deadline
+        self.jobs: dict[str, asyncio.Task] = {}
+        self.stopped_at: dict[str, float] = {}
+        self.reasons: dict[str, str] = {}
+        self.cancel_requests: set[str] = set()
+
+    async def _transcode(self, job_id: str, deadline: float | None) -> None:
+        reason = "finished"
+        try:
+            limit = self._work if deadline is None else min(self._work, deadline - time.time())
+            if limit < self._work:
+                reason = "deadline"
+            await asyncio.sleep(max(0.0, limit))
+        except asyncio.CancelledError:
+            reason = "cancelled"
+        finally:
+            self.stopped_at[job_id] = time.monotonic()
+            self.reasons[job_id] = reason
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/jobs/"):
+            job_id = request.url.path.split("/")[2]
+            self.cancel_requests.add(job_id)
+            job = self.jobs.get(job_id)
+            if job is None or job.done():
+                return httpx.Response(404, json={"status": "error"})
+            job.cancel()
+            return httpx.Response(200, json={"status": "success"})
+
+        job_id = request.headers.get(JOB_ID_HEADER) or f"anon-{len(self.jobs)}"
+        deadline_ms = request.headers.get(DEADLINE_HEADER)
+        deadline = int(deadline_ms) / 1000 if deadline_ms and self._honour_deadline else None
+        job = asyncio.create_task(self._transcode(job_id, deadline))
+        self.jobs[job_id] = job
+        if self._honour_deadline:
+            await asyncio.shield(job)
+        else:
+            # MockTransport не соблюдает таймауты клиента - истекаем сами, как httpcore
+            read_timeout = (request.extensions.get("timeout") or {}).get("read")
+            try:
+                await asyncio.wait_for(asyncio.shield(job), read_timeout)
+            except asyncio.TimeoutError:
+                raise httpx.ReadTimeout("Timed out waiting for the core", request=request)
+        return httpx.Response(200, json={"status": "success", "data": []})
+
+
+async def _scenario(name: str, args: argparse.Namespace) -> tuple[float, bool]:
+    """Runs one scenario. Returns the longest time the backend kept working
+    and whether every job got a cancel request"""
+    backend = FakeCore(args.work, honour_deadline=name != "timeout")
+    inner = httpx.MockTransport(backend.handle)
+    transport = inner if name == "baseline" else CoreJobTransport(inner)
+    timeout = args.timeout if name in ("deadline", "timeout") else args.work * 2
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        request = asyncio.create_task(client.post(URL, json={}, timeout=timeout))
+        if name in ("cancel", "baseline"):
+            await asyncio.sleep(args.cancel_after)
+            request.cancel()
+        try:
+            await request
+        except (asyncio.CancelledError, httpx.TimeoutException):
+            pass
+        gave_up = time.monotonic()
+
+        # Ждём, пока фейковый core закончит всё, что ещё делает
+        await asyncio.gather(*backend.jobs.values(), return_exceptions=True)
+
+    overrun = 0.0
+    for job_id, stopped in backend.stopped_at.items():
+        worked = max(0.0, stopped - gave_up)
+        overrun = max(overrun, worked)
+        cancel = ", cancel received" if job_id in backend.cancel_requests else ""
+        print(f"[{name}] job {job_id[:8]}: {backend.reasons[job_id]}{cancel}, "
+              f"backend worked {worked:.2f}s after the bot gave up")
+    return overrun, set(backend.jobs) <= backend.cancel_requests
+
+
+async def _main(args: argparse.Namespace) -> bool:
+    ok = True
+    for name in ("cancel", "deadline", "timeout", "baseline"):
+        overrun, cancel_sent = await _scenario(name, args)
+        if name == "baseline":
+            if overrun <= args.tolerance:
+                print(f"FAIL [{name}]: backend stopped within {args.tolerance}s without job headers, "
+                      f"the scenario does not reproduce the leak")
+                ok = False
+            continue
+        if overrun > args.tolerance:
+            print(f"FAIL [{name}]: backend kept working {overrun:.2f}s > {args.tolerance}s tolerance")
+            ok = False
+        if name in ("cancel", "timeout") and not cancel_sent:
+            print(f"FAIL [{name}]: backend never received /jobs/{{id}}/cancel")
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--work", type=float, default=5.0, help="backend job duration, s")
+    parser.add_argument("--cancel-after", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=1.5, help="bot read timeout for the deadline scenario")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="max backend work after the bot gave up for cancel/deadline/timeout, s")
+    if not asyncio.run(_main(parser.parse_args())):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
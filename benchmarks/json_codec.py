@@ -0,0 +1,167 @@
+"""stdlib json vs orjson on payloads the bot actually moves.
+
+    gallery   - media-core /download response for a 10-item Instagram carousel
+    settings  - Users.settings_json blob as stored in Redis (user:{id}:settings)
+    update    - Telegram message update with entities, as parsed by aiogram
+    ytmeta    - media-core /youtube/metadata with a full format list
+
+Each payload is decoded and encoded ``--runs`` times by both codecs.
+Without orjson installed only the stdlib numbers are printed.
+
+Usage:
+    python -m benchmarks.json_codec --runs 20000
+"""
+import argparse
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _gallery() -> dict:
+    items = []
+    for i in range(10):
+        items.append({
+            "type": "video" if i % 3 == 0 else "photo",
+            "path": f"/app/storage/temp/instagram/C9xYz{i}AbCdE_{i}.mp4",
+            "optimized_path": f"/app/storage/temp/instagram/C9xYz{i}AbCdE_{i}_opt.mp4",
+            "width": 1080,
+            "height": 1350,
+            "duration": 14.7 if i % 3 == 0 else None,
+            "cover": f"/app/storage/temp/instagram/C9xYz{i}AbCdE_{i}.jpg",
+        })
+    return {
+        "status": "ok",
+        "data": {
+            "author_username": "charlotte.example",
+            "caption": "Summer in Kraków ☀️ " * 12 + "#travel #poland #summer",
+            "items": items,
+        },
+    }
+
+
+def _settings() -> dict:
+    media = {"caption": False, "translate_caption": False}
+    music = {"send_covers": False, "lossless": False}
+    return {
+        "version": 1,
+        "profile": {
+            "language": "uk",
+            "title_language": "en",
+            "notifications": True,
+            "reactions": False,
+            "negativity": False,
+            "news_spam": False,
+            "bot_sign": True,
+        },
+        "services": {
+            "youtube": {**media, "simple": True, "ui_mode": "simple"},
+            "tiktok": media,
+            "instagram": media,
+            "twitter": {**media, "raw": False},
+            "pinterest": {**media, "raw": False},
+            "pixiv": {**media, "raw": False},
+            "reddit": media,
+            "spotify": music,
+            "deezer": music,
+            "applemusic": music,
+            "ytmusic": {"send_covers": False},
+            "soundcloud": {"send_covers": False},
+        },
+    }
+
+
+def _update() -> dict:
+    return {
+        "update_id": 912345678,
+        "message": {
+            "message_id": 48213,
+            "from": {
+                "id": 123456789,
+                "is_bot": False,
+                "first_name": "Олена",
+                "username": "olena_example",
+                "language_code": "uk",
+                "is_premium": True,
+            },
+            "chat": {"id": -1001234567890, "title": "Memes & Music", "type": "supergroup"},
+            "date": 1760000000,
+            "text": "https://www.instagram.com/reel/C9xYz0AbCdE/?igsh=MWd2bHg4eXk2bTZvZA==",
+            "entities": [{"offset": 0, "length": 67, "type": "url"}],
+            "link_preview_options": {"is_disabled": False},
+        },
+    }
+
+
+def _ytmeta() -> dict:
+    formats = []
+    for height in (144, 240, 360, 480, 720, 1080, 1440, 2160):
+        for codec in ("avc1", "vp9", "av01"):
+            formats.append({
+                "format_id": f"{height}{codec}",
+                "ext": "mp4" if codec == "avc1" else "webm",
+                "height": height,
+                "width": height * 16 // 9,
+                "vcodec": codec,
+                "filesize": height * 91234,
+                "url": f"https://rr3---sn-abc.googlevideo.com/videoplayback?expire=1760003600&id={height}{codec}" + "&x=y" * 40,
+            })
+    return {
+        "status": "ok",
+        "data": {
+            "id": "dQw4w9WgXcQ",
+            "title": "Rick Astley - Never Gonna Give You Up (Official Music Video)",
+            "duration": 213,
+            "thumbnail": "https://i.ytimg.com/vi/dQw4w9WgXcQ/maxresdefault.jpg",
+            "formats": formats,
+        },
+    }
+
+
+PAYLOADS = {
+    "gallery": _gallery(),
+    "settings": _settings(),
+    "update": _update(),
+    "ytmeta": _ytmeta(),
+}
+
+
+def _codecs() -> dict:
+    codecs = {
+        "json": (json.loads, lambda obj: json.dumps(obj, default=str, ensure_ascii=False)),
+    }
+    if orjson is not None:
+        codecs["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj, default=str).decode())
+    return codecs
+
+
+def _time(func, arg, runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        func(arg)
+    return (time.perf_counter() - started) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+
+    codecs = _codecs()
+    if orjson is None:
+        print("orjson is not installed, showing stdlib only (pip install .[speedups])")
+
+    print(f"{'payload':<10}{'bytes':>8}  " + "".join(f"{name + ' loads':>14}{name + ' dumps':>14}" for name in codecs))
+    for name, payload in PAYLOADS.items():
+        encoded = json.dumps(payload, ensure_ascii=False)
+        row = f"{name:<10}{len(encoded.encode()):>8}  "
+        for loads, dumps in codecs.values():
+            row += f"{_time(loads, encoded, args.runs):>12.1f}us{_time(dumps, payload, args.runs):>12.1f}us"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Multipart vs file:// uploads against a local Bot API server.
+
+Starts a stub telegram-bot-api in a separate process and sends the same
+document through aiogram in both modes:
+
+    multipart   - FSInputFile, the bot streams the whole file over HTTP
+    local_path  - "file://..." string, the server reads the file from disk
+
+Usage:
+    python -m benchmarks.local_upload --sizes 100 1024 --runs 3
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from aiohttp import web
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import FSInputFile
+
+TOKEN = "42:BENCHMARK"
+CHUNK = 1024 * 1024
+
+
+def _fake_message() -> dict:
+    return {
+        "ok": True,
+        "result": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "document": {"file_id": "stub", "file_unique_id": "stub"},
+        },
+    }
+
+
+async def _send_document(request: web.Request) -> web.Response:
+    # Сервер в обоих режимах прочитывает файл целиком, как настоящий Bot API
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        while part := await reader.next():
+            while await part.read_chunk(CHUNK):
+                pass
+    else:
+        form = await request.post()
+        path = str(form["document"]).removeprefix("file://")
+        with open(path, "rb") as f:
+            while f.read(CHUNK):
+                pass
+    return web.json_response(_fake_message())
+
+
+def _run_stub_server(port: int) -> None:
+    app = web.Application(client_max_size=0)
+    app.router.add_post(f"/bot{TOKEN}/sendDocument", _send_document)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def _make_file(directory: str, size_mb: int) -> str:
+    path = os.path.join(directory, f"bench_{size_mb}mb.bin")
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(CHUNK))
+    return path
+
+
+async def _measure(bot: Bot, document) -> tuple[float, float]:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_before = usage.ru_utime + usage.ru_stime
+    started = time.perf_counter()
+
+    await bot.send_document(chat_id=1, document=document, request_timeout=3600)
+
+    elapsed = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return elapsed, usage.ru_utime + usage.ru_stime - cpu_before
+
+
+async def _bench(port: int, sizes: list[int], runs: int, directory: str) -> None:
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}", is_local=True)
+    )
+    bot = Bot(token=TOKEN, session=session)
+
+    print(f"{'size':>8} {'mode':>11} {'wall, s':>9} {'bot cpu, s':>11} {'MB/s':>8}")
+    try:
+        for size_mb in sizes:
+            path = _make_file(directory, size_mb)
+            try:
+                modes = {
+                    "multipart": lambda: FSInputFile(path),
+                    "local_path": lambda: f"file://{path}",
+                }
+                for mode, make_input in modes.items():
+                    results = [await _measure(bot, make_input()) for _ in range(runs)]
+                    wall = statistics.median(r[0] for r in results)
+                    cpu = statistics.median(r[1] for r in results)
+                    print(
+                        f"{size_mb:>6}MB {mode:>11} {wall:>9.3f} {cpu:>11.3f} "
+                        f"{size_mb / wall:>8.0f}"
+                    )
+            finally:
+                os.remove(path)
+    finally:
+        await bot.session.close()
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak bot RSS: {rss_mb:.0f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1024], help="MB")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--dir", default=None, help="where to put test files")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=_run_stub_server, args=(args.port,), daemon=True)
+    server.start()
+    time.sleep(1)
+
+    try:
+        with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+            asyncio.run(_bench(args.port, args.sizes, args.runs, directory))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
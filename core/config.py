@@ -12,6 +12,40 @@ class Config(BaseSettings):
     TELEGRAM_SERVER_URL: str
     LOSSLESS_CORE_URL: str
 
+    # Local Bot API uploads: "multipart" streams the file over HTTP,
+    # "local_path" passes a file:// path the telegram-bot-api container can read
+    TELEGRAM_UPLOAD_MODE: str = "local_path"
+    # "<bot path>:<telegram-bot-api path>" pairs, comma separated
+    TELEGRAM_LOCAL_PATH_MAP: str = "/app/storage:/app/storage"
+
+    # "polling" or "webhook"
+    BOT_MODE: str = "polling"
+    WEBHOOK_HOST: str = ""
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: str = ""
+    WEBAPP_HOST: str = "0.0.0.0"
+    WEBAPP_PORT: int = 8000
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_WORKERS: int = 32
+
+    # "single", "supervisor" (receives updates, spawns workers) or "worker"
+    BOT_ROLE: str = "single"
+    SHARD_WORKERS: int = 4
+    SHARD_ID: int = 0
+
+    # Очередь загрузок: бесплатная загрузка не принимается, если ждать дольше
+    # DOWNLOAD_QUEUE_MAX_WAIT секунд или в очереди уже DOWNLOAD_QUEUE_SIZE задач
+    DOWNLOAD_QUEUE_MAX_WAIT: float = 600.0
+    DOWNLOAD_QUEUE_SIZE: int = 200
+
+    # Полуоткрытый предохранитель бэкенда: пробных запросов одновременно и успехов до замыкания
+    BREAKER_HALF_OPEN_PROBES: int = 3
+    BREAKER_HALF_OPEN_SUCCESSES: int = 3
+
+    # Спекулятивная загрузка YouTube, пока пользователь выбирает формат
+    YT_PREFETCH: bool = False
+    YT_PREFETCH_LIMIT: int = 2
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     @classmethod
@@ -0,0 +1,45 @@
+"""JSON codec
+
+orjson, если установлен (extra ``speedups``), иначе stdlib json.
+Используется в кеше Redis, ответах core-сервисов, очереди шардов
+и сессии aiogram. Ошибки декодирования в обоих случаях -
+``json.JSONDecodeError`` (orjson.JSONDecodeError его наследует).
+"""
+
+import json
+from typing import Any
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: str | bytes | bytearray) -> Any:
+        return orjson.loads(data)
+
+    def dumps(obj: Any, default=str) -> str:
+        try:
+            return orjson.dumps(obj, default=default, option=_OPTIONS).decode()
+        except orjson.JSONEncodeError:
+            # Целые больше 64 бит и прочая экзотика
+            return json.dumps(obj, default=default, ensure_ascii=False)
+else:
+    def loads(data: str | bytes | bytearray) -> Any:
+        return json.loads(data)
+
+    def dumps(obj: Any, default=str) -> str:
+        return json.dumps(obj, default=default, ensure_ascii=False)
+
+
+def response_json(response: httpx.Response) -> Any:
+    """response.json() через codec, без промежуточной декодировки в str"""
+    return loads(response.content)
@@ -8,6 +8,7 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 
+from core import json_codec
 from core.config import Config
 
 bot: Bot | None = None
@@ -23,11 +24,10 @@ def create_bot_and_dispatcher(config: Config) -> tuple[Bot, Dispatcher]:
     if not token:
         raise ValueError("BOT_TOKEN is not set")
 
-    session = None
+    session_kwargs = {"json_loads": json_codec.loads, "json_dumps": json_codec.dumps}
     if config.TELEGRAM_LOCAL:
-        session = AiohttpSession(
-            api=TelegramAPIServer.from_base(config.TELEGRAM_SERVER_URL, is_local=True)
-        )
+        session_kwargs["api"] = TelegramAPIServer.from_base(config.TELEGRAM_SERVER_URL, is_local=True)
+    session = AiohttpSession(**session_kwargs)
 
     bot = Bot(
         token=token,
@@ -1,20 +1,184 @@
-"""Logger Configuration"""
+"""Logger Configuration
 
+Обработчики не пишут в stdout/файл из event loop: корневой логгер кладёт
+записи в очередь (QueueHandler), а вывод делает отдельный поток
+(QueueListener). Шумные INFO-логгеры горячего пути ограничены по частоте.
+"""
+
+import atexit
+import copy
+import datetime
+import json
 import logging
-import sys
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+import time
+
+LOG_DIR = "logs"
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Лимиты для INFO/DEBUG горячего пути: логгер -> (записей в секунду, запас).
+# WARNING и выше проходят всегда.
+RATE_LIMITS = {
+    "senders.media_sender": (5.0, 20),
+    "utils.file_utils": (2.0, 10),
+    "modules.services": (10.0, 50),
+}
+
+# Поля LogRecord, которые не попадают в JSON как extra
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка, для promtail/Loki"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket на логгер (и его дочерние) для записей ниже WARNING.
+    Отброшенные записи считаются и дописываются к следующей пропущенной."""
+
+    def __init__(self, limits: dict[str, tuple[float, int]]):
+        super().__init__()
+        self._limits = limits
+        self._buckets: dict[str, list[float]] = {}  # prefix -> [tokens, last_refill]
+        self._suppressed: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _prefix(self, name: str) -> str | None:
+        while name:
+            if name in self._limits:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._prefix(record.name)
+        if prefix is None:
+            return True
+
+        rate, burst = self._limits[prefix]
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(prefix, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - last) * rate)
+            if tokens < 1.0:
+                self._buckets[prefix] = [tokens, now]
+                self._suppressed[prefix] = self._suppressed.get(prefix, 0) + 1
+                return False
+            self._buckets[prefix] = [tokens - 1.0, now]
+            suppressed = self._suppressed.pop(prefix, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Не блокирует event loop, если поток вывода не успевает: лишнее отбрасывается"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Склеиваем сообщение и трейсбек здесь, а форматирование оставляем потоку вывода
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            record.message += f" (+{suppressed} similar suppressed)"
+        if _DroppingQueueHandler.dropped:
+            record.message += f" ({_DroppingQueueHandler.dropped} records dropped, log queue full)"
+            _DroppingQueueHandler.dropped = 0
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def _formatter(kind: str) -> logging.Formatter:
+    return JsonFormatter() if kind == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def log_file_path() -> str:
+    """Свой файл у каждого шарда: RotatingFileHandler не умеет делить файл
+    между процессами, ротация в одном из них рвёт запись в остальных"""
+    if os.getenv("BOT_ROLE", "single") == "worker":
+        return os.path.join(LOG_DIR, f"charlotte.{os.getenv('SHARD_ID', '0')}.log")
+    return os.path.join(LOG_DIR, "charlotte.log")
+
+
+def stop_logger() -> None:
+    """Дописывает очередь и останавливает поток вывода"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logger():
-    os.makedirs("logs", exist_ok=True)
+    global _listener
+    os.makedirs(LOG_DIR, exist_ok=True)
 
-    format_str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    console_format = os.getenv("LOG_FORMAT", "text").lower()
+    file_max_bytes = int(os.getenv("LOG_FILE_MAX_MB", "20")) * 1024 * 1024
 
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(logging.Formatter(format_str))
+    console_handler.setFormatter(_formatter(console_format))
+
+    # Файл читает админ-панель (Get logs), поэтому по умолчанию он текстовый
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file_path(), maxBytes=file_max_bytes, backupCount=5, encoding="utf-8"
+    )
+    file_handler.setFormatter(_formatter(os.getenv("LOG_FILE_FORMAT", "text").lower()))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = _DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(RATE_LIMITS))
+
+    stop_logger()
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logger)
 
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(console_handler)
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
     logging.getLogger("aiogram.event").setLevel(logging.WARNING)
 
     return logging.getLogger(__name__)
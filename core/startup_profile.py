@@ -0,0 +1,47 @@
+"""Startup Profiling"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Collects import and init phase timings, logged once the bot is up"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.imports: dict[str, float] = {}
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def imports_of(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports[name] = time.perf_counter() - started
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def timed(self, name: str, coro):
+        """Замер одной корутины (удобно внутри asyncio.gather)"""
+        with self.phase(name):
+            return await coro
+
+    def log(self, logger: logging.Logger) -> None:
+        total = time.perf_counter() - self._started
+        lines = [f"⏱ Startup profile ({total * 1000:.0f} ms total):"]
+        for title, timings in (("imports", self.imports), ("init", self.phases)):
+            lines.append(f"  {title}:")
+            for name, elapsed in sorted(timings.items(), key=lambda kv: kv[1], reverse=True):
+                lines.append(f"    {name:<28} {elapsed * 1000:>8.1f} ms")
+        logger.info("\n".join(lines))
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,253 @@
+"""Supervisor Mode
+
+One supervisor process receives updates (polling or webhook) and runs the
+scheduled tasks. N worker processes run the handlers. Updates are routed
+to workers through Redis lists, sharded by chat id on a consistent hash
+ring, so every chat is always served by the same worker and adding a
+worker only moves ~1/N of the chats. All shared state (FSM, dialogs,
+caches, rate limits) already lives in Redis.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import sys
+from collections import deque
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from redis.asyncio import Redis
+
+from core import json_codec
+from core.config import Config
+from core.webhook import QueuedRequestHandler, install_stop_signals, run_webhook
+
+logger = logging.getLogger(__name__)
+
+SHARD_KEY_PREFIX = "updates:shard:"
+RESTART_DELAY = 5
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = shards
+        self._ring: list[tuple[int, int]] = sorted(
+            (self._hash(f"shard-{shard}#{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get_shard(self, key: int) -> int:
+        index = bisect.bisect(self._points, self._hash(str(key))) % len(self._ring)
+        return self._ring[index][1]
+
+
+def extract_shard_key(update: dict) -> int:
+    """chat_id апдейта, для инлайна и прочего без чата - id пользователя"""
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member", "chat_member"):
+        event = update.get(field)
+        if event and "chat" in event:
+            return event["chat"]["id"]
+
+    callback = update.get("callback_query")
+    if callback and callback.get("message"):
+        return callback["message"]["chat"]["id"]
+
+    for event in update.values():
+        if isinstance(event, dict) and "from" in event:
+            return event["from"]["id"]
+
+    return update.get("update_id", 0)
+
+
+def shard_queue_key(shard: int) -> str:
+    return f"{SHARD_KEY_PREFIX}{shard}"
+
+
+def shard_processing_key(shard: int) -> str:
+    """Апдейты, которые воркер забрал, но ещё не обработал"""
+    return f"{SHARD_KEY_PREFIX}{shard}:processing"
+
+
+async def requeue_processing(redis_client: Redis, shard: int) -> int:
+    """Возвращает в очередь шарда апдейты, которые не успел обработать упавший воркер.
+
+    В processing новые слева, воркер читает очередь справа: перекладываем
+    слева направо, и самый старый апдейт снова окажется первым.
+    """
+    moved = 0
+    while await redis_client.lmove(shard_processing_key(shard), shard_queue_key(shard), "LEFT", "RIGHT"):
+        moved += 1
+    return moved
+
+
+class ShardForwarder:
+    """Кладёт апдейты в Redis-очередь нужного воркера"""
+
+    def __init__(self, redis_client: Redis, shards: int):
+        self._redis = redis_client
+        self.ring = HashRing(shards)
+
+    async def forward(self, update: dict) -> int:
+        shard = self.ring.get_shard(extract_shard_key(update))
+        await self._redis.lpush(shard_queue_key(shard), json_codec.dumps(update))
+        return shard
+
+
+class ShardingRequestHandler(QueuedRequestHandler):
+    """Webhook supervisor: вместо обработки апдейты уходят воркерам"""
+
+    def __init__(self, *args, forwarder: ShardForwarder, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._forwarder = forwarder
+
+    async def process_update(self, update: dict) -> None:
+        await self._forwarder.forward(update)
+
+
+async def _poll_and_forward(bot: Bot, dp: Dispatcher, forwarder: ShardForwarder) -> None:
+    allowed_updates = dp.resolve_used_update_types()
+    await bot.delete_webhook(drop_pending_updates=True)
+
+    offset: Optional[int] = None
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=30, allowed_updates=allowed_updates, request_timeout=40
+            )
+        except Exception as e:
+            logger.error(f"Supervisor polling failed: {e}")
+            await asyncio.sleep(RESTART_DELAY)
+            continue
+
+        for update in updates:
+            await forwarder.forward(
+                update.model_dump(mode="json", by_alias=True, exclude_none=True)
+            )
+            offset = update.update_id + 1
+
+
+async def _keep_worker_alive(shard: int, shards: int) -> None:
+    """Запускает воркер-процесс и перезапускает его при падении"""
+    env = {**os.environ, "BOT_ROLE": "worker", "SHARD_ID": str(shard), "SHARD_WORKERS": str(shards)}
+    while True:
+        process = await asyncio.create_subprocess_exec(sys.executable, "main.py", env=env)
+        logger.info(f"👷 Worker {shard} started (pid {process.pid})")
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            process.terminate()
+            await process.wait()
+            raise
+        logger.error(f"Worker {shard} exited with code {code}, restarting in {RESTART_DELAY}s")
+        await asyncio.sleep(RESTART_DELAY)
+
+
+async def run_supervisor(bot: Bot, dp: Dispatcher, config: Config, redis_client: Redis) -> None:
+    shards = config.SHARD_WORKERS
+    forwarder = ShardForwarder(redis_client, shards)
+    workers = [asyncio.create_task(_keep_worker_alive(shard, shards)) for shard in range(shards)]
+    logger.info(f"🧭 Supervisor routing updates to {shards} workers")
+
+    try:
+        if config.BOT_MODE == "webhook":
+            # run_webhook сам возвращается по SIGTERM/SIGINT
+            await run_webhook(bot, dp, config, ShardingRequestHandler, forwarder=forwarder)
+        else:
+            stop = asyncio.Event()
+            install_stop_signals(stop)
+            poller = asyncio.create_task(_poll_and_forward(bot, dp, forwarder))
+            waiter = asyncio.create_task(stop.wait())
+            await asyncio.wait({poller, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if poller.done():
+                poller.result()
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+            logger.info("🛑 Stop signal received, stopping workers...")
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def run_shard_worker(
+    bot: Bot, dp: Dispatcher, shard: int, redis_client: Redis, concurrency: int = 64
+) -> None:
+    """Обрабатывает апдейты своего шарда из Redis.
+
+    Разные чаты обрабатываются параллельно (не больше ``concurrency``
+    апдейтов в работе и в очереди), а апдейты одного чата - строго по
+    одному и в порядке поступления: у каждого активного чата своя
+    очередь и один обработчик, который завершается, когда она пуста.
+
+    Апдейт забирается через BLMOVE в processing-список шарда и удаляется
+    оттуда только после обработки, так что апдейты упавшего (или убитого
+    OOM) воркера перезапущенный воркер обработает заново.
+    """
+    key = shard_queue_key(shard)
+    processing_key = shard_processing_key(shard)
+    semaphore = asyncio.Semaphore(concurrency)
+    chats: dict[int, deque[tuple[str, dict]]] = {}
+    tasks: set[asyncio.Task] = set()
+
+    async def process_chat(chat_key: int) -> None:
+        queue = chats[chat_key]
+        try:
+            while queue:
+                raw, update = queue.popleft()
+                try:
+                    await dp.feed_raw_update(bot, update)
+                except Exception as e:
+                    logger.exception(f"Failed to process update on shard {shard}: {e}")
+                finally:
+                    semaphore.release()
+                try:
+                    await redis_client.lrem(processing_key, 1, raw)
+                except Exception as e:
+                    logger.warning(f"Failed to remove processed update on shard {shard}, it may run again: {e}")
+        finally:
+            # Между проверкой очереди и удалением нет await - новый апдейт сюда не потеряется
+            del chats[chat_key]
+
+    workflow_data = {"dispatcher": dp, "bots": [bot], "bot": bot, **dp.workflow_data}
+    await dp.emit_startup(**workflow_data)
+    requeued = await requeue_processing(redis_client, shard)
+    if requeued:
+        logger.warning(f"Shard {shard}: requeued {requeued} updates left unprocessed by the previous worker")
+    logger.info(f"👷 Shard worker {shard} consuming {key}")
+
+    # Supervisor останавливает воркер через SIGTERM: дочитываем текущее и выходим
+    stop = asyncio.Event()
+    install_stop_signals(stop)
+
+    try:
+        while not stop.is_set():
+            await semaphore.acquire()
+            raw = await redis_client.blmove(key, processing_key, 5, "RIGHT", "LEFT")
+            if raw is None:
+                semaphore.release()
+                continue
+            update = json_codec.loads(raw)
+            chat_key = extract_shard_key(update)
+            if chat_key in chats:
+                chats[chat_key].append((raw, update))
+                continue
+            chats[chat_key] = deque([(raw, update)])
+            task = asyncio.create_task(process_chat(chat_key))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await dp.emit_shutdown(**workflow_data)
+        await bot.session.close()
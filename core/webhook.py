@@ -0,0 +1,167 @@
+"""Webhook Mode"""
+
+import asyncio
+import hashlib
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from core import json_codec
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook handler with a bounded ingestion queue.
+
+    Updates are acknowledged as soon as they are queued and processed by a
+    fixed pool of workers. When the queue stays full for ``put_timeout``
+    seconds the handler answers 503 and Telegram redelivers the update later,
+    so a burst slows Telegram down instead of piling up tasks in memory.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str,
+        queue_size: int = 1000,
+        workers: int = 32,
+        put_timeout: float = 2.0,
+        **data,
+    ):
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=False,
+            secret_token=secret_token,
+            **data,
+        )
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=queue_size)
+        self._workers_count = workers
+        self._put_timeout = put_timeout
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def start_workers(self) -> None:
+        for i in range(self._workers_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"webhook-worker-{i}"))
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Даём воркерам дообработать очередь, затем останавливаем их"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook queue not drained, {self._queue.qsize()} updates dropped")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def process_update(self, update: dict) -> None:
+        await self.dispatcher.feed_raw_update(self.bot, update, **self.data)
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.process_update(update)
+            except Exception as e:
+                logger.exception(f"Failed to process webhook update: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get(SECRET_HEADER, ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+
+        try:
+            update = await request.json(loads=json_codec.loads)
+        except ValueError:
+            return web.Response(body="Bad Request", status=400)
+
+        try:
+            await asyncio.wait_for(self._queue.put(update), timeout=self._put_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook queue is full, asking Telegram to retry")
+            return web.Response(body="Busy", status=503)
+
+        return web.json_response({})
+
+
+def install_stop_signals(stop: asyncio.Event) -> None:
+    """SIGTERM (docker stop) и SIGINT ставят stop, чтобы отработали finally и drain"""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows или не главный поток
+
+
+def webhook_secret(config: Config, token: str) -> str:
+    """Явный WEBHOOK_SECRET или производный от токена (A-Z, a-z, 0-9 как требует Telegram)"""
+    if config.WEBHOOK_SECRET:
+        return config.WEBHOOK_SECRET
+    return hashlib.sha256(f"webhook:{token}".encode()).hexdigest()
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    config: Config,
+    handler_cls: type[QueuedRequestHandler] = QueuedRequestHandler,
+    **handler_kwargs,
+) -> None:
+    secret = webhook_secret(config, bot.token)
+    allowed_updates = dp.resolve_used_update_types()
+
+    handler = handler_cls(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        queue_size=config.WEBHOOK_QUEUE_SIZE,
+        workers=config.WEBHOOK_WORKERS,
+        **handler_kwargs,
+    )
+
+    app = web.Application()
+    handler.register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.WEBAPP_HOST, port=config.WEBAPP_PORT)
+
+    handler.start_workers()
+    await site.start()
+
+    await bot.set_webhook(
+        url=f"{config.WEBHOOK_HOST.rstrip('/')}{config.WEBHOOK_PATH}",
+        secret_token=secret,
+        allowed_updates=allowed_updates,
+    )
+    logger.info(
+        f"🌐 Webhook listening on {config.WEBAPP_HOST}:{config.WEBAPP_PORT}{config.WEBHOOK_PATH} "
+        f"(updates: {', '.join(allowed_updates)})"
+    )
+
+    stop = asyncio.Event()
+    install_stop_signals(stop)
+    try:
+        await stop.wait()
+        logger.info("🛑 Stop signal received, draining webhook queue...")
+    finally:
+        # Вебхук не снимаем: пока бот перезапускается, Telegram копит апдейты
+        await handler.drain()
+        await runner.cleanup()
@@ -1,6 +1,7 @@
 import logging
 import datetime
 import asyncio
+import time
 from typing import Optional
 
 from aiogram import types, Bot
@@ -20,12 +21,10 @@ from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, Teleg
 from fluentogram import TranslatorHub, TranslatorRunner
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.logger import log_file_path
 from storage.db.crud import (
-    get_user_counts,
     get_top_services,
-    get_status_stats,
     toggle_lifetime_premium,
-    get_premium_and_donation_stats,
     ban_user,
     unban_user,
     list_of_banned_users,
@@ -34,12 +33,13 @@ from storage.db.crud import (
     get_list_user_ids,
     get_news_subscribers_ids,
     get_all_chat_ids,
-    get_db_overview_stats,
     get_cache_counts_by_service,
     clear_all_media_cache,
     grant_sponsorship
 )
+from storage.db import database_manager
 from states import NewsSpamGroup
+from tasks.admin_stats import admin_stats
 from utils import escape_markdown
 
 from aiogram import Router
@@ -68,7 +68,10 @@ statistic_kb = InlineKeyboardMarkup(inline_keyboard=[
             InlineKeyboardButton(text="📊 Service Stats", callback_data="statistic_service_usage"),
         ],
         [
+            InlineKeyboardButton(text="🚦 Backend Limits", callback_data="statistic_backend_limits"),
             InlineKeyboardButton(text="🗑 Clean Old Stats", callback_data="statistic_clean_old"),
+        ],
+        [
             InlineKeyboardButton(text="🔙 Back", callback_data="admin_panel_back"),
         ],
     ])
@@ -124,6 +127,10 @@ async def settings_back(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # === Statistic ===
+def _snapshot_age(snapshot: dict) -> str:
+    minutes = max(0, int(time.time() - snapshot.get('updated_at', 0)) // 60)
+    return "Updated just now" if minutes == 0 else f"Updated {minutes} min ago"
+
 @admin_router.callback_query(lambda c: c.data == "admin_panel_statistic")
 async def admin_panel_stats(callback: CallbackQuery, state: FSMContext, db_session: AsyncSession):
     data = await state.get_data()
@@ -133,9 +140,15 @@ async def admin_panel_stats(callback: CallbackQuery, state: FSMContext, db_sessi
 
     await state.update_data(current_admin_screen="statistics")
 
-    user_count = await get_user_counts(db_session)
-    status_stats = await get_status_stats(db_session)
-    db_overview = await get_db_overview_stats(db_session)
+    snapshot = await admin_stats.get()
+    if snapshot is None:
+        await state.update_data(current_admin_screen=None)
+        await callback.answer("Statistics are still being collected, try again in a minute", show_alert=True)
+        return
+
+    user_count = snapshot['user_counts']
+    status_stats = snapshot['status_stats']
+    db_overview = snapshot['db_overview']
 
     total_requests = status_stats['complete'] + status_stats['error']
     success_rate = (status_stats['complete'] / total_requests * 100) if total_requests > 0 else 0
@@ -160,7 +173,8 @@ async def admin_panel_stats(callback: CallbackQuery, state: FSMContext, db_sessi
         f"  ✅ Successful: {status_stats['complete']} ({success_rate:.1f}%)\n"
         f"  ❌ Failed: {status_stats['error']} ({100-success_rate:.1f}%)\n\n"
         "<b>💾 Media Cache:</b>\n"
-        f"  📦 Total cached: <b>{db_overview.get('total_cached', 0):,}</b> files\n"
+        f"  📦 Total cached: <b>{db_overview.get('total_cached', 0):,}</b> files\n\n"
+        f"<i>{_snapshot_age(snapshot)}</i>"
     ).format(total=total_requests)
 
     if isinstance(callback.message, types.InaccessibleMessage) or callback.message is None:
@@ -177,7 +191,7 @@ async def admin_panel_stats(callback: CallbackQuery, state: FSMContext, db_sessi
     await callback.answer()
 
 @admin_router.callback_query(lambda c: c.data == "statistic_top_services")
-async def admin_panel_top_services(callback: CallbackQuery, state: FSMContext, db_session: AsyncSession):
+async def admin_panel_top_services(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     if data.get("current_admin_screen") == "top_services":
         await callback.answer("Nothing happened!", cache_time=1)
@@ -186,7 +200,8 @@ async def admin_panel_top_services(callback: CallbackQuery, state: FSMContext, d
     await state.update_data(current_admin_screen="top_services")
 
     text = "🏆 <b>Top Services (All Time)</b>\n\n"
-    top_services = await get_top_services(db_session)
+    async with database_manager.read_session() as session:
+        top_services = await get_top_services(session)
 
     medals = ["🥇", "🥈", "🥉"]
     for idx, (service, count) in enumerate(top_services):
@@ -215,11 +230,18 @@ async def admin_panel_prem_stats(callback: CallbackQuery, state: FSMContext, db_
 
     await state.update_data(current_admin_screen="premium_stats")
 
-    stats = await get_premium_and_donation_stats(db_session)
+    snapshot = await admin_stats.get()
+    if snapshot is None:
+        await state.update_data(current_admin_screen=None)
+        await callback.answer("Statistics are still being collected, try again in a minute", show_alert=True)
+        return
+
+    stats = snapshot['premium']
     text = (
         "⭐ <b>Premium Statistics</b>\n\n"
         f"👑 Total premium users: {stats['total_premium_users']}\n"
-        f"⭐ Total stars donated: {stats['total_stars_donated']}\n"
+        f"⭐ Total stars donated: {stats['total_stars_donated']}\n\n"
+        f"<i>{_snapshot_age(snapshot)}</i>"
     )
 
     if isinstance(callback.message, types.InaccessibleMessage) or callback.message is None:
@@ -415,7 +437,7 @@ async def admin_panel_banlist(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @admin_router.callback_query(lambda c: c.data == "ban_panel_list")
-async def ban_panel_list(callback: CallbackQuery, state: FSMContext, db_session: AsyncSession):
+async def ban_panel_list(callback: CallbackQuery, state: FSMContext):
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="🔙 Back", callback_data="admin_panel_banlist"),
@@ -423,7 +445,8 @@ async def ban_panel_list(callback: CallbackQuery, state: FSMContext, db_session:
     ])
 
     text = "Banned users:\n"
-    banned_users = await list_of_banned_users(db_session)
+    async with database_manager.read_session() as session:
+        banned_users = await list_of_banned_users(session)
     for user in banned_users:
         text += f"{user.user_id}\n"
 
@@ -523,7 +546,7 @@ async def admin_panel_get_logs(callback: CallbackQuery, state: FSMContext):
         await message.delete()
     await message.bot.send_document(
         chat_id=message.chat.id,
-        document=FSInputFile("logs/charlotte.log"),
+        document=FSInputFile(log_file_path()),
         caption="Here's your logs"
     )
 
@@ -563,7 +586,7 @@ async def proccess_spam_news(message: types.Message, state: FSMContext) -> None:
     )
 
 @admin_router.callback_query(lambda c: c.data in ["news_spam_subscribers", "news_spam_force_all"])
-async def process_spam_news_to_chats(callback: CallbackQuery, state: FSMContext, db_session: AsyncSession) -> None:
+async def process_spam_news_to_chats(callback: CallbackQuery, state: FSMContext) -> None:
     data = await state.get_data()
     chat_id = callback.from_user.id
     message_text = data.get("message_text", "")
@@ -571,12 +594,13 @@ async def process_spam_news_to_chats(callback: CallbackQuery, state: FSMContext,
     await callback.answer("Mailing list started")
     await state.clear()
 
-    if callback.data == "news_spam_subscribers":
-        user_ids = await get_news_subscribers_ids(db_session)
-    else:
-        user_ids = await get_list_user_ids(db_session)
-        chat_ids = await get_all_chat_ids(db_session)
-        user_ids.extend(chat_ids)
+    async with database_manager.read_session() as session:
+        if callback.data == "news_spam_subscribers":
+            user_ids = await get_news_subscribers_ids(session)
+        else:
+            user_ids = await get_list_user_ids(session)
+            chat_ids = await get_all_chat_ids(session)
+            user_ids.extend(chat_ids)
 
     asyncio.create_task(
         _run_broadcast(callback.bot, chat_id, user_ids, message_text)
@@ -738,12 +762,11 @@ async def toggle_service(callback: CallbackQuery, db_session: AsyncSession):
 @admin_router.callback_query(lambda c: c.data == "statistic_service_usage")
 async def admin_panel_service_usage(callback: CallbackQuery, state: FSMContext):
 
-    from storage.db import database_manager
     from sqlalchemy import select, func, case
     from storage.db.models import Statistics
     import datetime
 
-    async with database_manager.async_session() as session:
+    async with database_manager.read_session() as session:
         since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=30)
 
         result = await session.execute(
@@ -802,6 +825,57 @@ async def admin_panel_service_usage(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@admin_router.callback_query(lambda c: c.data == "statistic_backend_limits")
+async def admin_panel_backend_limits(callback: CallbackQuery, state: FSMContext):
+    from tasks.adaptive_limiter import backend_limits
+    from tasks.circuit_breaker import BreakerAlerts, BreakerState, circuit_breakers
+
+    await state.update_data(current_admin_screen="backend_limits")
+
+    text = "🚦 <b>Backend Limits (this process)</b>\n\n"
+    snapshot = backend_limits.snapshot()
+    if not snapshot:
+        text += "No backend requests yet."
+
+    breakers = circuit_breakers.snapshot()
+    for stats in snapshot:
+        breaker = breakers.get(stats.key)
+        breaker_state = breaker.state if breaker else BreakerState.CLOSED
+        text += f"{BreakerAlerts.ICONS[breaker_state]} <b>{stats.key}</b> ({breaker_state.value})\n"
+        text += f"  Limit: {stats.limit:.1f} | Running: {stats.inflight} | Queued: {stats.waiting}\n"
+        text += (
+            f"  ✅ {stats.successes} | 🔥 Overloads: {stats.overloads} | "
+            f"🐢 Slow (>{stats.latency_target:.0f}s): {stats.slow}\n\n"
+        )
+
+    from modules.services.youtube.prefetch import youtube_prefetch
+
+    prefetch = await youtube_prefetch.stats()
+    if youtube_prefetch.enabled and prefetch:
+        decided = prefetch["hit"] + prefetch["miss"] + prefetch["expired"]
+        hit_rate = prefetch["hit"] / decided * 100 if decided else 0.0
+        text += "🔮 <b>YouTube prefetch</b> (all processes)\n"
+        text += (
+            f"  Started: {prefetch['started']} | Skipped (busy): {prefetch['skipped_budget']} | "
+            f"Preempted: {prefetch['preempted']}\n"
+        )
+        text += (
+            f"  ✅ Hit: {prefetch['hit']} | ❌ Miss: {prefetch['miss']} | "
+            f"⌛ Expired: {prefetch['expired']} | 🔥 Failed: {prefetch['failed']}\n"
+        )
+        text += f"  Hit rate: {hit_rate:.1f}%\n"
+
+    if isinstance(callback.message, InaccessibleMessage) or callback.message is None:
+        if callback.bot:
+            await callback.bot.send_message(callback.from_user.id, text, parse_mode=ParseMode.HTML, reply_markup=statistic_kb)
+    else:
+        try:
+            await callback.message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=statistic_kb)
+        except TelegramBadRequest:
+            pass  # Ничего не изменилось
+    await callback.answer()
+
+
 @admin_router.callback_query(lambda c: c.data == "statistic_clean_old")
 async def admin_panel_clean_stats(callback: CallbackQuery, state: FSMContext):
     kb = InlineKeyboardMarkup(inline_keyboard=[
@@ -829,7 +903,6 @@ async def admin_panel_clean_stats(callback: CallbackQuery, state: FSMContext):
 async def admin_clean_stats_confirm(callback: CallbackQuery, state: FSMContext):
     days = int(callback.data.split("_")[-1])
 
-    from storage.db import database_manager
     from sqlalchemy import delete
     from storage.db.models import Statistics
     import datetime
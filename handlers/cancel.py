@@ -2,6 +2,7 @@ from aiogram import types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from fluentogram import TranslatorRunner
+from modules.services.youtube.prefetch import youtube_prefetch
 from tasks.task_manager import task_manager
 
 from aiogram import Router
@@ -13,7 +14,8 @@ async def cancel_command(message: types.Message, state: FSMContext, i18n: Transl
     if user is None:
         return
 
-    had_active_download = task_manager.cancel_user(user.id)
+    youtube_prefetch.discard(user.id, stat="miss")
+    had_active_download = await task_manager.cancel_user(user.id)
     await state.clear()
 
     if not had_active_download:
@@ -16,7 +16,7 @@ from fluentogram import TranslatorRunner
 
 from models.settings import ChatSettingsJson, UserSettingsJson
 from models.service_list import Services
-from storage.db.crud import update_user_settings, update_chat_settings, get_user_settings, get_chat_settings, create_user, create_chat
+from storage.db.crud import patch_user_settings, patch_chat_settings, toggle_chat_settings_member, get_user_settings, get_chat_settings, create_user, create_chat
 from middlewares.button_owner import register_message_owner
 from aiogram import Router
 router = Router()
@@ -88,12 +88,20 @@ async def get_settings_obj(db_session: AsyncSession, chat_id: int, user_id: int)
             settings = await get_user_settings(db_session, user_id)
         return settings, False
 
-async def save_settings_obj(db_session: AsyncSession, chat_id: int, user_id: int, settings):
+async def patch_settings_obj(db_session: AsyncSession, chat_id: int, user_id: int, changes: dict) -> UserSettingsJson | ChatSettingsJson:
+    """Меняет только переданные пути ({("profile", "language"): "de"}) и возвращает свежие настройки"""
     is_group = chat_id < 0
     if is_group:
-        await update_chat_settings(db_session, chat_id, settings)
+        settings = await patch_chat_settings(db_session, chat_id, changes)
+        if settings is None:
+            await create_chat(db_session, chat_id, user_id)
+            settings = await patch_chat_settings(db_session, chat_id, changes)
     else:
-        await update_user_settings(db_session, user_id, settings)
+        settings = await patch_user_settings(db_session, user_id, changes)
+        if settings is None:
+            await create_user(db_session, user_id)
+            settings = await patch_user_settings(db_session, user_id, changes)
+    return settings
 
 
 def build_main_keyboard(settings, i18n: TranslatorRunner, is_group: bool = False) -> InlineKeyboardMarkup:
@@ -414,12 +422,13 @@ async def menu_service_block(callback: CallbackQuery, i18n: TranslatorRunner, db
         logger.error(f"Not a chat settings: {type(settings)}")
         return
 
-    if service in settings.profile.blocked_services:
-        settings.profile.blocked_services.remove(service)
-    else:
-        settings.profile.blocked_services.add(service)
-
-    await save_settings_obj(db_session, callback.message.chat.id, callback.from_user.id, settings)
+    # Переключаем в самом UPDATE: два быстрых нажатия по разным сервисам не затирают друг друга
+    chat_id = callback.message.chat.id
+    path = ("profile", "blocked_services")
+    settings = await toggle_chat_settings_member(db_session, chat_id, path, service)
+    if settings is None:
+        await create_chat(db_session, chat_id, callback.from_user.id)
+        settings = await toggle_chat_settings_member(db_session, chat_id, path, service)
 
     name = service.replace("_", " ").title()
     text = i18n.settings.service.title(name=name)
@@ -444,9 +453,7 @@ async def apply_profile_setting(callback: CallbackQuery, i18n: TranslatorRunner,
     #         await callback.answer("🌟 Disabling the Bot Ad requires an active Sponsorship (100 Stars)!", show_alert=True)
     #         return
 
-    settings, is_group = await get_settings_obj(db_session, chat_id, callback.from_user.id)
-    setattr(settings.profile, key, new_value)
-    await save_settings_obj(db_session, chat_id, callback.from_user.id, settings)
+    await patch_settings_obj(db_session, chat_id, callback.from_user.id, {("profile", key): new_value})
 
     status_text = i18n.get('enabled') if new_value else i18n.get('disabled')
     text = i18n.get('setting-changed', setting=key.replace('_', ' '), status=status_text)
@@ -471,10 +478,9 @@ async def apply_service_setting(callback: CallbackQuery, i18n: TranslatorRunner,
     new_value = data[last_uscores+1:] == "True"
 
     chat_id = callback.message.chat.id
-    settings, is_group = await get_settings_obj(db_session, chat_id, callback.from_user.id)
-    svc_settings = getattr(settings.services, target_service)
-    setattr(svc_settings, key, new_value)
-    await save_settings_obj(db_session, chat_id, callback.from_user.id, settings)
+    await patch_settings_obj(
+        db_session, chat_id, callback.from_user.id, {("services", target_service, key): new_value}
+    )
 
     status_text = i18n.get('enabled') if new_value else i18n.get('disabled')
     text = i18n.get('setting-changed', setting=key.replace('_', ' '), status=status_text)
@@ -491,12 +497,11 @@ async def apply_service_uimode(callback: CallbackQuery, i18n: TranslatorRunner,
     new_mode = parts[3]
 
     chat_id = callback.message.chat.id
-    settings, is_group = await get_settings_obj(db_session, chat_id, callback.from_user.id)
-    svc_settings = getattr(settings.services, target_service)
-    setattr(svc_settings, "ui_mode", new_mode)
-    if hasattr(svc_settings, "simple"):
-        setattr(svc_settings, "simple", new_mode == "simple")
-    await save_settings_obj(db_session, chat_id, callback.from_user.id, settings)
+    # simple есть не у всех сервисов, лишние пути patch пропускает
+    await patch_settings_obj(db_session, chat_id, callback.from_user.id, {
+        ("services", target_service, "ui_mode"): new_mode,
+        ("services", target_service, "simple"): new_mode == "simple",
+    })
 
     mode_title = i18n.get(f"yt-ui-mode-{new_mode}")
     setting_name = i18n.get('btn-youtube-ui-mode')
@@ -536,9 +541,7 @@ async def settings_lang_menu(callback: CallbackQuery, i18n: TranslatorRunner, db
 async def settings_lang_set(callback: CallbackQuery, state: FSMContext, i18n: TranslatorRunner, db_session: AsyncSession):
     if callback.message is None or callback.data is None: return
     lang = callback.data.replace("settings_lang_set_", "")
-    settings, is_group = await get_settings_obj(db_session, callback.message.chat.id, callback.from_user.id)
-    settings.profile.language = lang
-    await save_settings_obj(db_session, callback.message.chat.id, callback.from_user.id, settings)
+    await patch_settings_obj(db_session, callback.message.chat.id, callback.from_user.id, {("profile", "language"): lang})
 
     await state.clear()
     text = i18n.get('language-changed', language=lang.upper())
@@ -576,12 +579,9 @@ async def settings_title_language_set(callback: CallbackQuery, i18n: TranslatorR
     if callback.message is None or callback.data is None: return
     lang = callback.data.replace("settings_title_lang_set_", "")
 
-    settings, is_group = await get_settings_obj(db_session, callback.message.chat.id, callback.from_user.id)
-
-    if hasattr(settings.profile, 'title_language'):
-        settings.profile.title_language = lang
-
-    await save_settings_obj(db_session, callback.message.chat.id, callback.from_user.id, settings)
+    await patch_settings_obj(
+        db_session, callback.message.chat.id, callback.from_user.id, {("profile", "title_language"): lang}
+    )
 
     text = i18n.get('title-language-changed', language=lang.upper())
     await safe_edit_text(callback, text, build_back_keyboard(i18n, "settings_main"))
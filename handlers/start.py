@@ -8,7 +8,7 @@ from fluentogram import TranslatorHub, TranslatorRunner
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from storage.cache.redis_client import cache_get, cache_delete
-from storage.db.crud import create_user, create_chat, get_user_settings, update_user_settings
+from storage.db.crud import create_user, create_chat, patch_user_settings
 
 router = Router()
 
@@ -59,9 +59,7 @@ async def start_command(
         if is_new:
             lang = _resolve_lang(message.from_user.language_code)
             if lang != "en":
-                settings = await get_user_settings(session=db_session, user_id=message.from_user.id)
-                settings.profile.language = lang
-                await update_user_settings(session=db_session, user_id=message.from_user.id, settings=settings)
+                await patch_user_settings(db_session, message.from_user.id, {("profile", "language"): lang})
                 i18n = _translator_hub.get_translator_by_locale(lang)
 
         bot = await message.bot.me()
@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Ой! Гэта кантэнт 18+ з узроста
 error-download-canceled = Добра, адмяняю загрузку па тваім запыце! 🛑
 error-generic = ❌ Адбылася памылка. Прашу прабачэння!
 error-preview-only = 🛑 Спампавалася толькі прэв'ю (30 секунд)! 😔
+error-busy = 😵 Я зараз перагружаная, паспрабуй крыху пазней! 🧡
+error-service-unavailable = 🔌 Сэрвіс загрузкі часова недаступны, я ўжо спрабую яго падняць. Паспрабуй праз хвілінку! 🧡
+queue-position = ⏳ Я зараз крыху занятая! Ты #{ $position } у чарзе, чакаць каля { $minutes } хв...
+queue-busy = 😵 Я зараз перагружаная: перад табой { $position } загрузак (~{ $minutes } хв). Паспрабуй крыху пазней! 🧡
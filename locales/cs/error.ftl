@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Jejda! Tento obsah má věkové omezení 18+ a já s
 error-download-canceled = Dobře, ruším stahování na tvou žádost! 🛑
 error-generic = ❌ Něco se pokazilo. Omlouvám se!
 error-preview-only = 🛑 Byl stažen pouze náhled (30 sekund)! 😔
+error-busy = 😵 Teď jsem přetížená, zkus to prosím o chvilku později! 🧡
+error-service-unavailable = 🔌 Služba pro stahování je dočasně nedostupná, už ji zkouším oživit. Zkus to prosím za chvilku! 🧡
+queue-position = ⏳ Teď mám trochu napilno! Jsi #{ $position } ve frontě, čekání asi { $minutes } min...
+queue-busy = 😵 Teď jsem přetížená: před tebou je { $position } stahování (~{ $minutes } min). Zkus to prosím o chvilku později! 🧡
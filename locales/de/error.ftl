@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Hoppla! Dieser Inhalt ist ab 18 Jahren freigegeben u
 error-download-canceled = Alles klar, ich breche den Download auf deinen Wunsch ab! 🛑
 error-generic = ❌ Ein Fehler ist aufgetreten. Entschuldigung!
 error-preview-only = 🛑 Es wurde nur eine Vorschau (30 Sekunden) heruntergeladen! 😔
+error-busy = 😵 Ich bin gerade überlastet, versuch es bitte etwas später! 🧡
+error-service-unavailable = 🔌 Der Download-Dienst ist vorübergehend nicht erreichbar, ich versuche ihn schon wiederzubeleben. Versuch es bitte in einer Minute! 🧡
+queue-position = ⏳ Ich bin gerade etwas beschäftigt! Du bist #{ $position } in der Warteschlange, etwa { $minutes } Min. Wartezeit...
+queue-busy = 😵 Ich bin gerade überlastet: { $position } Downloads sind vor dir (~{ $minutes } Min.). Versuch es bitte etwas später! 🧡
@@ -8,4 +8,8 @@ error-region-restricted = 🌍 Oops, this content is blocked in my country or re
 error-age-restricted = 🔞 Oops! This content has age restrictions and I can't reach it! 😳
 error-download-canceled = Alright, download canceled by your request! 🛑
 error-generic = ❌ Something went wrong. I'm sorry!
-error-preview-only = 🛑 Only a 30-second preview was downloaded, not the full track! 😔
\ No newline at end of file
+error-preview-only = 🛑 Only a 30-second preview was downloaded, not the full track! 😔
+error-busy = 😵 I'm overloaded right now, please try again a bit later! 🧡
+error-service-unavailable = 🔌 The download service is temporarily unavailable, I'm already trying to bring it back. Please try again in a minute! 🧡
+queue-position = ⏳ I'm a little busy right now! You're #{ $position } in line, about { $minutes } min to wait...
+queue-busy = 😵 I'm overloaded right now: { $position } downloads are ahead of you (~{ $minutes } min). Please try again a bit later! 🧡
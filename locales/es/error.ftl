@@ -9,3 +9,7 @@ error-age-restricted = 🔞 ¡Ups! Este es contenido para mayores de 18 años y
 error-download-canceled = ¡De acuerdo, cancelo la descarga a petición tuya! 🛑
 error-generic = ❌ Ocurrió un error. ¡Lo siento!
 error-preview-only = 🛑 ¡Solo se descargó una vista previa de 30 segundos! 😔
+error-busy = 😵 Estoy sobrecargada ahora mismo, ¡inténtalo un poco más tarde! 🧡
+error-service-unavailable = 🔌 El servicio de descargas no está disponible temporalmente, ya estoy intentando recuperarlo. ¡Inténtalo en un minuto! 🧡
+queue-position = ⏳ ¡Estoy un poco ocupada ahora! Eres el #{ $position } en la cola, unos { $minutes } min de espera...
+queue-busy = 😵 Estoy sobrecargada ahora mismo: hay { $position } descargas delante de ti (~{ $minutes } min). ¡Inténtalo un poco más tarde! 🧡
@@ -9,3 +9,7 @@ error-age-restricted = 🔞 اوپس! این محتوای ۱۸+ با محدود
 error-download-canceled = باشه، دانلود را به درخواست تو لغو می‌کنم! 🛑
 error-generic = ❌ خطایی رخ داد. پوزش می‌خواهم!
 error-preview-only = 🛑 فقط پیشنمایش ۳۰ ثانیهای دانلود شد! 😔
+error-busy = 😵 الان سرم خیلی شلوغه، لطفا کمی بعد دوباره امتحان کن! 🧡
+error-service-unavailable = 🔌 سرویس دانلود موقتا در دسترس نیست، دارم سعی می‌کنم برش گردونم. لطفا یک دقیقه دیگه امتحان کن! 🧡
+queue-position = ⏳ الان کمی سرم شلوغه! تو نفر #{ $position } در صف هستی، حدود { $minutes } دقیقه صبر کن...
+queue-busy = 😵 الان سرم خیلی شلوغه: { $position } دانلود جلوی تو هست (~{ $minutes } دقیقه). لطفا کمی بعد دوباره امتحان کن! 🧡
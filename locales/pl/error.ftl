@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Ups! To jest zawartość 18+ z ograniczeniami wiekow
 error-download-canceled = Dobrze, anuluję pobieranie na Twoje życzenie! 🛑
 error-generic = ❌ Coś poszło nie tak. Przepraszam!
 error-preview-only = 🛑 Pobrano tylko podgląd (30 sekund)! 😔
+error-busy = 😵 Jestem teraz przeciążona, spróbuj trochę później! 🧡
+error-service-unavailable = 🔌 Usługa pobierania jest chwilowo niedostępna, już próbuję ją przywrócić. Spróbuj za minutę! 🧡
+queue-position = ⏳ Jestem teraz trochę zajęta! Jesteś #{ $position } w kolejce, około { $minutes } min czekania...
+queue-busy = 😵 Jestem teraz przeciążona: przed Tobą jest { $position } pobrań (~{ $minutes } min). Spróbuj trochę później! 🧡
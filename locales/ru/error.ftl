@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Ой! Это контент 18+ с возрастн
 error-download-canceled = Хорошо, отменяю загрузку по твоему запросу! 🛑
 error-generic = ❌ Произошла ошибка. Прошу прощения!
 error-preview-only = 🛑 Скачалось только превью (30 секунд), а не полный трек! 😔
+error-busy = 😵 Я сейчас перегружена, попробуй чуть позже! 🧡
+error-service-unavailable = 🔌 Сервис загрузки временно недоступен, я уже пытаюсь его поднять. Попробуй через минутку! 🧡
+queue-position = ⏳ Я сейчас немного занята! Ты #{ $position } в очереди, ждать примерно { $minutes } мин...
+queue-busy = 😵 Я сейчас перегружена: перед тобой { $position } загрузок (~{ $minutes } мин). Попробуй чуть позже! 🧡
@@ -9,3 +9,7 @@ error-age-restricted = 🔞 Ой! Це контент 18+ з віковими о
 error-download-canceled = Добре, скасовую завантаження за твоїм запитом! 🛑
 error-generic = ❌ Сталася помилка. Перепрошую!
 error-preview-only = 🛑 Завантажилось тільки превʼю (30 секунд), а не повний трек! 😔
+error-busy = 😵 Я зараз перевантажена, спробуй трохи пізніше! 🧡
+error-service-unavailable = 🔌 Сервіс завантаження тимчасово недоступний, я вже намагаюся його підняти. Спробуй за хвилинку! 🧡
+queue-position = ⏳ Я зараз трохи зайнята! Ти #{ $position } у черзі, чекати приблизно { $minutes } хв...
+queue-busy = 😵 Я зараз перевантажена: перед тобою { $position } завантажень (~{ $minutes } хв). Спробуй трохи пізніше! 🧡
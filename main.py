@@ -1,29 +1,55 @@
 import asyncio
 import os
 
-import httpx
-from aiogram_dialog import setup_dialogs
-from dotenv import load_dotenv
-
-from core.bot_commands import set_default_commands
-from core.config import settings
-from core.error_handler import register_error_handler
-from core.loader import create_bot_and_dispatcher
-from core.logger import setup_logger
-from handlers import user_router, admin_router
-from middlewares.ban_check import BanCheckMiddleware
-from middlewares.button_owner import UserContextMiddleware, ButtonOwnerMiddleware
-from middlewares.db import DbSessionMiddleware
-from middlewares.force_edit_show_mode import ForceEditShowModeMiddleware
-from middlewares.i18n import TranslatorRunnerMiddleware
-from middlewares.rate_limiter import RateLimiter
-from modules.inline.handler import inline_router
-from modules.payment.router import payment_router
-from modules.services.router import service_router
-from storage.cache.redis_client import init_redis
-from storage.db import database_manager
-from tasks.scheduled import start_scheduled_tasks
-from utils.i18n import create_translator_hub
+from core.startup_profile import startup_profile
+
+with startup_profile.imports_of("aiogram / httpx"):
+    import httpx
+    from aiogram_dialog import setup_dialogs
+    from dotenv import load_dotenv
+
+with startup_profile.imports_of("core"):
+    from core.bot_commands import set_default_commands
+    from core.config import settings
+    from core.error_handler import register_error_handler
+    from core.loader import create_bot_and_dispatcher
+    from core.logger import setup_logger
+
+with startup_profile.imports_of("storage"):
+    from storage.cache.redis_client import init_redis
+    from storage.db import database_manager
+
+with startup_profile.imports_of("handlers"):
+    from handlers import user_router, admin_router
+
+with startup_profile.imports_of("middlewares"):
+    from middlewares.ban_check import BanCheckMiddleware
+    from middlewares.button_owner import UserContextMiddleware, ButtonOwnerMiddleware
+    from middlewares.db import DbSessionMiddleware
+    from middlewares.force_edit_show_mode import ForceEditShowModeMiddleware
+    from middlewares.i18n import TranslatorRunnerMiddleware
+    from middlewares.rate_limiter import RateLimiter
+
+with startup_profile.imports_of("modules.inline"):
+    from modules.inline.handler import inline_router
+
+with startup_profile.imports_of("modules.payment"):
+    from modules.payment.router import payment_router
+
+with startup_profile.imports_of("modules.services"):
+    from modules.services.router import service_router
+
+with startup_profile.imports_of("tasks / i18n"):
+    from tasks.activity_tracker import activity_tracker
+    from tasks.adaptive_limiter import AdaptiveLimitTransport, backend_limits
+    from tasks.admin_stats import admin_stats
+    from tasks.circuit_breaker import CircuitBreakerTransport, circuit_breakers
+    from tasks.core_jobs import CoreJobTransport
+    from tasks.job_queue import job_queue
+    from tasks.scheduled import start_scheduled_tasks
+    from tasks.task_manager import task_manager
+    from utils.i18n import create_translator_hub
+    from utils.photo_cache import RedisMediaIdStorage
 
 load_dotenv()
 
@@ -36,11 +62,16 @@ async def main():
     os.makedirs("storage/temp", exist_ok=True)
     logger.info("✅ Storage directories created")
 
-    logger.info("📋 Initializing DataBase...")
-    await database_manager.init_db()
+    logger.info("📋 Initializing DataBase and Redis Client...")
+    with startup_profile.phase("postgres + redis"):
+        await asyncio.gather(
+            startup_profile.timed("postgres", database_manager.init_db()),
+            startup_profile.timed("redis", init_redis()),
+        )
 
-    logger.info("📋 Initializing Redis Client...")
-    await init_redis()
+    await task_manager.start()
+    await activity_tracker.start()
+    await admin_stats.start()
 
     logger.info("📋 Loading configuration...")
     logger.info(f"✅ Configuration loaded. Admin ID: {settings.ADMIN_ID}")
@@ -48,13 +79,20 @@ async def main():
     logger.info("🤖 Initializing Bot and Dispatcher...")
     bot, dp = create_bot_and_dispatcher(settings)
 
-    bot_info = await bot.get_me()
-    logger.info(f"✅ Bot initialized: @{bot_info.username} ({bot_info.first_name})")
+    # get_me и команды не зависят от роутеров, запускаем их фоном
+    bot_info_task = asyncio.create_task(startup_profile.timed("get_me", bot.get_me()))
+    commands_task = asyncio.create_task(
+        startup_profile.timed("set_default_commands", set_default_commands(bot))
+    )
 
     logger.info("⚙️ Setting up workflow data...")
     core_client = httpx.AsyncClient(
         base_url=settings.LOSSLESS_CORE_URL,
         timeout=None,
+        # Предохранитель снаружи: разомкнутый эндпоинт отклоняется, не занимая место в очереди лимитера
+        transport=CircuitBreakerTransport(
+            circuit_breakers, AdaptiveLimitTransport(backend_limits, CoreJobTransport())
+        ),
     )
     dp.workflow_data.update(
         http_client=core_client,
@@ -81,29 +119,59 @@ async def main():
     dp.include_router(inline_router)
     dp.include_router(service_router)
 
-    setup_dialogs(dp)
+    setup_dialogs(dp, media_id_storage=RedisMediaIdStorage())
     dp.update.outer_middleware(ForceEditShowModeMiddleware())
     logger.info("✅ All handlers registered")
 
     register_error_handler(dp, bot)
     logger.info("✅ Error handler registered")
 
-    logger.info("⏰ Starting scheduled tasks...")
-    start_scheduled_tasks(bot)
-    logger.info("✅ Scheduled tasks started")
+    # Supervisor только принимает апдейты, загрузки выполняют воркеры
+    if settings.BOT_ROLE != "supervisor":
+        await job_queue.start()
+
+    if settings.BOT_ROLE != "worker":
+        logger.info("⏰ Starting scheduled tasks...")
+        start_scheduled_tasks(bot)
+        logger.info("✅ Scheduled tasks started")
 
     logger.info("📝 Setting default commands...")
-    await set_default_commands(bot)
+    with startup_profile.phase("get_me + commands (wait)"):
+        bot_info, _ = await asyncio.gather(bot_info_task, commands_task)
+    logger.info(f"✅ Bot initialized: @{bot_info.username} ({bot_info.first_name})")
     logger.info("✅ Default commands set")
 
     dp.shutdown.register(on_shutdown)
 
+    startup_profile.log(logger)
     logger.info("🎉 Bot successfully started and ready to receive messages!")
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, skip_updates=True)
+    if settings.BOT_ROLE in ("supervisor", "worker"):
+        from core.supervisor import run_shard_worker, run_supervisor
+        from storage.cache.redis_client import redis_client
+
+        if redis_client is None:
+            raise RuntimeError(f"BOT_ROLE={settings.BOT_ROLE} requires Redis")
+
+        if settings.BOT_ROLE == "supervisor":
+            await run_supervisor(bot, dp, settings, redis_client)
+        else:
+            await run_shard_worker(bot, dp, settings.SHARD_ID, redis_client)
+    elif settings.BOT_MODE == "webhook":
+        from core.webhook import run_webhook
+
+        await run_webhook(bot, dp, settings)
+    else:
+        await bot.delete_webhook(drop_pending_updates=True)
+        await dp.start_polling(
+            bot, skip_updates=True, allowed_updates=dp.resolve_used_update_types()
+        )
 
 
 async def on_shutdown(dispatcher):
+    await job_queue.stop()
+    await admin_stats.stop()
+    await activity_tracker.stop()
+
     core_client: httpx.AsyncClient = dispatcher.workflow_data.get("http_client")
     if core_client:
         await core_client.aclose()
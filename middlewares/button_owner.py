@@ -6,18 +6,21 @@ from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject, Update
 
 from storage.cache.redis_client import cache_get, cache_set
+from tasks.activity_tracker import activity_tracker
 
 logger = logging.getLogger(__name__)
 
 # Context variable to hold the user_id that triggered the current update.
 # This lets us propagate the user_id into helper functions without threading issues.
 current_user_id: contextvars.ContextVar[int | None] = contextvars.ContextVar("current_user_id", default=None)
+# Chat the update came from, so background helpers (e.g. queue status) know where to report.
+current_chat_id: contextvars.ContextVar[int | None] = contextvars.ContextVar("current_chat_id", default=None)
 
 
 class UserContextMiddleware(BaseMiddleware):
     """
-    Outer dispatcher middleware that extracts the user_id from the incoming
-    Update and saves it to a ContextVar so downstream code can access it.
+    Outer dispatcher middleware that extracts the user_id and chat_id from the
+    incoming Update and saves them to ContextVars so downstream code can access them.
     """
     async def __call__(
         self,
@@ -26,23 +29,31 @@ class UserContextMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         user_id = None
+        chat_id = None
         if isinstance(event, Update):
             if event.message and event.message.from_user:
                 user_id = event.message.from_user.id
+                chat_id = event.message.chat.id
             elif event.callback_query and event.callback_query.from_user:
                 user_id = event.callback_query.from_user.id
+                if event.callback_query.message:
+                    chat_id = event.callback_query.message.chat.id
             elif event.inline_query and event.inline_query.from_user:
                 user_id = event.inline_query.from_user.id
 
         token = None
         if user_id:
             token = current_user_id.set(user_id)
+            activity_tracker.touch(user_id)
+        chat_token = current_chat_id.set(chat_id) if chat_id else None
 
         try:
             return await handler(event, data)
         finally:
             if token is not None:
                 current_user_id.reset(token)
+            if chat_token is not None:
+                current_chat_id.reset(chat_token)
 
 
 async def register_message_owner(message: Message, owner_id: int) -> None:
@@ -1,9 +1,13 @@
+import contextvars
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Chat, TelegramObject, User
-from fluentogram import TranslatorHub
+from fluentogram import TranslatorHub, TranslatorRunner
 from storage.db.crud import get_user_settings, get_chat_settings
 
+# Translator of the current update, for code that has no access to handler data
+current_i18n: contextvars.ContextVar[TranslatorRunner | None] = contextvars.ContextVar("current_i18n", default=None)
+
 class TranslatorRunnerMiddleware(BaseMiddleware):
     async def __call__(
         self,
@@ -32,4 +36,8 @@ class TranslatorRunnerMiddleware(BaseMiddleware):
 
         data["i18n"] = hub.get_translator_by_locale(lang)
 
-        return await handler(event, data)
+        token = current_i18n.set(data["i18n"])
+        try:
+            return await handler(event, data)
+        finally:
+            current_i18n.reset(token)
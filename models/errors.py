@@ -16,6 +16,8 @@ class ErrorCode(Enum):
     PRIVATE_CONTENT = "E008"      # Приватный контент (требуется авторизация)
     REGION_RESTRICTED = "E009"    # Ограничено по региону (geoblock)
     SEND_ERROR = "E010"           # Ошибка отправки медиа в Telegram
+    BUSY = "E011"                 # Очередь переполнена, загрузка не принята
+    SERVICE_UNAVAILABLE = "E012"  # Бэкенд недоступен, предохранитель разомкнут
     PREVIEW_ONLY = "PREVIEW_ONLY" # Скачалось только превью (30 сек)
 
 
@@ -29,6 +31,7 @@ class BotError(Exception):
     critical: bool = False # Send to owner?
     is_logged: bool = False # Need to be logged?
     send_user_message: bool = True # Send error message to user?
+    retryable: bool = False # Temporary (timeout, 5xx): a queued job may be retried
 
     def __str__(self):
         return f"[{self.code.value}] {self.message or 'No message'}" + (f" (URL: {self.url})" if self.url else "")
@@ -24,7 +24,7 @@ from fluentogram import TranslatorRunner
 # Service Regexes & Utils
 from modules.services.twitter.handler import TWITTER_REGEX, get_cache_key as twitter_cache_key
 
-from modules.services.instagram.handler import INSTAGRAM_REGEX
+from modules.services.instagram.handler import INSTAGRAM_REGEX, get_cache_key as instagram_cache_key
 
 from modules.services.pinterest.handler import PINTEREST_REGEX, get_cache_key as pinterest_cache_key
 
@@ -42,57 +42,15 @@ from modules.services.deezer.handler import DEEZER_REGEX
 
 from modules.services.apple_music.handler import APPLE_REGEX as APPLE_MUSIC_REGEX
 
-
-def apple_music_cache_key(url: str) -> str | None:
-    patterns = [
-        r"music\.apple\.com/[a-z]{2}/song/(?:[^/]+/)?(?P<id>\d+)",
-        r"music\.apple\.com/[a-z]{2}/album/(?:[^/]+/)?\d+.*?[?&]i=(?P<id>\d+)",
-    ]
-    for pattern in patterns:
-        if m := re.search(pattern, url):
-            return f"apple:{int(m.group('id'))}"
-    return None
-
-
-def spotify_cache_key(url: str) -> str | None:
-    match = re.search(r"/track/([\w-]+)", url)
-    if match:
-        return f"spotify:{match.group(1)}"
-    return None
-
-
-def deezer_cache_key(url: str) -> str | None:
-    match = re.search(r"/track/(\d+)", url)
-    if match:
-        return f"deezer:{match.group(1)}"
-    return None
-
-
-def soundcloud_cache_key(url: str) -> str | None:
-    match = re.search(r"soundcloud\.com/([^/?#]+/[^/?#]+)", url)
-    if match:
-        return f"sc:{match.group(1)}"
-    if "on.soundcloud.com" in url:
-        clean_url = url.split('?')[0].rstrip('/')
-        hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
-        return f"sc:{hashed}"
-    return None
-
-
-def ytmusic_cache_key(url: str, format_choice: str = None) -> str | None:
-    match = re.search(r"v=([\w-]+)", url)
-    if match:
-        return f"ytmusic:{match.group(1)}"
-    return None
-
-
-def instagram_cache_key(url: str) -> str | None:
-    match = re.search(r"/(?:p|reels?|tv)/([A-Za-z0-9_-]+)", url)
-    if match:
-        return f"ig:{match.group(1)}"
-    clean_url = url.split('?')[0].rstrip('/')
-    hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
-    return f"ig:{hashed}"
+from models.service_list import Services
+from utils.track_index import (
+    apple_music_track_key as apple_music_cache_key,
+    deezer_track_key as deezer_cache_key,
+    lookup_track,
+    soundcloud_track_key as soundcloud_cache_key,
+    spotify_track_key as spotify_cache_key,
+    ytmusic_track_key,
+)
 
 
 inline_router = Router(name="inline_handler")
@@ -101,6 +59,14 @@ logger = logging.getLogger(__name__)
 
 FAST_TRACK_SERVICES = []
 
+MUSIC_SERVICES = {
+    "ytmusic": Services.YTMUSIC,
+    "soundcloud": Services.SOUNDCLOUD,
+    "spotify": Services.SPOTIFY,
+    "deezer": Services.DEEZER,
+    "apple_music": Services.APPLE_MUSIC,
+}
+
 @inline_router.inline_query(F.query.regexp(r"^https?://"))
 async def inline_media_handler(inline_query: InlineQuery, config: Config, db_session: AsyncSession, i18n: TranslatorRunner):
     url = inline_query.query.strip()
@@ -121,7 +87,8 @@ async def inline_media_handler(inline_query: InlineQuery, config: Config, db_ses
         cache_key = pinterest_cache_key(url)
     elif re.match(INSTAGRAM_REGEX, url):
         service_name = "instagram"
-        cache_key = instagram_cache_key(url)
+        # Без тарифа: ig:X ведёт и на версию для спонсоров через alias
+        cache_key = instagram_cache_key(url, sponsor=False)
     elif re.match(TIKTOK_REGEX, url):
         service_name = "tiktok"
         cache_key = tiktok_cache_key(url)
@@ -130,7 +97,7 @@ async def inline_media_handler(inline_query: InlineQuery, config: Config, db_ses
         cache_key = youtube_cache_key(url, "default")
     elif re.match(YTMUSIC_REGEX, url):
         service_name = "ytmusic"
-        cache_key = ytmusic_cache_key(url, "default")
+        cache_key = ytmusic_track_key(url)
     elif re.match(SOUNDCLOUD_REGEX, url):
         service_name = "soundcloud"
         cache_key = soundcloud_cache_key(url)
@@ -149,7 +116,17 @@ async def inline_media_handler(inline_query: InlineQuery, config: Config, db_ses
 
     try:
         # 1. ПРОВЕРЯЕМ КЭШ (Для ВСЕХ сервисов - это бесплатно)
-        cached_dto = await get_media_cache(db_session, cache_key)
+        if service_name in MUSIC_SERVICES:
+            # Музыка лежит в кеше по ISRC, ссылку переводим через индекс треков
+            track = await lookup_track(db_session, url, MUSIC_SERVICES[service_name])
+            cached_dto = None
+            if track:
+                cached_dto = (
+                    await get_media_cache(db_session, f"{track['isrc']}:lossless")
+                    or await get_media_cache(db_session, f"{track['isrc']}:default")
+                )
+        else:
+            cached_dto = await get_media_cache(db_session, cache_key)
         media_items = []
 
         if cached_dto:
@@ -1,5 +1,4 @@
 import logging
-import asyncio
 
 from aiogram import Router, F, Bot
 from aiogram.types import LabeledPrice, Message, PreCheckoutQuery
@@ -32,7 +31,7 @@ async def video_pre_checkout(pre_checkout_query: PreCheckoutQuery):
     parts = payload.split("_")
     if len(parts) >= 4:
         url_hash = parts[1]
-        url = get_url(url_hash)
+        url = await get_url(url_hash)
         if not url:
             await pre_checkout_query.answer(ok=False, error_message="Link expired. Please request the download again.")
             return
@@ -82,7 +81,7 @@ async def video_successful_payment(message: Message, bot: Bot, db_session: Async
             await update_payment_status(db_session, payment.telegram_payment_charge_id, "refunded")
             return
 
-        url = get_url(url_hash)
+        url = await get_url(url_hash)
         if not url:
             logger.error(f"URL expired for hash: {url_hash}")
             await message.answer("⚠️ Error: Link expired. Please try again.")
@@ -95,17 +94,17 @@ async def video_successful_payment(message: Message, bot: Bot, db_session: Async
 
         await message.answer("✅ Thank you for supporting Charlotte! Starting download...")
 
-        from modules.services.youtube.handler import process_youtube_download
-        
-        asyncio.create_task(process_youtube_download(
+        from modules.services.youtube.handler import enqueue_youtube_download
+
+        # В очереди задача переживёт рестарт: оплаченная загрузка не потеряется
+        await enqueue_youtube_download(
             message=message,
             url=url,
             target_height=target_height,
             is_audio_only=is_audio_only,
             user_id=message.from_user.id,
-            db_session=db_session,
             payment_charge_id=payment.telegram_payment_charge_id
-        ))
+        )
 
     except Exception as e:
         logger.error(f"Error processing payment payload: {e}")
@@ -3,8 +3,7 @@ from pathlib import Path
 
 import httpx
 from aiogram import F, Router
-from aiogram.enums import ParseMode
-from aiogram.types import FSInputFile, Message
+from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from fluentogram import TranslatorRunner
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,8 +16,15 @@ from models.media_cache import MediaCacheDTO, CacheMetadata
 from senders.media_sender import MediaSender
 from storage.db.crud import get_chat_settings, get_user_settings, get_media_cache, upsert_media_cache
 from tasks.task_manager import task_manager
-from utils import delete_files, handle_lossless_response
+from utils import handle_lossless_response
+from utils.lossless_availability import (
+    get_lossless_unavailable,
+    mark_lossless_unavailable,
+    remember_lossless_failure,
+)
+from utils.photo_cache import send_cover_photo
 from utils.statistics_helper import log_download_event
+from utils.track_index import resolve_track_metadata
 
 apple_router = Router(name="applemusic")
 logger = logging.getLogger(__name__)
@@ -82,6 +88,14 @@ async def process_track(
     current_lossless = lossless_mode
     search_query = f"{track_meta['artist']} - {track_meta['title']}"
 
+    if current_lossless:
+        unavailable = await get_lossless_unavailable(isrc)
+        if unavailable:
+            logger.info(
+                f"Lossless known unavailable for {isrc} ({unavailable['reason']}), using standard quality"
+            )
+            current_lossless = False
+
     if current_lossless:
         try:
             payload = {"isrc": isrc, "search_query": search_query, "lossless": True}
@@ -89,6 +103,7 @@ async def process_track(
                 track_data = await task_manager.run_download(
                     user_id=chat_id,
                     url=original_url,
+                    backend="lossless-core/download",
                     coro=fetch_core_download(http_client, payload, original_url),
                 )
         except BotError as e:
@@ -97,6 +112,7 @@ async def process_track(
             logger.info(
                 f"Lossless unavailable for {isrc}, falling back to standard quality"
             )
+            await remember_lossless_failure(isrc, e)
             current_lossless = False
 
     if not current_lossless:
@@ -116,6 +132,7 @@ async def process_track(
             track_data = await task_manager.run_download(
                 user_id=chat_id,
                 url=original_url,
+                backend="lossless-core/download",
                 coro=fetch_core_download(http_client, payload, original_url),
             )
 
@@ -130,6 +147,8 @@ async def process_track(
     )
 
     download_type = track_data.get("download_type", "standard")
+    if current_lossless and download_type != "lossless":
+        await mark_lossless_unavailable(isrc, "downgraded")
     final_cache_key = (
         cache_key_lossless if download_type == "lossless" else cache_key_default
     )
@@ -165,10 +184,7 @@ async def apple_handler(
     lossless_mode = settings.services.applemusic.lossless if settings else False
 
     async with ChatActionSender.choose_sticker(bot=message.bot, chat_id=chat_id):
-        response = await http_client.post(
-            "http://lossless-core:7856/metadata", json={"url": url}
-        )
-        metadata = handle_lossless_response(response, url, Services.APPLE_MUSIC)
+        metadata = await resolve_track_metadata(db_session, http_client, url, Services.APPLE_MUSIC)
 
     if metadata["type"] == "song":
         await process_track(
@@ -191,25 +207,9 @@ async def apple_handler(
             text += i18n.get("release-date", date=metadata["release_date"]) + "\n"
 
         if metadata["cover"]:
-            cover_path = f"storage/temp/apple_album_{metadata['id']}.png"
-            try:
-                res = await http_client.post(
-                    "http://media-core:9546/tools/download-image",
-                    json={
-                        "url": metadata["cover"],
-                        "destination": cover_path
-                    },
-                    timeout=30.0
-                )
-                if res.status_code == 200:
-                    await message.answer_photo(
-                        photo=FSInputFile(cover_path), caption=text, parse_mode=ParseMode.HTML
-                    )
-                    await delete_files([cover_path])
-                else:
-                    logger.error(f"Failed to download cover via media-core: status={res.status_code}")
-            except Exception as e:
-                logger.error(f"Failed to download cover via media-core: {e}")
+            await send_cover_photo(
+                message, http_client, metadata["cover"], f"storage/temp/apple_album_{metadata['id']}.png", text
+            )
 
         await message.reply(i18n.get("downloading-tracks"))
 
@@ -10,13 +10,15 @@ from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
 from senders.media_sender import MediaSender
-from storage.db.crud import get_media_cache, check_if_user_premium
+from storage.db.crud import add_media_cache_aliases, get_media_cache, check_if_user_premium
 from tasks.task_manager import task_manager
 from utils import truncate_string, escape_html
+from utils.media_identity import canonical_url
 from utils.statistics_helper import log_download_event
 
 insta_router = Router(name="instagram")
@@ -49,6 +51,7 @@ async def instagram_handler(message: Message, db_session: AsyncSession, http_cli
         res = await task_manager.run_download(
             user_id=user_id,
             url=url,
+            backend="media-core/download/instagram",
             coro=http_client.post(
                 "http://media-core:9546/download/instagram", json=payload,
             ),
@@ -95,7 +98,7 @@ async def instagram_handler(message: Message, db_session: AsyncSession, http_cli
                 is_logged=True,
                 critical=True,
             )
-        metadata = res.json()["data"]
+        metadata = response_json(res)["data"]
 
         author_username = metadata.get('author_username')
         description = escape_html((metadata.get('caption') or "").strip())
@@ -120,6 +123,9 @@ async def instagram_handler(message: Message, db_session: AsyncSession, http_cli
 
     if media_content:
         await send_manager.send(message, media_content, service="instagram", cache_key=cache_key, db_session=db_session)
+        if sponsor:
+            # Версия для спонсоров годится всем: ig:X ведёт на ig:X:sponsor, пока у ig:X нет своей записи
+            await add_media_cache_aliases(db_session, cache_key, [get_cache_key(url, sponsor=False)])
 
 
 def get_cache_key(url: str, sponsor: bool) -> str:
@@ -132,7 +138,7 @@ def get_cache_key(url: str, sponsor: bool) -> str:
             return f"ig:{match.group(1)}"
 
     # Fallback for other formats, but at least strip query parameters
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     if sponsor:
         return f"ig:{hashed}:sponsor"
@@ -10,13 +10,15 @@ from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
 from senders.media_sender import MediaSender
-from storage.db.crud import get_media_cache
+from storage.db.crud import add_media_cache_aliases, get_media_cache
 from tasks.task_manager import task_manager
 from utils import escape_html, truncate_string
+from utils.media_identity import canonical_url, identify_media
 from utils.statistics_helper import log_download_event
 
 pinterest_router = Router(name="pinterest")
@@ -26,19 +28,6 @@ logger = logging.getLogger(__name__)
 PINTEREST_REGEX = r"https?://(?:www\.)?(?:pinterest\.com/[\w/-]+|pin\.it/[A-Za-z0-9]+)"
 
 
-async def resolve_pinterest_url(url: str) -> str:
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            }
-            res = await client.get(url, headers=headers, follow_redirects=True, timeout=10)
-            return str(res.url)
-    except Exception as e:
-        logger.warning(f"Failed to resolve Pinterest URL {url}: {e}")
-        return url
-
-
 @pinterest_router.message(F.text.regexp(PINTEREST_REGEX))
 async def pinterest_handler(message: Message, db_session: AsyncSession, http_client: httpx.AsyncClient):
     url = message.text
@@ -46,18 +35,19 @@ async def pinterest_handler(message: Message, db_session: AsyncSession, http_cli
 
     async with ChatActionSender.choose_sticker(bot=message.bot, chat_id=message.chat.id):
         send_manager = MediaSender()
-        resolved_url = await resolve_pinterest_url(url)
+        # pin.it/X раскрывается один раз (ответ в Redis), ключ короткой ссылки становится alias pin:{id}
+        identity = await identify_media(url, get_cache_key)
+        resolved_url = identity.url
         pin_id = None
         match = re.search(r"/pin/(\d+)", resolved_url)
         if match:
             pin_id = match.group(1)
 
-        cache_key = f"pin:{pin_id}" if pin_id else None
-        if cache_key:
-            cached = await cache_check(db_session, cache_key)
-            if cached:
-                await send_manager.send(message, cached, service="pinterest", db_session=db_session)
-                return
+        cached = await cache_check(db_session, identity.cache_key)
+        if cached:
+            await send_manager.send(message, cached, service="pinterest", db_session=db_session)
+            await add_media_cache_aliases(db_session, identity.cache_key, identity.aliases)
+            return
 
     async with ChatActionSender.record_video_note(bot=message.bot, chat_id=message.chat.id):
         payload = {
@@ -66,6 +56,7 @@ async def pinterest_handler(message: Message, db_session: AsyncSession, http_cli
         res = await task_manager.run_download(
             user_id=user_id,
             url=url,
+            backend="media-core/download/pinterest",
             coro=http_client.post(
                 "http://media-core:9546/download/pinterest", json=payload,
             ),
@@ -142,7 +133,7 @@ async def pinterest_handler(message: Message, db_session: AsyncSession, http_cli
                 critical=True,
             )
 
-        metadata = res.json()["data"]
+        metadata = response_json(res)["data"]
 
         if metadata.get("type") == "multi":
             for i, sub_pin in enumerate(metadata.get('items', [])):
@@ -207,6 +198,10 @@ async def pinterest_handler(message: Message, db_session: AsyncSession, http_cli
 
             if media_content:
                 await send_manager.send(message, media_content, service="pinterest", cache_key=final_cache_key, db_session=db_session)
+                if final_cache_key:
+                    await add_media_cache_aliases(
+                        db_session, final_cache_key, [*identity.aliases, identity.cache_key]
+                    )
 
 
 def get_cache_key(url: str) -> str:
@@ -214,7 +209,7 @@ def get_cache_key(url: str) -> str:
     if match:
         return f"pin:{match.group(1)}"
 
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     return f"pin:{hashed}"
 
@@ -10,6 +10,7 @@ from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
@@ -17,6 +18,7 @@ from senders.media_sender import MediaSender
 from storage.db.crud import get_media_cache, check_if_user_premium, get_chat_settings
 from tasks.task_manager import task_manager
 from utils import escape_html, truncate_string
+from utils.media_identity import canonical_url
 from utils.statistics_helper import log_download_event
 
 pixiv_router = Router(name="pixiv")
@@ -84,6 +86,7 @@ async def pixiv_handler(
             res = await task_manager.run_download(
                 user_id=user_id,
                 url=url,
+                backend="media-core/download/pixiv",
                 coro=http_client.post(
                     "http://media-core:9546/download/pixiv", json=payload,
                 ),
@@ -160,7 +163,7 @@ async def pixiv_handler(
                     critical=True,
                 )
 
-            metadata = res.json()["data"]
+            metadata = response_json(res)["data"]
 
             # Check NSFW status from response
             is_nsfw = (
@@ -249,7 +252,7 @@ def get_cache_key(url: str) -> str:
     if match:
         return f"px:{match.group(1)}"
 
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     return f"px:{hashed}"
 
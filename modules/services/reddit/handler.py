@@ -10,13 +10,15 @@ from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
 from senders.media_sender import MediaSender
-from storage.db.crud import get_media_cache, check_if_user_premium, get_chat_settings
+from storage.db.crud import add_media_cache_aliases, get_media_cache, check_if_user_premium, get_chat_settings
 from tasks.task_manager import task_manager
 from utils import escape_html, truncate_string
+from utils.media_identity import canonical_url, identify_media
 from utils.statistics_helper import log_download_event
 
 reddit_router = Router(name="reddit")
@@ -39,18 +41,15 @@ async def reddit_handler(
     chat_id = message.chat.id
     user_id = message.from_user.id
 
-    if "/s/" in url:
-        try:
-            res = await http_client.head(url, follow_redirects=True, timeout=5.0)
-            url = str(res.url)
-        except Exception:
-            pass
+    # reddit.com/r/X/s/Y раскрывается один раз (ответ в Redis), её ключ становится alias rd:{id}
+    identity = await identify_media(url, get_cache_key)
+    url = identity.url
 
     sponsor = await check_if_user_premium(db_session, user_id)
 
     async with ChatActionSender.choose_sticker(bot=message.bot, chat_id=chat_id):
         send_manager = MediaSender()
-        cache_key = get_cache_key(url)
+        cache_key = identity.cache_key
 
         allow_nsfw = True
         if chat_id < 0:
@@ -80,6 +79,7 @@ async def reddit_handler(
                         critical=False
                     )
             await send_manager.send(message, cached, service="reddit", db_session=db_session)
+            await add_media_cache_aliases(db_session, cache_key, identity.aliases)
             return
 
     async with ChatActionSender.record_video_note(bot=message.bot, chat_id=chat_id):
@@ -91,6 +91,7 @@ async def reddit_handler(
         res = await task_manager.run_download(
             user_id=user_id,
             url=url,
+            backend="media-core/download/reddit",
             coro=http_client.post(
                 "http://media-core:9546/download/reddit", json=payload,
             ),
@@ -167,7 +168,7 @@ async def reddit_handler(
                 critical=True,
             )
 
-        metadata = res.json()["data"]
+        metadata = response_json(res)["data"]
 
         # Check NSFW status from response
         is_nsfw = (
@@ -248,6 +249,7 @@ async def reddit_handler(
 
     if media_content:
         await send_manager.send(message, media_content, service="reddit", cache_key=cache_key, db_session=db_session)
+        await add_media_cache_aliases(db_session, cache_key, identity.aliases)
 
 
 def get_cache_key(url: str) -> str:
@@ -255,7 +257,7 @@ def get_cache_key(url: str) -> str:
     if match:
         return f"rd:{match.group(1)}"
 
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     return f"rd:{hashed}"
 
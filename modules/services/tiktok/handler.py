@@ -10,13 +10,15 @@ from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
 from senders.media_sender import MediaSender
-from storage.db.crud import get_media_cache
+from storage.db.crud import add_media_cache_aliases, get_media_cache
 from tasks.task_manager import task_manager
 from utils import escape_html, truncate_string
+from utils.media_identity import canonical_url, identify_media
 from utils.statistics_helper import log_download_event
 
 tiktok_router = Router(name="tiktok")
@@ -32,20 +34,24 @@ async def tiktok_handler(message: Message, db_session: AsyncSession, http_client
 
     async with ChatActionSender.choose_sticker(bot=message.bot, chat_id=message.chat.id):
         send_manager = MediaSender()
-        cache_key = get_cache_key(url)
+        # vm.tiktok.com/X раскрывается в ссылку с id видео, ключ короткой ссылки становится alias
+        identity = await identify_media(url, get_cache_key)
+        cache_key = identity.cache_key
 
         cached = await cache_check(db_session, cache_key)
         if cached:
             await send_manager.send(message, cached, service="tiktok", db_session=db_session)
+            await add_media_cache_aliases(db_session, cache_key, identity.aliases)
             return
 
     async with ChatActionSender.record_video_note(bot=message.bot, chat_id=message.chat.id):
         payload = {
-            "url": url,
+            "url": identity.url,
         }
         res = await task_manager.run_download(
             user_id=user_id,
             url=url,
+            backend="media-core/download/tiktok",
             coro=http_client.post(
                 "http://media-core:9546/download/tiktok", json=payload,
             ),
@@ -92,7 +98,7 @@ async def tiktok_handler(message: Message, db_session: AsyncSession, http_client
                 is_logged=True,
                 critical=True,
             )
-        metadata = res.json()["data"]
+        metadata = response_json(res)["data"]
 
         author_username = metadata.get('author_username')
         description = escape_html((metadata.get('caption') or "").strip())
@@ -131,6 +137,7 @@ async def tiktok_handler(message: Message, db_session: AsyncSession, http_client
 
     if media_content:
         await send_manager.send(message, media_content, service="tiktok", cache_key=cache_key, db_session=db_session)
+        await add_media_cache_aliases(db_session, cache_key, identity.aliases)
 
 
 def get_cache_key(url: str) -> str:
@@ -138,7 +145,7 @@ def get_cache_key(url: str) -> str:
     if match:
         return f"tt:{match.group(1)}"
 
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     return f"tt:{hashed}"
 
@@ -11,6 +11,7 @@ from aiogram.utils.chat_action import ChatActionSender
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import Config
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
@@ -18,6 +19,7 @@ from senders.media_sender import MediaSender
 from storage.db.crud import get_media_cache, check_if_user_premium, get_chat_settings
 from tasks.task_manager import task_manager
 from utils import escape_html, truncate_string
+from utils.media_identity import canonical_url
 from utils.statistics_helper import log_download_event
 
 twitter_router = Router(name="twitter")
@@ -86,6 +88,7 @@ async def twitter_handler(
         res = await task_manager.run_download(
             user_id=user_id,
             url=url,
+            backend="media-core/download/twitter",
             coro=http_client.post(
                 "http://media-core:9546/download/twitter", json=payload,
             ),
@@ -162,7 +165,7 @@ async def twitter_handler(
                 critical=True,
             )
 
-        metadata = res.json()["data"]
+        metadata = response_json(res)["data"]
 
         # Check NSFW status from response
         is_nsfw = (
@@ -238,7 +241,7 @@ def get_cache_key(url: str) -> str:
     if match:
         return f"tw:{match.group(1)}"
 
-    clean_url = url.split('?')[0].rstrip('/')
+    clean_url = canonical_url(url)
     hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     return f"tw:{hashed}"
 
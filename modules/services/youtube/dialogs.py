@@ -1,5 +1,5 @@
-import logging
 import asyncio
+import logging
 import re
 from typing import Any
 
@@ -13,10 +13,10 @@ from aiogram_dialog.widgets.text import Format
 from aiogram_dialog.widgets.kbd import Button, Row, Group, Select, SwitchTo
 from aiogram_dialog.widgets.input import TextInput
 from fluentogram import TranslatorRunner
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.youtube import YouTubeDialogStates
 from utils import format_duration
+from .prefetch import choice_token, youtube_prefetch
 from .utils import parse_time_range
 
 logger = logging.getLogger(__name__)
@@ -213,7 +213,7 @@ async def trigger_download(
     size_mb: float = 0.0,
     is_topich: bool = False
 ):
-    from .handler import process_youtube_download
+    from .handler import enqueue_youtube_download
     start_data = dialog_manager.start_data or {}
     url = start_data["url"]
     url_hash = start_data["url_hash"]
@@ -236,12 +236,19 @@ async def trigger_download(
         target_message = dialog_msg
 
     i18n: TranslatorRunner = middleware_data.get("i18n")
-    db_session: AsyncSession = middleware_data.get("db_session")
 
     is_premium = start_data.get("is_premium", False)
 
+    if not is_topich:
+        await youtube_prefetch.record_choice(
+            user_id, choice_token(height, is_audio, start_data.get("options", []))
+        )
+
     if size_mb > 100 and not is_premium:
+        youtube_prefetch.discard(user_id, stat="miss")
         from modules.payment.video import PaymentService
+        from utils.url_cache import extend_url, PAYMENT_TTL
+        await extend_url(url_hash, PAYMENT_TTL)
         payload = f"yt_{url_hash}_{height}_{1 if is_audio else 0}"
         invoice_params = await PaymentService.create_single_download_invoice(
             chat_id=target_message.chat.id,
@@ -265,16 +272,33 @@ async def trigger_download(
             logger.warning("Failed to delete dialog message %s: %s", dialog_msg.message_id, e)
     await dialog_manager.done()
 
-    asyncio.create_task(process_youtube_download(
+    prefetched = None if is_topich else youtube_prefetch.take(user_id, url, height, is_audio)
+    if prefetched is None:
+        youtube_prefetch.discard(user_id, stat="miss")
+    else:
+        # Угадали: файл качается (или уже скачан) в этом процессе, очередь не нужна
+        from .handler import process_youtube_download
+        asyncio.create_task(process_youtube_download(
+            message=target_message,
+            url=url,
+            target_height=height,
+            is_audio_only=is_audio,
+            user_id=user_id,
+            db_session=None,
+            i18n=i18n,
+            is_topich=is_topich,
+            prefetched=prefetched,
+        ))
+        return
+
+    await enqueue_youtube_download(
         message=target_message,
         url=url,
         target_height=height,
         is_audio_only=is_audio,
         user_id=user_id,
-        db_session=db_session,
-        i18n=i18n,
         is_topich=is_topich
-    ))
+    )
 
 
 async def on_simple_video(c: CallbackQuery, button: Button, manager: DialogManager):
@@ -326,6 +350,7 @@ async def on_cancel_click(c: CallbackQuery, button: Button, manager: DialogManag
             await c.message.delete()
         except TelegramBadRequest as e:
             logger.warning("Failed to delete dialog message %s: %s", c.message.message_id, e)
+    youtube_prefetch.discard(c.from_user.id, stat="miss")
     await manager.done()
     await c.answer()
 
@@ -348,6 +373,8 @@ async def on_toggle_trim(c: CallbackQuery, button: Button, manager: DialogManage
 async def on_advanced_continue(c: CallbackQuery, button: Button, manager: DialogManager):
     trim_active = manager.dialog_data.get("trim_active", False)
     if trim_active:
+        # Обрезка качается отдельным клипом, угаданный полный файл не пригодится
+        youtube_prefetch.discard(c.from_user.id, stat="miss")
         await manager.switch_to(YouTubeDialogStates.trim_input)
         await c.answer()
     else:
@@ -380,7 +407,6 @@ async def on_trim_input_success(m: Message, widget: Any, manager: DialogManager,
     dialog_data = manager.dialog_data
     middleware_data = manager.middleware_data
     i18n: TranslatorRunner = middleware_data.get("i18n")
-    db_session: AsyncSession = middleware_data.get("db_session")
 
     url = start_data["url"]
     duration = start_data.get("duration", 0)
@@ -411,10 +437,12 @@ async def on_trim_input_success(m: Message, widget: Any, manager: DialogManager,
             return
 
     await manager.done()
+    user_id = m.from_user.id if m.from_user else 0
+    youtube_prefetch.discard(user_id, stat="miss")
 
-    from .handler import process_clip_download
+    from .handler import enqueue_clip_download
     process_message = await m.reply(i18n.get("yt-trim-processing"))
-    asyncio.create_task(process_clip_download(
+    await enqueue_clip_download(
         message=m,
         process_message=process_message,
         url=url,
@@ -422,10 +450,8 @@ async def on_trim_input_success(m: Message, widget: Any, manager: DialogManager,
         is_audio_only=is_audio_only,
         start_time=start_formatted,
         end_time=end_formatted,
-        user_id=m.from_user.id if m.from_user else 0,
-        db_session=db_session,
-        i18n=i18n
-    ))
+        user_id=user_id,
+    )
 
 
 async def get_trim_input_data(dialog_manager: DialogManager, **kwargs) -> dict[str, Any]:
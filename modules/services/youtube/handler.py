@@ -1,6 +1,6 @@
+import asyncio
 import logging
 import httpx
-import asyncio
 from pathlib import Path
 from typing import Any
 
@@ -13,26 +13,31 @@ from aiogram.filters import StateFilter
 from fluentogram import TranslatorRunner
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.media import MediaContent, MediaType
 from models.service_list import Services
 from senders.media_sender import MediaSender
 from states.youtube import YouTubeStates, YouTubeDialogStates
-from storage.db.crud import get_user
+from storage.db.crud import add_media_cache_aliases, get_user
+from tasks.core_jobs import CoreJobTransport
+from tasks.job_queue import DownloadJob, job_queue
 from tasks.task_manager import task_manager
 from utils import format_duration, truncate_string
 from utils.statistics_helper import log_download_event
 from aiogram_dialog import DialogManager
 from .dialogs import youtube_dialog
 
+from .metadata_cache import is_stale_format, youtube_metadata_cache
 from .models import YoutubeMenuCallback, YoutubeQualityCallback
+from .prefetch import MAX_SIZE_MB, youtube_prefetch
 from .utils import get_cache_key, cache_check, parse_time_range
 
 youtube_router = Router(name="youtube")
 youtube_router.include_router(youtube_dialog)
 logger = logging.getLogger(__name__)
 
-YOUTUBE_REGEX = r"https?://(?:www\.)?(?:m\.)?(?:youtu\.be/|youtube\.com/(?:shorts/|watch\?v=))([\w-]+)"
+YOUTUBE_REGEX = r"https?://(?:www\.)?(?:m\.)?(?:youtu\.be/|youtube\.com/(?:shorts/|live/|embed/|watch\?(?:[^\s#]*&)?v=))([\w-]+)"
 
 
 def handle_youtube_api_errors(res: httpx.Response, url: str):
@@ -41,7 +46,7 @@ def handle_youtube_api_errors(res: httpx.Response, url: str):
 
     err_msg = ""
     try:
-        data = res.json()
+        data = response_json(res)
         if isinstance(data, dict):
             err_msg = data.get("message", "")
     except Exception:
@@ -100,11 +105,18 @@ def handle_youtube_api_errors(res: httpx.Response, url: str):
         service=Services.YOUTUBE,
         message=f"Server error ({res.status_code}): {err_msg}",
         is_logged=True,
-        critical=res.status_code >= 500
+        critical=res.status_code >= 500,
+        retryable=res.status_code >= 500
     )
 
 
 async def get_youtube_metadata(http_client: httpx.AsyncClient, url: str) -> dict:
+    return await youtube_metadata_cache.get_or_fetch(
+        url, lambda: _fetch_youtube_metadata(http_client, url)
+    )
+
+
+async def _fetch_youtube_metadata(http_client: httpx.AsyncClient, url: str) -> dict:
     payload = {"url": url}
     try:
         res = await http_client.post(
@@ -112,6 +124,8 @@ async def get_youtube_metadata(http_client: httpx.AsyncClient, url: str) -> dict
             json=payload,
             timeout=30.0
         )
+    except BotError:
+        raise  # Предохранитель бэкенда разомкнут
     except Exception as e:
         logger.error(f"Failed to fetch YouTube metadata from media-core: {e}")
         raise BotError(
@@ -125,7 +139,7 @@ async def get_youtube_metadata(http_client: httpx.AsyncClient, url: str) -> dict
 
     handle_youtube_api_errors(res, url)
 
-    res_json = res.json()
+    res_json = response_json(res)
     if res_json.get("status") != "success" or "data" not in res_json:
         raise BotError(
             code=ErrorCode.NOT_FOUND,
@@ -193,6 +207,8 @@ async def download_youtube_full(
             json=payload,
             timeout=600.0
         )
+    except BotError:
+        raise  # Предохранитель бэкенда разомкнут
     except Exception as e:
         logger.error(f"Failed to download full YouTube media: {e}")
         raise BotError(
@@ -201,12 +217,16 @@ async def download_youtube_full(
             service=Services.YOUTUBE,
             message=f"Failed to connect to media-core: {e}",
             is_logged=True,
-            critical=True
+            critical=True,
+            retryable=isinstance(e, httpx.TransportError)
         )
 
+    if is_stale_format(res):
+        # Форматы из закешированных метаданных устарели, следующий диалог запросит их заново
+        await youtube_metadata_cache.invalidate(url)
     handle_youtube_api_errors(res, url)
 
-    res_json = res.json()
+    res_json = response_json(res)
     if res_json.get("status") != "success" or "data" not in res_json:
         raise BotError(
             code=ErrorCode.INTERNAL_ERROR,
@@ -252,6 +272,8 @@ async def download_youtube_clip(
             json=payload,
             timeout=600.0
         )
+    except BotError:
+        raise  # Предохранитель бэкенда разомкнут
     except Exception as e:
         logger.error(f"Failed to download YouTube clip: {e}")
         raise BotError(
@@ -260,12 +282,16 @@ async def download_youtube_clip(
             service=Services.YOUTUBE,
             message=f"Failed to connect to media-core: {e}",
             is_logged=True,
-            critical=True
+            critical=True,
+            retryable=isinstance(e, httpx.TransportError)
         )
 
+    if is_stale_format(res):
+        # Форматы из закешированных метаданных устарели, следующий диалог запросит их заново
+        await youtube_metadata_cache.invalidate(url)
     handle_youtube_api_errors(res, url)
 
-    res_json = res.json()
+    res_json = response_json(res)
     if res_json.get("status") != "success" or "data" not in res_json:
         raise BotError(
             code=ErrorCode.INTERNAL_ERROR,
@@ -308,9 +334,8 @@ async def youtube_handler(
             await process_message.delete()
             raise e
 
-    from utils.url_cache import store_url, url_hash
-    store_url(url)
-    h = url_hash(url)
+    from utils.url_cache import store_url
+    h = await store_url(url)
 
     from storage.db.crud import get_user_settings
     user_id = message.from_user.id
@@ -349,6 +374,9 @@ async def youtube_handler(
         mode=StartMode.RESET_STACK
     )
 
+    # Пока пользователь выбирает, начинаем качать самый вероятный вариант
+    await youtube_prefetch.maybe_start(user_id, url, ui_mode, metadata, is_premium)
+
 
 async def send_mode_selection_menu(
     message_or_query: Message | CallbackQuery,
@@ -529,15 +557,13 @@ async def menu_callback_handler(
         await state.clear()
         await message.delete()
 
-        asyncio.create_task(process_youtube_download(
+        await enqueue_youtube_download(
             message=message.reply_to_message or message,
             url=url,
             target_height=0,
             is_audio_only=is_audio,
             user_id=user_id,
-            db_session=db_session,
-            i18n=i18n
-        ))
+        )
         await callback_query.answer(i18n.get('starting-download'))
 
 
@@ -581,6 +607,8 @@ async def quality_callback_handler(
 
         if callback_data.size_mb > 100 and not is_premium:
             from modules.payment.video import PaymentService
+            from utils.url_cache import extend_url, PAYMENT_TTL
+            await extend_url(url_hash, PAYMENT_TTL)
             payload = f"yt_{url_hash}_{callback_data.height}_{1 if is_audio else 0}"
 
             invoice_params = await PaymentService.create_single_download_invoice(
@@ -599,15 +627,13 @@ async def quality_callback_handler(
         await state.clear()
         await message.delete()
 
-        asyncio.create_task(process_youtube_download(
+        await enqueue_youtube_download(
             message=message.reply_to_message or message,
             url=url,
             target_height=callback_data.height,
             is_audio_only=is_audio,
             user_id=user_id,
-            db_session=db_session,
-            i18n=i18n
-        ))
+        )
         await callback_query.answer(i18n.get('starting-download'))
 
 
@@ -648,7 +674,7 @@ async def time_range_message_handler(
 
     process_message = await message.reply(i18n.get("yt-trim-processing"))
 
-    asyncio.create_task(process_clip_download(
+    await enqueue_clip_download(
         message=message,
         process_message=process_message,
         url=url,
@@ -657,9 +683,53 @@ async def time_range_message_handler(
         start_time=start_formatted,
         end_time=end_formatted,
         user_id=user_id,
-        db_session=db_session,
-        i18n=i18n
-    ))
+    )
+
+
+async def _resolve_i18n(db_session: AsyncSession, user_id: int) -> TranslatorRunner | None:
+    """Переводчик по языку пользователя: задачам из очереди его не передают"""
+    try:
+        from core.loader import dp
+        hub = dp.workflow_data.get("_translator_hub")
+        if hub:
+            from storage.db.crud import get_user_settings
+            settings = await get_user_settings(db_session, user_id)
+            lang = settings.profile.language if settings else "en"
+            return hub.get_translator_by_locale(lang)
+    except Exception:
+        pass
+    return None
+
+
+async def _refund_payment(
+    message: Message, db_session: AsyncSession, user_id: int, payment_charge_id: str, i18n: TranslatorRunner | None
+):
+    try:
+        await message.bot.refund_star_payment(user_id, telegram_payment_charge_id=payment_charge_id)
+        from storage.db.crud import update_payment_status
+        await update_payment_status(db_session, payment_charge_id, "refunded")
+        refund_msg = i18n.get("download-failed-refund") if i18n else "❌ Download failed. Your payment has been refunded."
+        await message.answer(refund_msg)
+    except Exception as refund_error:
+        logger.error(f"Failed to refund payment: {refund_error}")
+
+
+def _fits_free_limit(media_content: list[MediaContent]) -> bool:
+    """Файлы не больше бесплатного лимита: такой формат можно отдать по алиасу кому угодно"""
+    size = 0
+    for item in media_content:
+        path = item.optimized_path or item.path
+        if path and Path(path).exists():
+            size += Path(path).stat().st_size
+    return size <= MAX_SIZE_MB * 1024 * 1024
+
+
+def shared_core_client() -> httpx.AsyncClient | None:
+    """Общий клиент из workflow_data: лимитер, предохранитель и отмена задач в core.
+    Задачам из очереди и спекуляции его не передают, берём у диспетчера"""
+    from core.loader import dp
+
+    return dp.workflow_data.get("http_client") if dp else None
 
 
 async def process_youtube_download(
@@ -672,25 +742,21 @@ async def process_youtube_download(
     i18n: TranslatorRunner | None = None,
     payment_charge_id: str | None = None,
     http_client: httpx.AsyncClient | None = None,
-    is_topich: bool = False
+    is_topich: bool = False,
+    prefetched: asyncio.Task | None = None,
+    can_retry: bool = False
 ):
+    """``can_retry`` - задача из очереди будет повторена: временную ошибку
+    (таймаут, 5xx) пробрасываем без сообщения и возврата оплаты"""
     send_manager = MediaSender()
+    retry_error: BotError | None = None
 
     from storage.db import database_manager
     async with database_manager.async_session() as session:
         db_session = session
         try:
             if not i18n:
-                try:
-                    from core.loader import dp
-                    hub = dp.workflow_data.get("_translator_hub")
-                    if hub:
-                        from storage.db.crud import get_user_settings
-                        settings = await get_user_settings(db_session, user_id)
-                        lang = settings.profile.language if settings else "en"
-                        i18n = hub.get_translator_by_locale(lang)
-                except Exception:
-                    pass
+                i18n = await _resolve_i18n(db_session, user_id)
 
             user = await get_user(db_session, user_id)
             is_premium = (user.is_premium if user else False) or (payment_charge_id is not None)
@@ -698,27 +764,58 @@ async def process_youtube_download(
             cache_key = get_cache_key(url, target_height, is_audio_only, is_topich)
             cached = await cache_check(db_session, cache_key)
             if cached:
+                if prefetched is not None:
+                    youtube_prefetch.release(prefetched)
                 await send_manager.send(message, cached, service="youtube", db_session=db_session)
                 await db_session.commit()
                 return
 
-            client = http_client or httpx.AsyncClient()
+            shared_client = http_client or shared_core_client()
+            client = shared_client or httpx.AsyncClient(transport=CoreJobTransport())
             try:
                 async with ChatActionSender.record_video_note(bot=message.bot, chat_id=message.chat.id):
-                    media_content = await task_manager.run_download(
-                        user_id=user_id,
-                        url=url,
-                        coro=download_youtube_full(
-                            http_client=client,
+                    media_content = None
+                    if prefetched is not None:
+                        # Угаданная загрузка уже идёт - дожидаемся её в слоте, /cancel отменит и её
+                        try:
+                            media_content = await task_manager.run_download(
+                                user_id=user_id,
+                                url=url,
+                                coro=youtube_prefetch.consume(prefetched),
+                                paid=payment_charge_id is not None,
+                                is_sponsor=user.is_premium if user else False,
+                            )
+                        finally:
+                            # Отказ очереди или /cancel до слота - угаданная загрузка не нужна
+                            if media_content is None:
+                                youtube_prefetch.release(prefetched)
+                    if media_content is None:
+                        media_content = await task_manager.run_download(
+                            user_id=user_id,
                             url=url,
-                            target_height=target_height,
-                            is_audio_only=is_audio_only,
-                            sponsor=is_premium,
-                            is_topich=is_topich
+                            backend="media-core/download/youtube",
+                            coro=download_youtube_full(
+                                http_client=client,
+                                url=url,
+                                target_height=target_height,
+                                is_audio_only=is_audio_only,
+                                sponsor=is_premium,
+                                is_topich=is_topich
+                            ),
+                            paid=payment_charge_id is not None,
+                            is_sponsor=user.is_premium if user else False,
                         )
-                    )
 
                 if media_content:
+                    # Inline-режим не знает качества и ищет ключ "default" - последнее скачанное видео.
+                    # Оплаченный или больший бесплатного лимита формат туда не попадает, иначе его
+                    # бесплатно получит любой. Размер - до отправки, после неё файлы удаляются
+                    default_alias = (
+                        not is_audio_only
+                        and not is_topich
+                        and payment_charge_id is None
+                        and _fits_free_limit(media_content)
+                    )
                     await send_manager.send(
                         message=message,
                         content=media_content,
@@ -726,23 +823,22 @@ async def process_youtube_download(
                         cache_key=cache_key,
                         db_session=db_session
                     )
+                    if default_alias:
+                        await add_media_cache_aliases(db_session, cache_key, [get_cache_key(url, "default")])
 
                 await db_session.commit()
 
             except Exception as e:
                 await db_session.rollback()
                 bot_err = e if isinstance(e, BotError) else BotError(code=ErrorCode.INTERNAL_ERROR, message=str(e), service=Services.YOUTUBE, is_logged=True)
+                if can_retry and bot_err.retryable:
+                    logger.warning(f"YouTube download will be retried: {bot_err.message}")
+                    retry_error = bot_err
+                    raise retry_error
                 await log_download_event(db_session, user_id, Services.YOUTUBE, 'failed_download', error_code=bot_err.code)
 
                 if payment_charge_id and message.bot:
-                    try:
-                        await message.bot.refund_star_payment(user_id, telegram_payment_charge_id=payment_charge_id)
-                        from storage.db.crud import update_payment_status
-                        await update_payment_status(db_session, payment_charge_id, "refunded")
-                        refund_msg = i18n.get("download-failed-refund") if i18n else "❌ Download failed. Your payment has been refunded."
-                        await message.answer(refund_msg)
-                    except Exception as refund_error:
-                        logger.error(f"Failed to refund payment: {refund_error}")
+                    await _refund_payment(message, db_session, user_id, payment_charge_id, i18n)
                 else:
                     if bot_err.send_user_message and message.bot:
                         from utils.error_messages import get_i18n_error_message
@@ -771,9 +867,11 @@ async def process_youtube_download(
 
                 logger.error(f"YouTube download error: {bot_err.message}")
             finally:
-                if http_client is None:
+                if shared_client is None:
                     await client.aclose()
         except Exception as outer_e:
+            if outer_e is retry_error:
+                raise  # Очередь повторит задачу
             await db_session.rollback()
             logger.error(f"Outer exception in process_youtube_download: {outer_e}")
 
@@ -789,35 +887,30 @@ async def process_clip_download(
     user_id: int,
     db_session: AsyncSession,
     http_client: httpx.AsyncClient = None,
-    i18n: TranslatorRunner = None
+    i18n: TranslatorRunner = None,
+    can_retry: bool = False
 ):
     send_manager = MediaSender()
+    retry_error: BotError | None = None
 
     from storage.db import database_manager
     async with database_manager.async_session() as session:
         db_session = session
         try:
             if not i18n:
-                try:
-                    from core.loader import dp
-                    hub = dp.workflow_data.get("_translator_hub")
-                    if hub:
-                        from storage.db.crud import get_user_settings
-                        settings = await get_user_settings(db_session, user_id)
-                        lang = settings.profile.language if settings else "en"
-                        i18n = hub.get_translator_by_locale(lang)
-                except Exception:
-                    pass
+                i18n = await _resolve_i18n(db_session, user_id)
 
             user = await get_user(db_session, user_id)
             is_premium = user.is_premium if user else False
 
-            client = http_client or httpx.AsyncClient()
+            shared_client = http_client or shared_core_client()
+            client = shared_client or httpx.AsyncClient(transport=CoreJobTransport())
             try:
                 async with ChatActionSender.record_video_note(bot=message.bot, chat_id=message.chat.id):
                     media_content = await task_manager.run_download(
                         user_id=user_id,
                         url=url,
+                        backend="media-core/download/youtube",
                         coro=download_youtube_clip(
                             http_client=client,
                             url=url,
@@ -826,7 +919,8 @@ async def process_clip_download(
                             start_time=start_time,
                             end_time=end_time,
                             sponsor=is_premium
-                        )
+                        ),
+                        is_sponsor=is_premium,
                     )
 
                 try:
@@ -847,12 +941,18 @@ async def process_clip_download(
 
             except Exception as e:
                 await db_session.rollback()
+                bot_err = e if isinstance(e, BotError) else BotError(code=ErrorCode.INTERNAL_ERROR, message=str(e), service=Services.YOUTUBE, is_logged=True)
+                if can_retry and bot_err.retryable:
+                    # Сообщение "обрабатываю" остаётся до следующей попытки
+                    logger.warning(f"YouTube clip download will be retried: {bot_err.message}")
+                    retry_error = bot_err
+                    raise retry_error
+
                 try:
                     await process_message.delete()
                 except Exception:
                     pass
 
-                bot_err = e if isinstance(e, BotError) else BotError(code=ErrorCode.INTERNAL_ERROR, message=str(e), service=Services.YOUTUBE, is_logged=True)
                 await log_download_event(db_session, user_id, Services.YOUTUBE, 'failed_download', error_code=bot_err.code)
 
                 if bot_err.send_user_message and message.bot:
@@ -882,8 +982,111 @@ async def process_clip_download(
 
                 logger.error(f"YouTube clip download error: {bot_err.message}")
             finally:
-                if http_client is None:
+                if shared_client is None:
                     await client.aclose()
         except Exception as outer_e:
+            if outer_e is retry_error:
+                raise  # Очередь повторит задачу
             await db_session.rollback()
             logger.error(f"Outer exception in process_clip_download: {outer_e}")
+
+
+async def enqueue_youtube_download(
+    message: Message,
+    url: str,
+    target_height: int,
+    is_audio_only: bool,
+    user_id: int,
+    payment_charge_id: str | None = None,
+    is_topich: bool = False
+):
+    """Ставит загрузку в очередь задач, выполнит её process_youtube_download в любом процессе"""
+    await job_queue.enqueue(DownloadJob.for_message(
+        "youtube", message, user_id, url,
+        options={"target_height": target_height, "is_audio_only": is_audio_only, "is_topich": is_topich},
+        payment_charge_id=payment_charge_id,
+    ))
+
+
+async def enqueue_clip_download(
+    message: Message,
+    process_message: Message,
+    url: str,
+    target_height: int,
+    is_audio_only: bool,
+    start_time: str,
+    end_time: str,
+    user_id: int
+):
+    await job_queue.enqueue(DownloadJob.for_message(
+        "youtube_clip", message, user_id, url,
+        options={
+            "process_message_id": process_message.message_id,
+            "target_height": target_height,
+            "is_audio_only": is_audio_only,
+            "start_time": start_time,
+            "end_time": end_time,
+        },
+    ))
+
+
+async def _run_youtube_job(job: DownloadJob):
+    await process_youtube_download(
+        message=job.message(),
+        url=job.url,
+        user_id=job.user_id,
+        db_session=None,
+        payment_charge_id=job.payment_charge_id,
+        can_retry=not job_queue.is_last_attempt(job),
+        **job.options
+    )
+
+
+async def _run_clip_job(job: DownloadJob):
+    options = dict(job.options)
+    process_message = job.message(options.pop("process_message_id"))
+    await process_clip_download(
+        message=job.message(),
+        process_message=process_message,
+        url=job.url,
+        user_id=job.user_id,
+        db_session=None,
+        can_retry=not job_queue.is_last_attempt(job),
+        **options
+    )
+
+
+async def _report_job_failure(job: DownloadJob, error: str, payment_charge_id: str | None):
+    """Задача ушла в dead-letter, а хендлер не успел сообщить об ошибке (например, воркер умер
+    на последней попытке): возвращаем оплату или хотя бы говорим пользователю"""
+    message = job.message()
+    from storage.db import database_manager
+    async with database_manager.async_session() as db_session:
+        i18n = await _resolve_i18n(db_session, job.user_id)
+        await log_download_event(db_session, job.user_id, Services.YOUTUBE, 'failed_download', error_code=ErrorCode.INTERNAL_ERROR)
+        if payment_charge_id:
+            await _refund_payment(message, db_session, job.user_id, payment_charge_id, i18n)
+        else:
+            msg_text = i18n.get("error-internal") if i18n else "❌ An error occurred during download."
+            try:
+                await message.answer(msg_text)
+            except Exception as msg_err:
+                logger.error(f"Failed to send error message: {msg_err}")
+        await db_session.commit()
+    logger.error(f"YouTube job {job.job_id} ({job.kind}) failed for good: {error}")
+
+
+async def _fail_youtube_job(job: DownloadJob, error: str):
+    await _report_job_failure(job, error, job.payment_charge_id)
+
+
+async def _fail_clip_job(job: DownloadJob, error: str):
+    try:
+        await job.message(job.options["process_message_id"]).delete()
+    except Exception:
+        pass
+    await _report_job_failure(job, error, None)
+
+
+job_queue.register("youtube", _run_youtube_job, on_failure=_fail_youtube_job)
+job_queue.register("youtube_clip", _run_clip_job, on_failure=_fail_clip_job)
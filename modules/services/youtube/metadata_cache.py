@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+import redis.asyncio as redis
+
+from core import json_codec
+from core.json_codec import response_json
+from storage.cache import redis_client as _redis_module
+from utils.media_identity import youtube_video_id
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "youtube:meta:"
+_LOCK_PREFIX = "youtube:meta:lock:"
+
+DEFAULT_TTL = 3 * 3600  # 3 часа, если в ответе нет ссылок с expire
+MIN_TTL = 60  # Меньше минуты кешировать нет смысла
+EXPIRY_MARGIN = 15 * 60  # Ссылка должна жить ещё хотя бы до конца загрузки
+LOCK_TTL_MS = 35_000  # Чуть больше таймаута /youtube/metadata
+
+_EXPIRE_PARAM = re.compile(r"[?&/]expire[=/](\d{9,})")
+_STALE_MARKERS = ("requested format is not available", "format expired", "stale format", "formats are stale")
+
+
+def video_id_of(url: str) -> Optional[str]:
+    return youtube_video_id(url)
+
+
+def _earliest_expiry(value: Any) -> Optional[int]:
+    """Самый ранний срок из ссылок на форматы (googlevideo ...&expire=<unix>...)"""
+    if isinstance(value, str):
+        match = _EXPIRE_PARAM.search(value)
+        return int(match.group(1)) if match else None
+    if isinstance(value, dict):
+        candidates = [_earliest_expiry(v) for v in value.values()]
+        expires_at = value.get("expires_at")
+        if isinstance(expires_at, (int, float)):
+            candidates.append(int(expires_at))
+    elif isinstance(value, list):
+        candidates = [_earliest_expiry(v) for v in value]
+    else:
+        return None
+    candidates = [c for c in candidates if c]
+    return min(candidates) if candidates else None
+
+
+def ttl_for(metadata: dict) -> int:
+    """TTL записи: не дольше, чем проживут ссылки на форматы внутри неё"""
+    expiry = _earliest_expiry(metadata)
+    if expiry is None:
+        return DEFAULT_TTL
+    return min(DEFAULT_TTL, int(expiry - time.time() - EXPIRY_MARGIN))
+
+
+def is_stale_format(res: httpx.Response) -> bool:
+    """media-core сообщает, что выбранный формат из метаданных больше не существует"""
+    if res.status_code == 410:
+        return True
+    if res.status_code < 400:
+        return False
+    try:
+        data = response_json(res)
+    except Exception:
+        data = None
+    if isinstance(data, dict) and data.get("code") == "stale_format":
+        return True
+    text = (res.text or "").lower()
+    return any(marker in text for marker in _STALE_MARKERS)
+
+
+class YoutubeMetadataCache:
+    """Кеш ответов /youtube/metadata по id видео.
+
+    Одновременные запросы одного видео в процессе ждут один и тот же
+    future, между процессами - короткую блокировку в Redis: проигравшие
+    ждут, пока победитель положит результат. Ошибки не кешируются.
+    """
+
+    def __init__(self, poll_interval: float = 0.3):
+        self._poll_interval = poll_interval
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    async def _get(self, video_id: str) -> Optional[dict]:
+        if self._redis is None:
+            return None
+        try:
+            data = await self._redis.get(f"{_KEY_PREFIX}{video_id}")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read YouTube metadata cache for {video_id}: {e}")
+            return None
+        return json_codec.loads(data) if data else None
+
+    async def _set(self, video_id: str, metadata: dict) -> None:
+        ttl = ttl_for(metadata)
+        if self._redis is None or ttl < MIN_TTL:
+            return
+        try:
+            await self._redis.set(f"{_KEY_PREFIX}{video_id}", json_codec.dumps(metadata), ex=ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store YouTube metadata for {video_id}: {e}")
+
+    async def invalidate(self, url: str) -> None:
+        video_id = video_id_of(url)
+        if video_id is None or self._redis is None:
+            return
+        try:
+            await self._redis.delete(f"{_KEY_PREFIX}{video_id}")
+            logger.info(f"Invalidated YouTube metadata for {video_id}")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to invalidate YouTube metadata for {video_id}: {e}")
+
+    async def _lock(self, video_id: str) -> bool:
+        if self._redis is None:
+            return True
+        try:
+            return bool(await self._redis.set(f"{_LOCK_PREFIX}{video_id}", 1, nx=True, px=LOCK_TTL_MS))
+        except redis.RedisError:
+            return True
+
+    async def _unlock(self, video_id: str) -> None:
+        try:
+            await self._redis.delete(f"{_LOCK_PREFIX}{video_id}")
+        except redis.RedisError:
+            pass
+
+    async def _load(self, video_id: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        locked = await self._lock(video_id)
+        if not locked:
+            # Тот же ролик уже запрашивает другой процесс
+            deadline = time.monotonic() + LOCK_TTL_MS / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self._poll_interval)
+                cached = await self._get(video_id)
+                if cached is not None:
+                    return cached
+
+        try:
+            metadata = await fetch()
+            await self._set(video_id, metadata)
+            return metadata
+        finally:
+            if locked and self._redis is not None:
+                await self._unlock(video_id)
+
+    async def get_or_fetch(self, url: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        video_id = video_id_of(url)
+        if video_id is None:
+            return await fetch()
+
+        cached = await self._get(video_id)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(video_id)
+        if future is None:
+            future = self._inflight[video_id] = asyncio.ensure_future(self._load(video_id, fetch))
+            future.add_done_callback(lambda _: self._inflight.pop(video_id, None))
+        # shield: отмена одного ожидающего не должна отменять запрос остальным
+        return await asyncio.shield(future)
+
+
+youtube_metadata_cache = YoutubeMetadataCache()
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import redis.asyncio as redis
+
+from core.config import settings
+from models.media import MediaContent
+from storage.cache import redis_client as _redis_module
+from tasks.core_jobs import CoreJobTransport
+from utils.file_utils import delete_files
+
+logger = logging.getLogger(__name__)
+
+_HISTORY_KEY = "youtube:choices:"  # HASH выбор -> сколько раз
+_STATS_KEY = "youtube:prefetch:stats"
+HISTORY_TTL = 90 * 24 * 3600
+
+MAX_SIZE_MB = 100  # больше - нужна оплата, угадывать бессмысленно
+MIN_HISTORY = 3
+MIN_SHARE = 0.6
+
+STATS = ("started", "hit", "miss", "expired", "failed", "skipped_budget", "preempted")
+BUDGET_CHECK_INTERVAL = 1.0
+
+
+def choice_token(target_height: int, is_audio: bool, options: list[dict]) -> str:
+    if is_audio:
+        return "audio"
+    highest = max((opt.get("target_height", 0) for opt in options), default=0)
+    return "video:max" if target_height >= highest else f"video:{target_height}"
+
+
+@dataclass
+class _Prefetch:
+    user_id: int
+    url: str
+    target_height: int
+    is_audio: bool
+    task: asyncio.Task
+    started: float = field(default_factory=time.monotonic)
+    expiry: asyncio.TimerHandle | None = None
+
+
+class YoutubePrefetcher:
+    """Спекулятивная загрузка самого вероятного формата, пока открыт диалог.
+
+    Прогноз - частый выбор пользователя (история в Redis), а без истории в
+    простом режиме - видео в максимальном качестве. Загрузка идёт мимо
+    очереди задач (но через общий клиент с лимитером и предохранителем),
+    только пока у TaskManager есть свободные слоты и никто не ждёт, не
+    больше ``global_limit`` одновременно и одна на пользователя. Как только
+    в очереди кто-то появился, идущие спекуляции отменяются. Выбрал другое или не выбрал за ``hold`` секунд -
+    загрузка отменяется (и в media-core, через CoreJobTransport), а
+    готовые файлы удаляются. Счётчики попаданий - в Redis.
+    """
+
+    def __init__(self, enabled: bool, global_limit: int = 2, hold: float = 180.0):
+        self.enabled = enabled
+        self._global_limit = global_limit
+        self._hold = hold
+        self._active: dict[int, _Prefetch] = {}
+        self._watchdog: asyncio.Task | None = None
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    async def _count(self, stat: str) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.hincrby(_STATS_KEY, stat, 1)
+        except redis.RedisError as e:
+            logger.debug(f"Failed to count prefetch {stat}: {e}")
+
+    async def stats(self) -> dict[str, int]:
+        if self._redis is None:
+            return {}
+        try:
+            raw = await self._redis.hgetall(_STATS_KEY)
+        except redis.RedisError:
+            return {}
+        return {stat: int(raw.get(stat, 0)) for stat in STATS}
+
+    async def record_choice(self, user_id: int, token: str) -> None:
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hincrby(f"{_HISTORY_KEY}{user_id}", token, 1)
+                pipe.expire(f"{_HISTORY_KEY}{user_id}", HISTORY_TTL)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.debug(f"Failed to record YouTube choice for {user_id}: {e}")
+
+    async def predict(self, user_id: int, ui_mode: str, metadata: dict) -> tuple[int, bool] | None:
+        """(target_height, is_audio) или None, если уверенного прогноза нет"""
+        options = metadata.get("options") or []
+        history: dict = {}
+        if self._redis is not None:
+            try:
+                history = await self._redis.hgetall(f"{_HISTORY_KEY}{user_id}")
+            except redis.RedisError:
+                history = {}
+
+        token = None
+        total = sum(int(count) for count in history.values())
+        if total >= MIN_HISTORY:
+            best, count = max(history.items(), key=lambda item: int(item[1]))
+            if int(count) / total >= MIN_SHARE:
+                token = best
+        if token is None and ui_mode == "simple":
+            token = "video:max"
+        if token is None:
+            return None
+
+        if token == "audio":
+            audio = metadata.get("audio_only") or {}
+            if not audio or audio.get("size_mb", 0) > MAX_SIZE_MB:
+                return None
+            return audio.get("target_height", 0), True
+
+        if token == "video:max":
+            option = max(options, key=lambda opt: opt.get("target_height", 0), default=None)
+        else:
+            height = int(token.split(":", 1)[1])
+            option = next((opt for opt in options if opt.get("target_height") == height), None)
+        if option is None or option.get("size_mb", 0) > MAX_SIZE_MB:
+            return None
+        return option.get("target_height", 0), False
+
+    async def _has_budget(self) -> bool:
+        from tasks.task_manager import task_manager
+
+        if len(self._active) >= self._global_limit:
+            return False
+        # Спекуляция только на простаивающих слотах: реальные загрузки не ждут.
+        # В supervisor режиме слоты общие - считаем аренды всех воркеров
+        scheduler = task_manager.scheduler
+        if scheduler.waiting > 0:
+            return False
+        return await task_manager.busy_slots() + len(self._active) < scheduler.slots
+
+    async def maybe_start(self, user_id: int, url: str, ui_mode: str, metadata: dict, is_premium: bool) -> None:
+        if not self.enabled:
+            return
+        self.discard(user_id)
+
+        prediction = await self.predict(user_id, ui_mode, metadata)
+        if prediction is None:
+            return
+        if not await self._has_budget():
+            await self._count("skipped_budget")
+            return
+
+        target_height, is_audio = prediction
+        task = asyncio.create_task(self._download(url, target_height, is_audio, is_premium))
+        entry = _Prefetch(user_id, url, target_height, is_audio, task)
+        entry.expiry = asyncio.get_running_loop().call_later(self._hold, self._expire, user_id, entry)
+        self._active[user_id] = entry
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch_budget())
+        await self._count("started")
+        logger.info(f"Prefetching {url} for {user_id}: height={target_height} audio={is_audio}")
+
+    async def _watch_budget(self) -> None:
+        """Отменяет спекуляции, как только реальная загрузка ждёт слот.
+
+        Ожидающих в других воркерах не видно, поэтому ждущим считается и
+        случай, когда аренды всех воркеров вместе со спекуляциями не
+        помещаются в общий лимит.
+        """
+        from tasks.task_manager import task_manager
+
+        while self._active:
+            await asyncio.sleep(BUDGET_CHECK_INTERVAL)
+            scheduler = task_manager.scheduler
+            if scheduler.waiting > 0 or await task_manager.busy_slots() + len(self._active) > scheduler.slots:
+                for user_id in list(self._active):
+                    self.discard(user_id, stat="preempted")
+
+    async def _download(self, url: str, target_height: int, is_audio: bool, sponsor: bool) -> list[MediaContent]:
+        from .handler import download_youtube_full, shared_core_client
+
+        shared_client = shared_core_client()
+        client = shared_client or httpx.AsyncClient(transport=CoreJobTransport())
+        try:
+            return await download_youtube_full(
+                http_client=client,
+                url=url,
+                target_height=target_height,
+                is_audio_only=is_audio,
+                sponsor=sponsor,
+            )
+        finally:
+            if shared_client is None:
+                await client.aclose()
+
+    def take(self, user_id: int, url: str, target_height: int, is_audio: bool) -> asyncio.Task | None:
+        """Загрузка под этот выбор, если угадали. Иначе отменяет спекуляцию пользователя"""
+        entry = self._active.get(user_id)
+        if entry is None:
+            return None
+        if entry.url == url and entry.target_height == target_height and entry.is_audio == is_audio:
+            self._pop(user_id)
+            asyncio.create_task(self._count("hit"))
+            return entry.task
+        self.discard(user_id, stat="miss")
+        return None
+
+    def discard(self, user_id: int, stat: str | None = None) -> None:
+        entry = self._pop(user_id)
+        if entry is None:
+            return
+        self.release(entry.task)
+        if stat:
+            asyncio.create_task(self._count(stat))
+
+    def _expire(self, user_id: int, entry: _Prefetch) -> None:
+        if self._active.get(user_id) is entry:
+            self.discard(user_id, stat="expired")
+
+    def _pop(self, user_id: int) -> _Prefetch | None:
+        entry = self._active.pop(user_id, None)
+        if entry is not None and entry.expiry is not None:
+            entry.expiry.cancel()
+        return entry
+
+    def release(self, task: asyncio.Task) -> None:
+        """Угаданная загрузка не понадобилась: идущую отменяет, у готовой удаляет файлы"""
+        if not task.done():
+            # Отмена дойдёт до media-core через CoreJobTransport
+            task.cancel()
+            return
+        if task.cancelled() or task.exception() is not None:
+            return
+        asyncio.create_task(delete_files([
+            path for item in task.result()
+            for path in (item.path, item.optimized_path, item.cover, item.full_cover) if path
+        ]))
+
+    async def consume(self, task: asyncio.Task) -> list[MediaContent] | None:
+        """Результат угаданной загрузки. None - спекуляция не удалась, качать обычным путём"""
+        try:
+            return await task
+        except Exception as e:
+            logger.warning(f"Prefetched download failed, downloading again: {e}")
+            await self._count("failed")
+            return None
+
+
+youtube_prefetch = YoutubePrefetcher(
+    enabled=settings.YT_PREFETCH, global_limit=settings.YT_PREFETCH_LIMIT
+)
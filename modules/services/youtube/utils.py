@@ -6,12 +6,10 @@ from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from storage.db.crud import get_media_cache
 from models.media import MediaContent, MediaType
+from utils.media_identity import youtube_video_id
 
 logger = logging.getLogger(__name__)
 
-YOUTUBE_ID_REGEX = re.compile(r"https?://(?:www\.)?(?:m\.)?(?:youtu\.be/|youtube\.com/(?:shorts/|watch\?v=))([\w-]+)")
-
-
 def format_seconds_to_hhmmss(seconds: int) -> str:
     h = seconds // 3600
     m = (seconds % 3600) // 60
@@ -83,8 +81,8 @@ def parse_time_range(time_range_str: str) -> Optional[Tuple[str, str, int, int]]
 
 def get_cache_key(url: str, height: int | str = 0, is_audio_only: bool = False, is_topich: bool = False) -> str:
     """Generate a unique cache key based on the video ID, target height, format type, and topich."""
-    match = YOUTUBE_ID_REGEX.search(url)
-    video_id = match.group(1) if match else url
+    # youtu.be/X, watch?si=..&v=X&t=.., shorts/X - один и тот же ключ
+    video_id = youtube_video_id(url) or url
     
     if is_topich:
         format_type = "topich"
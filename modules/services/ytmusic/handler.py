@@ -3,8 +3,7 @@ from pathlib import Path
 
 import httpx
 from aiogram import F, Router
-from aiogram.enums import ParseMode
-from aiogram.types import FSInputFile, Message
+from aiogram.types import Message
 from aiogram.utils.chat_action import ChatActionSender
 from fluentogram import TranslatorRunner
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,8 +16,10 @@ from models.media_cache import MediaCacheDTO, CacheMetadata
 from senders.media_sender import MediaSender
 from storage.db.crud import get_chat_settings, get_user_settings, get_media_cache, upsert_media_cache
 from tasks.task_manager import task_manager
-from utils import delete_files, handle_lossless_response
+from utils import handle_lossless_response
+from utils.photo_cache import send_cover_photo
 from utils.statistics_helper import log_download_event
+from utils.track_index import resolve_track_metadata
 
 ytmusic_router = Router(name="ytmusic")
 logger = logging.getLogger(__name__)
@@ -79,6 +80,7 @@ async def process_track(
         track_data = await task_manager.run_download(
             user_id=chat_id,
             url=original_url,
+            backend="lossless-core/download",
             coro=fetch_core_download(http_client, payload, original_url),
         )
 
@@ -125,10 +127,7 @@ async def ytmusic_handler(
     )
 
     async with ChatActionSender.choose_sticker(bot=message.bot, chat_id=chat_id):
-        response = await http_client.post(
-            "http://lossless-core:7856/metadata", json={"url": url}
-        )
-        metadata = handle_lossless_response(response, url, Services.YTMUSIC)
+        metadata = await resolve_track_metadata(db_session, http_client, url, Services.YTMUSIC)
 
     if metadata["type"] == "song":
         await process_track(
@@ -151,25 +150,9 @@ async def ytmusic_handler(
             text += i18n.get("release-date", date=metadata["release_date"]) + "\n"
 
         if metadata["cover"]:
-            cover_path = f"storage/temp/ytmusic_album_{metadata['id']}.png"
-            try:
-                res = await http_client.post(
-                    "http://media-core:9546/tools/download-image",
-                    json={
-                        "url": metadata["cover"],
-                        "destination": cover_path
-                    },
-                    timeout=30.0
-                )
-                if res.status_code == 200:
-                    await message.answer_photo(
-                        photo=FSInputFile(cover_path), caption=text, parse_mode=ParseMode.HTML
-                    )
-                    await delete_files([cover_path])
-                else:
-                    logger.error(f"Failed to download cover via media-core: status={res.status_code}")
-            except Exception as e:
-                logger.error(f"Failed to download cover via media-core: {e}")
+            await send_cover_photo(
+                message, http_client, metadata["cover"], f"storage/temp/ytmusic_album_{metadata['id']}.png", text
+            )
 
         await message.reply(i18n.get("downloading-tracks"))
 
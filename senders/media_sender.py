@@ -29,11 +29,39 @@ from models.settings import UserSettingsJson, ChatSettingsJson
 from models.media_cache import MediaCacheDTO, CacheMetadata, CacheItemMetadata
 from models.service_list import Services
 from utils.statistics_helper import log_download_event
-from core.config import Config
+from core.config import Config, settings as _config
 
 logger = logging.getLogger(__name__)
 
 _IS_LOCAL_API = bool(os.getenv("TELEGRAM_LOCAL") or os.getenv("TELEGRAM_BOT_API_URL"))
+_USE_LOCAL_PATHS = _IS_LOCAL_API and _config.TELEGRAM_UPLOAD_MODE == "local_path"
+
+
+def _parse_path_map(raw: str) -> List[Tuple[str, str]]:
+    """'/app/storage:/app/storage,/data:/srv/data' -> [(bot_prefix, server_prefix), ...]"""
+    pairs = []
+    for chunk in raw.split(","):
+        if ":" not in chunk:
+            continue
+        local, remote = chunk.strip().split(":", 1)
+        if local and remote:
+            pairs.append((os.path.normpath(local), os.path.normpath(remote)))
+    # Самый длинный префикс проверяется первым
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+_PATH_MAP = _parse_path_map(_config.TELEGRAM_LOCAL_PATH_MAP)
+
+
+def _to_server_uri(path: Union[str, Path]) -> Optional[str]:
+    """Путь внутри контейнера бота -> file:// путь внутри контейнера telegram-bot-api"""
+    abs_path = os.path.abspath(path)
+    for local, remote in _PATH_MAP:
+        if abs_path == local or abs_path.startswith(local + os.sep):
+            return "file://" + remote + abs_path[len(local):]
+    return None
+
+
 AD_TEXT = "<a href='https://t.me/CharlotteFox_Bot'>Charlotte 🧡</a>"
 
 REACTION_EMOJIS = [
@@ -165,6 +193,15 @@ class MediaSender:
     # ХЕЛПЕРЫ (DRY)
     # ==========================================
 
+    def _get_file_input(self, path: Union[str, Path]) -> Union[str, types.InputFile]:
+        """Локальный Bot API читает файл сам по file:// пути, без multipart-загрузки"""
+        if _USE_LOCAL_PATHS:
+            uri = _to_server_uri(path)
+            if uri:
+                return uri
+            logger.debug(f"No local path mapping for {path}, falling back to multipart")
+        return types.FSInputFile(os.path.abspath(path))
+
     def _get_input_media(
         self, item: MediaContent, as_document: bool = False
     ) -> Union[str, types.InputFile]:
@@ -177,12 +214,12 @@ class MediaSender:
 
         if not as_document:
             if item.optimized_path:
-                return types.FSInputFile(os.path.abspath(item.optimized_path))
+                return self._get_file_input(item.optimized_path)
             if getattr(item, "optimized_content", None) and item.filename:
                 return types.BufferedInputFile(item.optimized_content, item.filename)
 
         if item.path:
-            return types.FSInputFile(os.path.abspath(item.path))
+            return self._get_file_input(item.path)
 
         if item.content and item.filename:
             return types.BufferedInputFile(item.content, item.filename)
@@ -226,6 +263,20 @@ class MediaSender:
                 is_logged=True,
             )
 
+    async def _prepare_caption(
+        self,
+        caption: Optional[str],
+        settings: Union[UserSettingsJson, ChatSettingsJson],
+        service_settings,
+    ) -> str:
+        """Подпись с учётом настроек сервиса. Перевод кэшируется, так что альбом
+        и гифки одного сообщения переводят подпись один раз"""
+        if not caption or not getattr(service_settings, "caption", False):
+            return ""
+        if getattr(service_settings, "translate_caption", False):
+            caption = await translate_text(caption, str(settings.profile.title_language))
+        return truncate_string(caption, 1000)
+
     @with_retry()
     async def _safe_send(self, target_obj, method_name: str, **kwargs):
         """Универсальный и безопасный вызов любого метода aiogram"""
@@ -361,7 +412,7 @@ class MediaSender:
                                 bot,
                                 "send_document",
                                 chat_id=dump_channel_id,
-                                document=types.FSInputFile(cover_to_dump),
+                                document=self._get_file_input(cover_to_dump),
                                 disable_notification=True,
                             )
                             item.full_cover_file_id = msg.document.file_id
@@ -523,14 +574,8 @@ class MediaSender:
 
             # Обработка подписи и перевода (только для первого элемента)
             if i == 0:
-                final_caption = ""
-                if caption and getattr(service_settings, "caption", False):
-                    if getattr(service_settings, "translate_caption", False):
-                        caption = await translate_text(
-                            caption, str(settings.profile.title_language)
-                        )
-                    final_caption = truncate_string(caption, 1000)
-                
+                final_caption = await self._prepare_caption(caption, settings, service_settings)
+
                 if show_ad:
                     final_caption = (final_caption + "\n\n" if final_caption else "") + AD_TEXT
 
@@ -676,13 +721,7 @@ class MediaSender:
         action = "upload_document" if send_as_raw else "upload_video"
         method = "answer_document" if send_as_raw else "answer_animation"
 
-        final_caption = ""
-        if caption and getattr(service_settings, "caption", False):
-            if getattr(service_settings, "translate_caption", False):
-                caption = await translate_text(
-                    caption, str(settings.profile.title_language)
-                )
-            final_caption = truncate_string(caption, 1000)
+        final_caption = await self._prepare_caption(caption, settings, service_settings)
 
         if show_ad:
             final_caption = (final_caption + "\n\n" if final_caption else "") + AD_TEXT
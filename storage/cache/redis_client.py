@@ -7,6 +7,8 @@ from typing import Optional, Any, Dict
 
 from redis.asyncio import Redis
 
+from core import json_codec
+
 logger = logging.getLogger(__name__)
 
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -83,8 +85,8 @@ async def cache_get(key: str) -> Optional[Dict]:
         if data is None:
             return None
         try:
-            return json.loads(data)
-        except json.JSONDecodeError as e:
+            return json_codec.loads(data)
+        except json_codec.JSONDecodeError as e:
             logger.warning(f"cache_get: failed to decode JSON for key '{key}': {e}")
             return None
     except redis.RedisError as e:
@@ -95,7 +97,7 @@ async def cache_set(key: str, data: Dict, ttl: int = 3600):
     if not redis_client:
         return
     try:
-        await redis_client.setex(key, ttl, json.dumps(data, default=str))
+        await redis_client.setex(key, ttl, json_codec.dumps(data))
     except redis.RedisError as e:
         logger.warning(f"cache_set: Redis error for key '{key}': {e}")
 
@@ -5,10 +5,12 @@ from .crud import (
     get_user_settings,
     update_user_premium,
     update_user_settings,
+    patch_user_settings,
     get_chat,
     create_chat,
     get_chat_settings,
     update_chat_settings,
+    patch_chat_settings,
     create_usage_log,
     create_payment_log,
     update_payment_status,
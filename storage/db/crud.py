@@ -1,17 +1,59 @@
+import asyncio
 import logging
 import datetime
 import json
 from datetime import date
 
-from sqlalchemy import select, update, func, desc, or_, delete
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import event, select, update, func, desc, or_, delete, literal, case, type_coerce, Text, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects.postgresql import insert, ARRAY, JSONB
+from sqlalchemy.sql.elements import ColumnElement
 
-from .models import Users, Chats, Statistics, BotSetting, MediaCache
+from .models import Users, Chats, Statistics, BotSetting, MediaCache, MediaCacheAlias, TrackIndex, RowCounter, RowCounterDelta
 from storage.cache.redis_client import cache_get, cache_set, cache_delete, orm_to_dict, dict_to_orm
 from models.settings import UserSettingsJson, ChatSettingsJson
 from models.media_cache import MediaCacheDTO
 
+logger = logging.getLogger(__name__)
+
+SETTINGS_TTL = 3600
+
+_PENDING_CACHE = "pending_cache_writes"
+_cache_writes: set[asyncio.Task] = set()
+
+
+def _flush_cache_writes(sync_session) -> None:
+    pending = sync_session.info.get(_PENDING_CACHE)
+    if not pending:
+        return
+    loop = asyncio.get_running_loop()
+    for key, (value, ttl) in pending.items():
+        task = loop.create_task(cache_set(key, value, ttl=ttl))
+        _cache_writes.add(task)
+        task.add_done_callback(_cache_writes.discard)
+    pending.clear()
+
+
+def _drop_cache_writes(sync_session) -> None:
+    pending = sync_session.info.get(_PENDING_CACHE)
+    if pending:
+        pending.clear()
+
+
+async def _cache_after_commit(session: AsyncSession, key: str, value: Any, ttl: int = SETTINGS_TTL) -> None:
+    """Сбрасывает ключ сразу, а свежее значение кладёт только после коммита:
+    при откате в Redis не останется того, чего нет в базе"""
+    await cache_delete(key)
+    pending = session.info.get(_PENDING_CACHE)
+    if pending is None:
+        pending = session.info[_PENDING_CACHE] = {}
+        event.listen(session.sync_session, "after_commit", _flush_cache_writes)
+        event.listen(session.sync_session, "after_rollback", _drop_cache_writes)
+    pending[key] = (value, ttl)
+
 
 def _get_db():
     from . import database_manager
@@ -40,16 +82,22 @@ async def get_user(session: AsyncSession, user_id: int) -> Users | None:
     return user
 
 async def create_user(session: AsyncSession, user_id: int) -> tuple[Users, bool]:
-    stmt = select(Users).where(Users.user_id == user_id)
-    result = await session.execute(stmt)
-    existing_user = result.scalar_one_or_none()
+    """Creates the user if missing with a single INSERT ... ON CONFLICT DO NOTHING
 
-    if existing_user:
-        return existing_user, False
+    Returns:
+        tuple[Users, bool]: User object and whether it was just created
+    """
+    stmt = (
+        insert(Users)
+        .values(user_id=user_id)
+        .on_conflict_do_nothing(index_elements=['user_id'])
+        .returning(Users)
+    )
+    result = await session.execute(stmt)
+    user = result.scalar_one_or_none()
 
-    user = Users(user_id=user_id)
-    session.add(user)
-    await session.flush()
+    if user is None:
+        return await get_user(session, user_id), False
 
     await cache_set(f"user:{user_id}", orm_to_dict(user), ttl=3600)
     return user, True
@@ -72,7 +120,7 @@ async def get_user_settings(session: AsyncSession, user_id: int) -> UserSettings
     result = await session.execute(select(Users.settings_json).where(Users.user_id == user_id))
     settings = result.scalar_one_or_none()
     if settings:
-        await cache_set(cache_key, settings, ttl=3600)
+        await cache_set(cache_key, settings, ttl=SETTINGS_TTL)
         return UserSettingsJson.model_validate(settings)
     else:
         return UserSettingsJson.model_validate({})
@@ -108,27 +156,104 @@ async def grant_sponsorship(session: AsyncSession, user_id: int, days: int, star
     new_end = current_end + datetime.timedelta(days=days)
     
     # Reset notification flag
-    settings = user.settings_json or {}
-    settings["premium_expired_notified"] = False
-    
-    await session.execute(
+    result = await session.execute(
         update(Users)
         .where(Users.user_id == user_id)
         .values(
             premium_ends=new_end,
             stars_donated=Users.stars_donated + stars_donated,
-            settings_json=settings
+            settings_json=_jsonb_patch(Users.settings_json, {("premium_expired_notified",): False})
         )
+        .returning(Users.settings_json)
     )
     await cache_delete(f"user:{user_id}")
+    settings = result.scalar_one_or_none()
+    if settings is not None:
+        await _cache_after_commit(session, f"user_settings:{user_id}", settings)
+
+def _valid_settings_path(model_cls: type[BaseModel], path: tuple[str, ...]) -> bool:
+    for part in path[:-1]:
+        field = model_cls.model_fields.get(part)
+        annotation = field.annotation if field else None
+        if not (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+            return False
+        model_cls = annotation
+    return path[-1] in model_cls.model_fields
+
+
+def _jsonb_patch(column, changes: dict[tuple[str, ...], Any]):
+    """Выражение settings_json с заменёнными путями (вложенные jsonb_set).
+    Недостающие промежуточные объекты создаются, остальное не трогается."""
+    empty = literal({}, JSONB)
+    expr = func.coalesce(column, empty)
+    ensured = set()
+    for path, value in changes.items():
+        for depth in range(1, len(path)):
+            parent = path[:depth]
+            if parent in ensured:
+                continue
+            ensured.add(parent)
+            parent_path = literal(list(parent), ARRAY(Text))
+            expr = func.jsonb_set(expr, parent_path, func.coalesce(expr.op("#>")(parent_path), empty))
+        if not isinstance(value, ColumnElement):
+            value = literal(value, JSONB)
+        expr = func.jsonb_set(expr, literal(list(path), ARRAY(Text)), value)
+    return expr
+
+
+def _jsonb_toggle_member(column, path: tuple[str, ...], member: str):
+    """Массив по пути с добавленным или убранным member, считается в самом UPDATE"""
+    current = type_coerce(
+        func.coalesce(column.op("#>")(literal(list(path), ARRAY(Text))), literal([], JSONB)), JSONB
+    )
+    return case(
+        (current.has_key(member), current.op("-")(literal(member, Text))),
+        else_=current.op("||")(func.jsonb_build_array(literal(member, Text))),
+    )
+
+
+def _settings_changes(model_cls: type[BaseModel], changes: dict[tuple[str, ...], Any]) -> dict[tuple[str, ...], Any]:
+    valid = {}
+    for path, value in changes.items():
+        if not _valid_settings_path(model_cls, path):
+            logger.warning(f"Ignoring unknown {model_cls.__name__} path: {'.'.join(path)}")
+            continue
+        valid[path] = sorted(value) if isinstance(value, set) else value
+    if not valid:
+        raise ValueError(f"No valid {model_cls.__name__} paths in {list(changes)}")
+    return valid
+
+
+async def patch_user_settings(
+    session: AsyncSession, user_id: int, changes: dict[tuple[str, ...], Any]
+) -> UserSettingsJson | None:
+    """Атомарно меняет только указанные пути settings_json, например
+    {("profile", "language"): "de"}, и после коммита кладёт свежие настройки в кеш.
+
+    Returns:
+        UserSettingsJson | None: New settings, None if the user doesn't exist
+    """
+    changes = _settings_changes(UserSettingsJson, changes)
+    result = await session.execute(
+        update(Users)
+        .where(Users.user_id == user_id)
+        .values(settings_json=_jsonb_patch(Users.settings_json, changes))
+        .returning(Users.settings_json)
+    )
+    settings = result.scalar_one_or_none()
+    if settings is None:
+        return None
+    await _cache_after_commit(session, f"user_settings:{user_id}", settings)
+    return UserSettingsJson.model_validate(settings)
 
 async def update_user_settings(session: AsyncSession, user_id: int, settings: UserSettingsJson):
+    settings_dict = settings.model_dump(mode="json")
     await session.execute(
         update(Users)
         .where(Users.user_id == user_id)
-        .values(settings_json=settings.model_dump(mode="json"))
+        .values(settings_json=settings_dict)
     )
-    await cache_delete(f"user_settings:{user_id}")
+    await _cache_after_commit(session, f"user_settings:{user_id}", settings_dict)
 
 
 async def get_chat(session: AsyncSession, chat_id: int) -> Chats | None:
@@ -160,16 +285,17 @@ async def create_chat(session: AsyncSession, chat_id: int, owner_id: int) -> Cha
         chat_id (int): Chat ID
         owner_id (int): User ID
     """
-    stmt = select(Chats).where(Chats.chat_id == chat_id)
+    stmt = (
+        insert(Chats)
+        .values(chat_id=chat_id, owner_id=owner_id)
+        .on_conflict_do_nothing(index_elements=['chat_id'])
+        .returning(Chats)
+    )
     result = await session.execute(stmt)
-    existing_chat = result.scalar_one_or_none()
-
-    if existing_chat:
-        return existing_chat
+    chat = result.scalar_one_or_none()
 
-    chat = Chats(chat_id=chat_id, owner_id=owner_id)
-    session.add(chat)
-    await session.flush()
+    if chat is None:
+        return await get_chat(session, chat_id)
 
     await cache_set(f"chat:{chat_id}", orm_to_dict(chat), ttl=3600)
     return chat
@@ -192,11 +318,49 @@ async def get_chat_settings(session: AsyncSession, chat_id: int) -> ChatSettings
     result = await session.execute(select(Chats.settings_json).where(Chats.chat_id == chat_id))
     settings = result.scalar_one_or_none()
     if settings is not None:
-        await cache_set(cache_key, settings, ttl=3600)
+        await cache_set(cache_key, settings, ttl=SETTINGS_TTL)
         return ChatSettingsJson.model_validate(settings)
     else:
         return ChatSettingsJson.model_validate({})
 
+async def patch_chat_settings(
+    session: AsyncSession, chat_id: int, changes: dict[tuple[str, ...], Any]
+) -> ChatSettingsJson | None:
+    """То же, что patch_user_settings, для настроек чата"""
+    changes = _settings_changes(ChatSettingsJson, changes)
+    result = await session.execute(
+        update(Chats)
+        .where(Chats.chat_id == chat_id)
+        .values(settings_json=_jsonb_patch(Chats.settings_json, changes))
+        .returning(Chats.settings_json)
+    )
+    settings = result.scalar_one_or_none()
+    if settings is None:
+        return None
+    await _cache_after_commit(session, f"chat_settings:{chat_id}", settings)
+    return ChatSettingsJson.model_validate(settings)
+
+async def toggle_chat_settings_member(
+    session: AsyncSession, chat_id: int, path: tuple[str, ...], member: str
+) -> ChatSettingsJson | None:
+    """Атомарно добавляет member в массив по пути (или убирает, если он там есть),
+    например ("profile", "blocked_services"). Параллельные переключения не теряются"""
+    if not _valid_settings_path(ChatSettingsJson, path):
+        raise ValueError(f"Unknown ChatSettingsJson path: {'.'.join(path)}")
+    result = await session.execute(
+        update(Chats)
+        .where(Chats.chat_id == chat_id)
+        .values(settings_json=_jsonb_patch(
+            Chats.settings_json, {path: _jsonb_toggle_member(Chats.settings_json, path, member)}
+        ))
+        .returning(Chats.settings_json)
+    )
+    settings = result.scalar_one_or_none()
+    if settings is None:
+        return None
+    await _cache_after_commit(session, f"chat_settings:{chat_id}", settings)
+    return ChatSettingsJson.model_validate(settings)
+
 async def update_chat_settings(session: AsyncSession, chat_id: int, settings: ChatSettingsJson):
     settings_dict = settings.model_dump(mode="json")
     await session.execute(
@@ -204,7 +368,7 @@ async def update_chat_settings(session: AsyncSession, chat_id: int, settings: Ch
         .where(Chats.chat_id == chat_id)
         .values(settings_json=settings_dict)
     )
-    await cache_delete(f"chat_settings:{chat_id}")
+    await _cache_after_commit(session, f"chat_settings:{chat_id}", settings_dict)
 
 
 async def create_usage_log(session: AsyncSession, user_id: int, service_name: str, event_type: str, status: str) -> Statistics | None:
@@ -353,8 +517,7 @@ async def get_premium_and_donation_stats(session: AsyncSession) -> dict:
 async def check_if_user_premium(session: AsyncSession, user_id: int) -> bool:
     user = await get_user(session=session, user_id=user_id)
     if user is None:
-        await create_user(session=session, user_id=user_id)  # noqa: F841
-        user = await get_user(session=session, user_id=user_id)
+        user, _ = await create_user(session=session, user_id=user_id)
 
     if not user:
         return False
@@ -371,8 +534,7 @@ async def toggle_lifetime_premium(session: AsyncSession, user_id: int) -> bool |
     """
     user = await get_user(session=session, user_id=user_id)
     if user is None:
-        await create_user(session=session, user_id=user_id)  # noqa: F841
-        user = await get_user(session=session, user_id=user_id)
+        user, _ = await create_user(session=session, user_id=user_id)
 
     if not user:
         return None
@@ -396,29 +558,21 @@ async def toggle_lifetime_premium(session: AsyncSession, user_id: int) -> bool |
     return None
 
 async def ban_user(session: AsyncSession, user_id: int) -> None:
-    user = await get_user(session=session, user_id=user_id)
-    if user is None:
-        await create_user(session=session, user_id=user_id)  # noqa: F841
-        user = await get_user(session=session, user_id=user_id)
-
-    if not user:
-        return
-
-    user.is_banned = True
-    session.add(user)
+    await create_user(session=session, user_id=user_id)
+    await session.execute(
+        update(Users)
+        .where(Users.user_id == user_id)
+        .values(is_banned=True)
+    )
     await cache_delete(f"user:{user_id}")
 
 async def unban_user(session: AsyncSession, user_id: int) -> None:
-    user = await get_user(session=session, user_id=user_id)
-    if user is None:
-        await create_user(session=session, user_id=user_id)  # noqa: F841
-        user = await get_user(session=session, user_id=user_id)
-
-    if not user:
-        return
-
-    user.is_banned = False
-    session.add(user)
+    await create_user(session=session, user_id=user_id)
+    await session.execute(
+        update(Users)
+        .where(Users.user_id == user_id)
+        .values(is_banned=False)
+    )
     await cache_delete(f"user:{user_id}")
 
 async def list_of_banned_users(session: AsyncSession) -> list[Users]:
@@ -465,33 +619,62 @@ async def update_global_settings(session: AsyncSession, key: str, value) -> None
     await cache_delete("global_settings")
 
 
+async def estimate_row_count(session: AsyncSession, table_name: str) -> int:
+    """Оценка числа строк из pg_class.reltuples (обновляется VACUUM/ANALYZE), O(1)"""
+    res = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table_name},
+    )
+    # -1 - таблицу ещё ни разу не анализировали
+    return max(res.scalar() or 0, 0)
+
+
+async def get_row_counts(session: AsyncSession) -> dict[str, int]:
+    """Точные числа строк: row_counters плюс ещё не свёрнутые дельты.
+    Для таблиц без счётчика - оценка reltuples"""
+    pending = (
+        select(func.coalesce(func.sum(RowCounterDelta.delta), 0))
+        .where(RowCounterDelta.table_name == RowCounter.table_name)
+        .scalar_subquery()
+    )
+    res = await session.execute(select(RowCounter.table_name, RowCounter.row_count + pending))
+    counts = {name: int(count) for name, count in res.all()}
+    for table in (Users.__tablename__, Chats.__tablename__, MediaCache.__tablename__):
+        if table not in counts:
+            counts[table] = await estimate_row_count(session, table)
+    return counts
+
+
+async def compact_row_counters(session: AsyncSession) -> None:
+    """Сворачивает закоммиченные дельты в row_counters. Только на primary"""
+    await session.execute(text("""
+        WITH moved AS (DELETE FROM row_counter_deltas RETURNING table_name, delta),
+             sums AS (SELECT table_name, sum(delta) AS delta FROM moved GROUP BY table_name)
+        UPDATE row_counters c SET row_count = c.row_count + sums.delta
+        FROM sums WHERE c.table_name = sums.table_name
+    """))
+
+
 async def get_db_overview_stats(session: AsyncSession) -> dict:
     """
     Returns total counts of users and chats in the database,
     along with the count of inactive ones (no activity in the last 30 days).
-    Inactive users: those with no Statistics records in the last 30 days.
+    Inactive users: last_used (kept fresh by the activity tracker) older than 30 days.
     """
-    now = datetime.datetime.now(datetime.timezone.utc)
-    month_ago = now - datetime.timedelta(days=30)
-
-    # Total users & chats
-    res = await session.execute(select(func.count()).select_from(Users))
-    total_users = res.scalar() or 0
+    month_ago = datetime.date.today() - datetime.timedelta(days=30)
 
-    res = await session.execute(select(func.count()).select_from(Chats))
-    total_chats = res.scalar() or 0
+    # Total users, chats & cache: счётчики из row_counters, без COUNT(*)
+    counts = await get_row_counts(session)
+    total_users = counts.get(Users.__tablename__, 0)
+    total_chats = counts.get(Chats.__tablename__, 0)
+    total_cached = counts.get(MediaCache.__tablename__, 0)
 
-    # Active users: distinct user_ids in Statistics for last 30 days
     res = await session.execute(
-        select(func.count(func.distinct(Statistics.user_id)))
-        .where(Statistics.event_time >= month_ago)
+        select(func.count())
+        .select_from(Users)
+        .where(or_(Users.last_used.is_(None), Users.last_used < month_ago))
     )
-    active_users = res.scalar() or 0
-    inactive_users = max(total_users - active_users, 0)
-
-    # Cache count
-    res = await session.execute(select(func.count()).select_from(MediaCache))
-    total_cached = res.scalar() or 0
+    inactive_users = res.scalar() or 0
 
     return {
         "total_users": total_users,
@@ -539,9 +722,20 @@ async def get_cache_counts_by_service(session: AsyncSession) -> dict[str, int]:
 
 
 async def get_media_cache(session: AsyncSession, cache_key: str) -> MediaCacheDTO | None:
-    """Ищет медиа в кэше по уникальному ключу (например, 'yt:123')"""
+    """Ищет медиа в кэше по уникальному ключу (например, 'yt:123') или его alias.
+    Запись под самим ключом важнее записи, на которую указывает alias"""
 
-    stmt = select(MediaCache).where(MediaCache.cache_key == cache_key)
+    aliased = (
+        select(MediaCacheAlias.cache_key)
+        .where(MediaCacheAlias.alias_key == cache_key)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(MediaCache)
+        .where(or_(MediaCache.cache_key == cache_key, MediaCache.cache_key == aliased))
+        .order_by(desc(MediaCache.cache_key == cache_key))
+        .limit(1)
+    )
     result = await session.execute(stmt)
     db_obj = result.scalar_one_or_none()
 
@@ -569,6 +763,23 @@ async def upsert_media_cache(session: AsyncSession, dto: MediaCacheDTO) -> Media
     return MediaCacheDTO.model_validate(updated_obj, from_attributes=True)
 
 
+async def add_media_cache_aliases(session: AsyncSession, cache_key: str, aliases: list[str]) -> None:
+    """Направляет alias-ключи на запись кэша. Если записи нет (файл не закэшировался) - ничего не делает"""
+
+    for alias_key in aliases:
+        if not alias_key or alias_key == cache_key:
+            continue
+        stmt = insert(MediaCacheAlias).from_select(
+            ["alias_key", "cache_key", "created_at"],
+            select(literal(alias_key), MediaCache.cache_key, func.now())
+            .where(MediaCache.cache_key == cache_key),
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["alias_key"],
+            set_={"cache_key": stmt.excluded.cache_key, "created_at": stmt.excluded.created_at},
+        ))
+
+
 async def delete_media_cache(session: AsyncSession, cache_key: str) -> bool:
     """Удаляет запись из кэша (например, если файл удалили с серверов Telegram)"""
 
@@ -583,4 +794,38 @@ async def clear_all_media_cache(session: AsyncSession) -> int:
     """Удаляет все записи из кэша. Возвращает количество удаленных записей."""
     stmt = delete(MediaCache)
     result = await session.execute(stmt)
-    return result.rowcount
\ No newline at end of file
+    return result.rowcount
+
+
+TRACK_INDEX_TTL = 7 * 24 * 3600  # 7 дней в Redis, в Postgres - бессрочно
+
+
+async def get_track_index(session: AsyncSession, track_key: str) -> dict | None:
+    """Метаданные трека по каноническому ключу (например, 'spotify:<id>'), Redis перед Postgres"""
+    cache_key = f"track_index:{track_key}"
+    cached = await cache_get(cache_key)
+    if cached:
+        return cached
+
+    result = await session.execute(select(TrackIndex.data).where(TrackIndex.track_key == track_key))
+    data = result.scalar_one_or_none()
+    if data:
+        await cache_set(cache_key, data, ttl=TRACK_INDEX_TTL)
+    return data
+
+
+async def upsert_track_index(session: AsyncSession, entries: dict[str, tuple[str, dict]]) -> None:
+    """Сохраняет {track_key: (platform, metadata)} одним запросом"""
+    if not entries:
+        return
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = insert(TrackIndex).values([
+        {"track_key": key, "isrc": data["isrc"], "platform": platform, "data": data, "updated_at": now}
+        for key, (platform, data) in entries.items()
+    ])
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=['track_key'],
+        set_={"isrc": stmt.excluded.isrc, "data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at}
+    ))
+    # Redis заполнится при первом чтении: у альбома могут быть сотни треков
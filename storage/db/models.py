@@ -1,7 +1,8 @@
 import datetime
 from datetime import timezone
 from typing import Any
-from sqlalchemy import BigInteger, Boolean, Date, Integer, String, DateTime, JSON, Text
+from sqlalchemy import BigInteger, Boolean, Date, ForeignKey, Integer, String, DateTime, JSON, Text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -19,7 +20,7 @@ class Users(Base):
     stars_donated: Mapped[int] = mapped_column(Integer, default=0)
     premium_ends: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=True)
     last_used: Mapped[datetime.date] = mapped_column(Date, default=datetime.date.today, nullable=True)
-    settings_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    settings_json: Mapped[dict] = mapped_column(JSONB, default=dict)
 
     @property
     def is_premium(self) -> bool:
@@ -45,7 +46,7 @@ class Chats(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     chat_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     owner_id: Mapped[int] = mapped_column(BigInteger)
-    settings_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    settings_json: Mapped[dict] = mapped_column(JSONB, default=dict)
 
 
 class Statistics(Base):
@@ -107,4 +108,56 @@ class MediaCache(Base):
         DateTime(timezone=True),
         default=lambda: datetime.datetime.now(timezone.utc),
         nullable=False
-    )
\ No newline at end of file
+    )
+
+
+class MediaCacheAlias(Base):
+    __tablename__ = "mediacache_alias"
+
+    # Другой ключ того же поста: короткая ссылка, ключ другого тарифа ("ig:X" -> "ig:X:sponsor")
+    alias_key: Mapped[str] = mapped_column(String, primary_key=True)
+    cache_key: Mapped[str] = mapped_column(
+        String, ForeignKey("mediacache.cache_key", ondelete="CASCADE"), index=True, nullable=False
+    )
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
+class TrackIndex(Base):
+    __tablename__ = "track_index"
+
+    # Канонический id трека на площадке, например "spotify:4uLU6hMCjMI75M1A2tKUQC"
+    track_key: Mapped[str] = mapped_column(String, primary_key=True)
+    isrc: Mapped[str] = mapped_column(String(32), index=True, nullable=False)
+    platform: Mapped[str] = mapped_column(String, nullable=False)
+
+    # Ответ lossless-core /metadata для трека (title, artist, duration, ...)
+    data: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
+class RowCounter(Base):
+    __tablename__ = "row_counters"
+
+    # Свёрнутые дельты из row_counter_deltas (сворачивает admin_stats)
+    table_name: Mapped[str] = mapped_column(String, primary_key=True)
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class RowCounterDelta(Base):
+    __tablename__ = "row_counter_deltas"
+
+    # Строка на каждый INSERT/DELETE в users, chats, mediacache (statement-level триггеры).
+    # Только вставки - никто не ждёт блокировку общей строки
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    table_name: Mapped[str] = mapped_column(String, nullable=False)
+    delta: Mapped[int] = mapped_column(BigInteger, nullable=False)
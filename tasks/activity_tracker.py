@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import logging
+
+import redis.asyncio as redis
+from sqlalchemy import or_, update
+
+from storage.cache import redis_client as _redis_module
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "activity:pending:"  # SET user_id, ещё не записанных в Postgres за день
+SEEN_KEY = "activity:seen:"  # SET всех активных за день, для статистики
+SEEN_TTL = 40 * 24 * 3600
+
+
+class ActivityTracker:
+    """Write-behind для Users.last_used.
+
+    touch() только кладёт id в локальное множество (один раз в день на
+    процесс). Раз в ``interval`` секунд накопленное уходит в Redis, а
+    общие для всех процессов ожидающие id забираются SPOP-ом и пишутся
+    в Postgres пачками по ``batch_size`` одним UPDATE на пачку.
+    Без Redis пачки пишутся прямо из локального множества.
+    """
+
+    def __init__(self, interval: float = 60.0, batch_size: int = 5000):
+        self._interval = interval
+        self._batch_size = batch_size
+        self._day = datetime.date.today()
+        self._seen_today: set[int] = set()
+        self._pending: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    def touch(self, user_id: int) -> None:
+        today = datetime.date.today()
+        if today != self._day:
+            self._day = today
+            self._seen_today.clear()
+        if user_id in self._seen_today:
+            return
+        self._seen_today.add(user_id)
+        self._pending.add(user_id)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Final activity flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Activity flush failed, will retry: {e}")
+
+    async def _publish(self, day: datetime.date, user_ids: list[int]) -> bool:
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.sadd(f"{PENDING_KEY}{day.isoformat()}", *user_ids)
+                pipe.sadd(f"{SEEN_KEY}{day.isoformat()}", *user_ids)
+                pipe.expire(f"{SEEN_KEY}{day.isoformat()}", SEEN_TTL)
+                await pipe.execute()
+            return True
+        except redis.RedisError as e:
+            logger.warning(f"Failed to publish activity to Redis, writing directly: {e}")
+            return False
+
+    async def _write(self, day: datetime.date, user_ids: list[int]) -> None:
+        from storage.db import database_manager
+        from storage.db.models import Users
+
+        async with database_manager.async_session() as session:
+            for start in range(0, len(user_ids), self._batch_size):
+                batch = user_ids[start:start + self._batch_size]
+                await session.execute(
+                    update(Users)
+                    .where(Users.user_id.in_(batch))
+                    .where(or_(Users.last_used.is_(None), Users.last_used < day))
+                    .values(last_used=day)
+                )
+            await session.commit()
+
+    async def _drain_redis(self, day: datetime.date) -> None:
+        key = f"{PENDING_KEY}{day.isoformat()}"
+        while True:
+            try:
+                members = await self._redis.spop(key, self._batch_size)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read pending activity: {e}")
+                return
+            if not members:
+                return
+            user_ids = [int(member) for member in members]
+            try:
+                await self._write(day, user_ids)
+            except Exception:
+                # Вернём пачку, чтобы её забрал следующий flush
+                await self._redis.sadd(key, *user_ids)
+                raise
+
+    async def flush(self) -> None:
+        day = self._day
+        pending, self._pending = list(self._pending), set()
+
+        if self._redis is None:
+            if pending:
+                try:
+                    await self._write(day, pending)
+                except Exception:
+                    self._pending.update(pending)
+                    raise
+            return
+
+        if pending and not await self._publish(day, pending):
+            try:
+                await self._write(day, pending)
+            except Exception:
+                self._pending.update(pending)
+                raise
+        # Забираем и чужие id: SPOP атомарен, процессы делят работу между собой
+        yesterday = day - datetime.timedelta(days=1)
+        await self._drain_redis(yesterday)
+        await self._drain_redis(day)
+
+
+activity_tracker = ActivityTracker()
@@ -0,0 +1,214 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Ответы, которые значат "бэкенд перегружен", а не "ссылка плохая"
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+
+# Целевая латентность, с по префиксу ключа (самый длинный совпавший).
+# Ответ медленнее цели - бэкенд захлёбывается, как при 503
+LATENCY_TARGETS = {
+    "media-core/download/youtube": 300.0,  # 4K и длинные видео, таймаут запроса 600
+    "media-core/download": 120.0,
+    "media-core": 30.0,
+}
+DEFAULT_LATENCY_TARGET = 180.0  # lossless-core и прочие: скачивание альбомов
+
+# Эндпоинты, разрешение которых уже взято на уровне загрузки (TaskManager):
+# запросы из неё не занимают второе место в лимитере, а только сообщают ему латентность
+_held_permits: contextvars.ContextVar[frozenset[str]] = contextvars.ContextVar(
+    "held_backend_permits", default=frozenset()
+)
+
+
+@dataclass
+class LimiterStats:
+    key: str
+    limit: float
+    inflight: int
+    waiting: int
+    successes: int
+    overloads: int
+    slow: int
+    latency_target: float
+
+
+class AIMDLimiter:
+    """Лимит параллельных запросов к одному эндпоинту бэкенда (AIMD).
+
+    Успешный ответ быстрее ``latency_target`` увеличивает лимит на
+    1/limit (примерно +1 за "окно" запросов). Признак перегрузки или ответ
+    медленнее цели уменьшает его в ``backoff`` раз, но не чаще раза в
+    ``cooldown`` секунд, чтобы пачка одновременных ошибок не обрушила
+    лимит до минимума. Запрос без латентности (отмена, ошибка клиента)
+    лимит не меняет.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        initial: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        backoff: float = 0.7,
+        cooldown: float = 2.0,
+        latency_target: float = DEFAULT_LATENCY_TARGET,
+    ):
+        self.key = key
+        self.latency_target = latency_target
+        self.limit = float(initial)
+        self._min = float(min_limit)
+        self._max = float(max_limit)
+        self._backoff = backoff
+        self._cooldown = cooldown
+        self._last_decrease = 0.0
+
+        self._inflight = 0
+        self._waiting = 0
+        self._successes = 0
+        self._overloads = 0
+        self._slow = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            self._waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self._inflight < int(self.limit))
+            finally:
+                self._waiting -= 1
+            self._inflight += 1
+
+    async def release(self, overloaded: bool, latency: float | None = None) -> None:
+        async with self._condition:
+            self._inflight -= 1
+            self._observe(overloaded, latency)
+            self._condition.notify_all()
+
+    async def record(self, overloaded: bool, latency: float | None = None) -> None:
+        """Исход запроса, сделанного под уже взятым разрешением"""
+        async with self._condition:
+            self._observe(overloaded, latency)
+            self._condition.notify_all()
+
+    def _observe(self, overloaded: bool, latency: float | None) -> None:
+        slow = not overloaded and latency is not None and latency > self.latency_target
+        if overloaded or slow:
+            if slow:
+                self._slow += 1
+            else:
+                self._overloads += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self._cooldown:
+                self._last_decrease = now
+                old = self.limit
+                self.limit = max(self._min, self.limit * self._backoff)
+                reason = f"slow ({latency:.1f}s > {self.latency_target:.0f}s)" if slow else "overloaded"
+                logger.warning(f"Backend {self.key} {reason}, limit {old:.1f} -> {self.limit:.1f}")
+        elif latency is not None:
+            self._successes += 1
+            self.limit = min(self._max, self.limit + 1 / self.limit)
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            key=self.key,
+            limit=self.limit,
+            inflight=self._inflight,
+            waiting=self._waiting,
+            successes=self._successes,
+            overloads=self._overloads,
+            slow=self._slow,
+            latency_target=self.latency_target,
+        )
+
+
+class BackendLimits:
+    """Реестр лимитеров: по одному на (бэкенд, эндпоинт)"""
+
+    def __init__(self, latency_targets: dict[str, float] | None = None, **limiter_kwargs):
+        self._latency_targets = LATENCY_TARGETS if latency_targets is None else latency_targets
+        self._limiter_kwargs = limiter_kwargs
+        self._limiters: dict[str, AIMDLimiter] = {}
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """http://media-core:9546/download/instagram -> media-core/download/instagram"""
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.split("/") if s][:2]
+        return "/".join([parts.hostname or "unknown", *segments])
+
+    def latency_target_for(self, key: str) -> float:
+        prefixes = [p for p in self._latency_targets if key == p or key.startswith(f"{p}/")]
+        if not prefixes:
+            return self._limiter_kwargs.get("latency_target", DEFAULT_LATENCY_TARGET)
+        return self._latency_targets[max(prefixes, key=len)]
+
+    def get(self, key: str) -> AIMDLimiter:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            kwargs = {**self._limiter_kwargs, "latency_target": self.latency_target_for(key)}
+            limiter = self._limiters[key] = AIMDLimiter(key, **kwargs)
+        return limiter
+
+    def snapshot(self) -> list[LimiterStats]:
+        return [limiter.stats() for _, limiter in sorted(self._limiters.items())]
+
+    @staticmethod
+    @contextlib.contextmanager
+    def holding(key: str):
+        """Помечает разрешение эндпоинта взятым для кода внутри (и задач, созданных в нём)"""
+        token = _held_permits.set(_held_permits.get() | {key})
+        try:
+            yield
+        finally:
+            _held_permits.reset(token)
+
+
+class AdaptiveLimitTransport(httpx.AsyncBaseTransport):
+    """httpx транспорт, пропускающий каждый запрос через AIMD лимитер его эндпоинта.
+
+    Если загрузка уже держит разрешение эндпоинта (``BackendLimits.holding``),
+    запрос идёт без ожидания и только сообщает лимитеру исход.
+    """
+
+    def __init__(self, limits: BackendLimits, transport: httpx.AsyncBaseTransport | None = None):
+        self._limits = limits
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self._limits.key_for(str(request.url))
+        limiter = self._limits.get(key)
+        held = key in _held_permits.get()
+        if not held:
+            await limiter.acquire()
+
+        overloaded = False
+        latency = None
+        started = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+            latency = time.monotonic() - started
+            overloaded = response.status_code in OVERLOAD_STATUSES
+            return response
+        except (httpx.TimeoutException, httpx.NetworkError):
+            overloaded = True
+            raise
+        finally:
+            if held:
+                await limiter.record(overloaded, latency)
+            else:
+                await limiter.release(overloaded, latency)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+backend_limits = BackendLimits()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+
+from storage.cache import redis_client as _redis_module
+from storage.cache.redis_client import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "admin:stats:snapshot"
+LOCK_KEY = "admin:stats:lock"
+
+
+class AdminStatsSnapshot:
+    """Снимок статистики для админ-панели, пересчитывается в фоне.
+
+    Агрегаты по statistics и users (активные, успешность, премиум)
+    считаются раз в ``interval`` секунд одним процессом (SET NX lock)
+    и лежат в Redis, так что клик в панели читает готовый снимок и
+    не запускает сканов на базе.
+    """
+
+    def __init__(self, interval: float = 300.0):
+        self._interval = interval
+        self._local: dict | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Admin stats refresh failed: {e}")
+            await asyncio.sleep(self._interval)
+
+    async def _collect(self) -> dict:
+        from storage.db import database_manager
+        from storage.db.crud import (
+            compact_row_counters,
+            get_db_overview_stats,
+            get_premium_and_donation_stats,
+            get_status_stats,
+            get_user_counts,
+        )
+
+        # Дельты счётчиков строк копятся от триггеров, сворачиваем их здесь же (на primary)
+        try:
+            async with database_manager.async_session() as session:
+                await compact_row_counters(session)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to compact row counters: {e}")
+
+        async with database_manager.read_session() as session:
+            return {
+                "user_counts": await get_user_counts(session),
+                "status_stats": await get_status_stats(session),
+                "db_overview": await get_db_overview_stats(session),
+                "premium": await get_premium_and_donation_stats(session),
+                "updated_at": int(time.time()),
+            }
+
+    async def refresh(self, force: bool = False) -> None:
+        client = self._redis
+        if client is not None and not force:
+            try:
+                # Снимок свежий или его уже считает другой процесс
+                if not await client.set(LOCK_KEY, "1", nx=True, ex=max(int(self._interval) - 5, 1)):
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Failed to take admin stats lock: {e}")
+
+        started = time.monotonic()
+        snapshot = await self._collect()
+        self._local = snapshot
+        logger.info(f"Admin stats snapshot refreshed in {time.monotonic() - started:.1f}s")
+
+        if client is not None:
+            await cache_set(SNAPSHOT_KEY, snapshot, ttl=int(self._interval) * 3)
+
+    async def get(self) -> dict | None:
+        """Последний снимок или None, если он ещё не посчитан"""
+        cached = await cache_get(SNAPSHOT_KEY)
+        return cached or self._local
+
+
+admin_stats = AdminStatsSnapshot()
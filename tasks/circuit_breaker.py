@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+
+import httpx
+
+from core.config import settings
+from models.errors import BotError, ErrorCode
+from tasks.adaptive_limiter import BackendLimits
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Предохранитель для одного (бэкенд, эндпоинт).
+
+    Размыкается после ``consecutive`` ошибок подряд или когда доля ошибок
+    среди последних ``window`` запросов достигает ``failure_rate``. Пока
+    разомкнут, запросы сразу отклоняются. Через ``open_seconds`` пропускает
+    до ``half_open_probes`` пробных запросов одновременно: ``half_open_successes``
+    успехов замыкают, любая ошибка снова размыкает на вдвое больший срок
+    (до ``max_open_seconds``).
+    """
+
+    def __init__(
+        self,
+        key: str,
+        consecutive: int = 5,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        half_open_probes: int = 3,
+        half_open_successes: int = 3,
+        on_change=None,
+    ):
+        self.key = key
+        self.state = BreakerState.CLOSED
+        self._consecutive = consecutive
+        self._min_calls = min_calls
+        self._failure_rate = failure_rate
+        self._base_open = open_seconds
+        self._max_open = max_open_seconds
+        self._half_open_probes = half_open_probes
+        self._half_open_successes = half_open_successes
+        self._on_change = on_change
+
+        self._results: deque[bool] = deque(maxlen=window)
+        self._failures_in_row = 0
+        self._open_seconds = open_seconds
+        self.opened_until = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def _set_state(self, state: BreakerState) -> None:
+        old, self.state = self.state, state
+        if old != state:
+            logger.warning(f"Circuit {self.key}: {old.value} -> {state.value}")
+            if self._on_change:
+                self._on_change(self, old, state)
+
+    def _open(self) -> None:
+        self.opened_until = time.monotonic() + self._open_seconds
+        self._results.clear()
+        self._failures_in_row = 0
+        self._set_state(BreakerState.OPEN)
+
+    def allow(self) -> bool:
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() < self.opened_until:
+                return False
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            self._set_state(BreakerState.HALF_OPEN)
+        # Пробных запросов в полёте и уже успешных хватит, чтобы решить судьбу предохранителя
+        if self._probes_in_flight + self._probe_successes >= self._half_open_successes:
+            return False
+        if self._probes_in_flight >= self._half_open_probes:
+            return False
+        self._probes_in_flight += 1
+        return True
+
+    def record(self, ok: bool) -> None:
+        if self.state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if ok:
+                self._probe_successes += 1
+                if self._probe_successes >= self._half_open_successes:
+                    self._open_seconds = self._base_open
+                    self._set_state(BreakerState.CLOSED)
+            else:
+                self._open_seconds = min(self._max_open, self._open_seconds * 2)
+                self._open()
+            return
+
+        if self.state == BreakerState.OPEN:
+            return  # Запоздавший ответ, пришедший до размыкания
+
+        self._results.append(ok)
+        self._failures_in_row = 0 if ok else self._failures_in_row + 1
+        failures = self._results.count(False)
+        if self._failures_in_row >= self._consecutive or (
+            len(self._results) >= self._min_calls
+            and failures / len(self._results) >= self._failure_rate
+        ):
+            self._open()
+
+    def abandon(self) -> None:
+        """Запрос отменён до ответа, пробный слот освобождается"""
+        if self.state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+
+class BreakerAlerts:
+    """Собирает смены состояний за ``delay`` секунд в одно сообщение админу"""
+
+    ICONS = {BreakerState.OPEN: "🔴", BreakerState.HALF_OPEN: "🟡", BreakerState.CLOSED: "🟢"}
+
+    def __init__(self, delay: float = 5.0):
+        self._delay = delay
+        self._pending: dict[str, tuple[BreakerState, BreakerState]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    def push(self, breaker: CircuitBreaker, old: BreakerState, new: BreakerState) -> None:
+        first_old = self._pending.get(breaker.key, (old, new))[0]
+        if first_old == new:
+            # Туда и обратно за одно окно - сообщать не о чем
+            self._pending.pop(breaker.key, None)
+        else:
+            self._pending[breaker.key] = (first_old, new)
+
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+            except RuntimeError:
+                pass
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self._delay)
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        from core.config import settings
+        from core.loader import bot
+
+        lines = ["⚡️ <b>Backend circuit breakers</b>\n"]
+        for key, (old, new) in sorted(pending.items()):
+            lines.append(f"{self.ICONS[new]} <code>{key}</code>: {old.value} → <b>{new.value}</b>")
+
+        if bot is None or not settings.ADMIN_ID:
+            return
+        try:
+            await bot.send_message(settings.ADMIN_ID, "\n".join(lines))
+        except Exception as e:
+            logger.error(f"Failed to send circuit breaker alert: {e}")
+
+
+class CircuitBreakers:
+    """Реестр предохранителей по ключу эндпоинта"""
+
+    def __init__(self, alerts: BreakerAlerts | None = None, **breaker_kwargs):
+        self._alerts = alerts
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                key, on_change=self._alerts.push if self._alerts else None, **self._breaker_kwargs
+            )
+        return breaker
+
+    def snapshot(self) -> dict[str, CircuitBreaker]:
+        return dict(self._breakers)
+
+
+def _is_failure(response: httpx.Response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """Отклоняет запросы к разомкнутому эндпоинту до того, как они встанут в очередь"""
+
+    def __init__(self, breakers: CircuitBreakers, transport: httpx.AsyncBaseTransport):
+        self._breakers = breakers
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = self._breakers.get(BackendLimits.key_for(str(request.url)))
+        if not breaker.allow():
+            raise BotError(
+                code=ErrorCode.SERVICE_UNAVAILABLE,
+                message=f"Circuit open for {breaker.key}",
+                send_user_message=True,
+            )
+
+        recorded = False
+        try:
+            response = await self._transport.handle_async_request(request)
+            breaker.record(not _is_failure(response))
+            recorded = True
+            return response
+        except (httpx.TimeoutException, httpx.NetworkError):
+            breaker.record(False)
+            recorded = True
+            raise
+        finally:
+            if not recorded:
+                breaker.abandon()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+circuit_breakers = CircuitBreakers(
+    alerts=BreakerAlerts(),
+    half_open_probes=settings.BREAKER_HALF_OPEN_PROBES,
+    half_open_successes=settings.BREAKER_HALF_OPEN_SUCCESSES,
+)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+import uuid
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_HEADER = "X-Job-Id"
+DEADLINE_HEADER = "X-Deadline"  # абсолютный срок, unix time в миллисекундах
+
+# Долгие задачи core: media-core /download/{service}, lossless-core /download
+JOB_PATH_PREFIX = "/download"
+
+CANCEL_TIMEOUT = 5.0
+
+
+def cancel_url(url: httpx.URL, job_id: str) -> httpx.URL:
+    """POST {core}/jobs/{job_id}/cancel на том же сервисе, что и сама задача"""
+    return url.copy_with(path=f"/jobs/{job_id}/cancel", query=None)
+
+
+class CoreJobTransport(httpx.AsyncBaseTransport):
+    """Помечает загрузки в core идентификатором и сроком, а при отмене - отменяет их там.
+
+    Каждый POST на /download* получает ``X-Job-Id`` (если вызывающий не
+    задал свой) и ``X-Deadline`` из read-таймаута запроса, так что core
+    сам бросает работу, которую бот уже не дождётся. Если запрос отменён
+    (/cancel, отмена задачи) или истёк локальный таймаут, в core уходит
+    отмена задачи, не дожидаясь ответа, и её CPU и канал освобождаются сразу.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self._pending: set[asyncio.Task] = set()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or not request.url.path.startswith(JOB_PATH_PREFIX):
+            return await self._transport.handle_async_request(request)
+
+        job_id = request.headers.get(JOB_ID_HEADER)
+        if not job_id:
+            job_id = uuid.uuid4().hex
+            request.headers[JOB_ID_HEADER] = job_id
+        read_timeout = (request.extensions.get("timeout") or {}).get("read")
+        if read_timeout and DEADLINE_HEADER not in request.headers:
+            request.headers[DEADLINE_HEADER] = str(int((time.time() + read_timeout) * 1000))
+
+        try:
+            return await self._transport.handle_async_request(request)
+        except (asyncio.CancelledError, httpx.TimeoutException) as e:
+            logger.info(f"Core job {job_id} abandoned ({type(e).__name__}), cancelling it on {request.url.host}")
+            self.cancel_in_background(request.url, job_id)
+            raise
+
+    def cancel_in_background(self, url: httpx.URL, job_id: str) -> None:
+        # Отдельная задача: отменённый вызывающий не должен её ждать
+        task = asyncio.create_task(self.cancel(url, job_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def cancel(self, url: httpx.URL, job_id: str) -> bool:
+        request = httpx.Request(
+            "POST",
+            cancel_url(url, job_id),
+            headers={JOB_ID_HEADER: job_id},
+            extensions={"timeout": httpx.Timeout(CANCEL_TIMEOUT).as_dict()},
+        )
+        try:
+            response = await self._transport.handle_async_request(request)
+            await response.aread()
+            await response.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to cancel core job {job_id}: {e}")
+            return False
+        # 404 - задача уже закончилась или core отмену не поддерживает
+        return response.status_code < 300
+
+    async def aclose(self) -> None:
+        if self._pending:
+            await asyncio.wait(self._pending, timeout=CANCEL_TIMEOUT)
+        await self._transport.aclose()
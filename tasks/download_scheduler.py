@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class Lane(str, Enum):
+    PRIORITY = "priority"  # спонсоры и оплаченные загрузки
+    FREE = "free"
+
+
+@dataclass
+class _Job:
+    user_id: int
+    lane: Lane
+    tag: float
+    seq: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class DownloadScheduler:
+    """Очередь загрузок со взвешенным справедливым обслуживанием (WFQ).
+
+    Внутри полосы выбирается задача с наименьшим виртуальным временем
+    окончания, так что пользователь с десятью ссылками не блокирует
+    пользователя с одной. Приоритетная полоса обслуживается первой, но
+    бесплатная получает минимум один слот из ``free_every`` и любую задачу,
+    которая ждёт дольше ``starvation_timeout`` секунд.
+    """
+
+    def __init__(
+        self,
+        slots: int = 10,
+        sponsor_concurrency: int = 3,
+        sponsor_weight: float = 2.0,
+        free_every: int = 4,
+        starvation_timeout: float = 30.0,
+    ):
+        self.slots = slots
+        self.sponsor_concurrency = sponsor_concurrency
+        self._sponsor_weight = sponsor_weight
+        self._free_every = free_every
+        self._starvation_timeout = starvation_timeout
+
+        self._waiting: list[_Job] = []
+        self._running: dict[int, int] = {}
+        self._user_limits: dict[int, int] = {}
+        self._user_tags: dict[int, float] = {}
+        self._vtime = 0.0
+        self._priority_streak = 0
+        self._seq = itertools.count()
+        # EWMA длительности загрузки, для оценки ожидания
+        self.avg_duration = 20.0
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def _eligible(self, job: _Job) -> bool:
+        return self._running.get(job.user_id, 0) < self._user_limits.get(job.user_id, 1)
+
+    def _pick(self) -> _Job | None:
+        eligible = [job for job in self._waiting if self._eligible(job)]
+        if not eligible:
+            return None
+
+        free = [job for job in eligible if job.lane == Lane.FREE]
+        priority = [job for job in eligible if job.lane == Lane.PRIORITY]
+
+        if free:
+            oldest = min(free, key=lambda job: job.enqueued_at)
+            if time.monotonic() - oldest.enqueued_at >= self._starvation_timeout:
+                return oldest
+
+        if priority and (not free or self._priority_streak < self._free_every - 1):
+            self._priority_streak = self._priority_streak + 1 if free else 0
+            return min(priority, key=lambda job: (job.tag, job.seq))
+
+        self._priority_streak = 0
+        return min(free, key=lambda job: (job.tag, job.seq))
+
+    def _dispatch(self) -> None:
+        while self.running < self.slots:
+            job = self._pick()
+            if job is None:
+                return
+            self._waiting.remove(job)
+            self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+            self._vtime = max(self._vtime, job.tag)
+            job.future.set_result(None)
+
+    def _forget_idle(self, user_id: int) -> None:
+        if self._running.get(user_id) or any(job.user_id == user_id for job in self._waiting):
+            return
+        self._running.pop(user_id, None)
+        self._user_limits.pop(user_id, None)
+        if self._user_tags.get(user_id, 0) <= self._vtime:
+            self._user_tags.pop(user_id, None)
+
+    def enqueue(self, user_id: int, lane: Lane, is_sponsor: bool = False) -> _Job:
+        """Ставит задачу в очередь. Слот выдан, когда job.future завершён"""
+        weight = self._sponsor_weight if is_sponsor else 1.0
+        self._user_limits[user_id] = max(
+            self._user_limits.get(user_id, 1), self.sponsor_concurrency if is_sponsor else 1
+        )
+        tag = max(self._vtime, self._user_tags.get(user_id, 0.0)) + 1 / weight
+        self._user_tags[user_id] = tag
+
+        job = _Job(user_id=user_id, lane=lane, tag=tag, seq=next(self._seq))
+        self._waiting.append(job)
+        self._dispatch()
+        return job
+
+    async def wait(self, job: _Job, on_tick=None, interval: float = 5.0) -> None:
+        """Ждёт выдачи слота, раз в ``interval`` секунд вызывая ``on_tick(job)``.
+        После успешного ожидания обязательно вызвать release"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(job.future), timeout=interval)
+                    return
+                except asyncio.TimeoutError:
+                    if on_tick is not None:
+                        await on_tick(job)
+        except asyncio.CancelledError:
+            if job in self._waiting:
+                self._waiting.remove(job)
+                self._forget_idle(job.user_id)
+            elif job.future.done() and not job.future.cancelled():
+                # Слот уже выдан, но мы отменены до старта
+                self.release(job.user_id)
+            raise
+
+    async def acquire(self, user_id: int, lane: Lane, is_sponsor: bool = False) -> None:
+        await self.wait(self.enqueue(user_id, lane, is_sponsor))
+
+    def position(self, job: _Job) -> int:
+        """Примерное место в очереди (1 - следующий)"""
+        if job not in self._waiting:
+            return 0
+        same_lane = sum(
+            1 for other in self._waiting
+            if other.lane == job.lane and (other.tag, other.seq) < (job.tag, job.seq)
+        )
+        if job.lane == Lane.PRIORITY:
+            return same_lane + 1
+        # Бесплатная полоса пропускает вперёд до free_every-1 приоритетных на каждую свою
+        priority = sum(1 for other in self._waiting if other.lane == Lane.PRIORITY)
+        return same_lane + 1 + min(priority, (same_lane + 1) * (self._free_every - 1))
+
+    def projected_position(self, lane: Lane) -> int:
+        """Место, которое получила бы новая задача в этой полосе"""
+        same_lane = sum(1 for job in self._waiting if job.lane == lane)
+        if lane == Lane.PRIORITY:
+            return same_lane + 1
+        priority = self.waiting - same_lane
+        return same_lane + 1 + min(priority, (same_lane + 1) * (self._free_every - 1))
+
+    def observe_duration(self, seconds: float) -> None:
+        self.avg_duration += 0.1 * (seconds - self.avg_duration)
+
+    def estimate_wait(self, position: int) -> float:
+        """Оценка ожидания в секундах для места ``position``"""
+        if position <= 0:
+            return 0.0
+        return math.ceil(position / self.slots) * self.avg_duration
+
+    def release(self, user_id: int) -> None:
+        self._running[user_id] = self._running.get(user_id, 1) - 1
+        self._forget_idle(user_id)
+        self._dispatch()
+
+    def cancel_waiting(self, user_id: int) -> int:
+        """Снимает из очереди все ожидающие задачи пользователя"""
+        jobs = [job for job in self._waiting if job.user_id == user_id]
+        for job in jobs:
+            self._waiting.remove(job)
+            job.future.cancel()
+        self._forget_idle(user_id)
+        return len(jobs)
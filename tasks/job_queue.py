@@ -0,0 +1,341 @@
+import asyncio
+import datetime
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis
+
+from core import json_codec
+from storage.cache import redis_client as _redis_module
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DownloadJob:
+    """Загрузка, которую можно положить в очередь и выполнить в другом процессе.
+
+    Сообщение, на которое нужно ответить, хранится как chat/message id,
+    а ``options`` - параметры конкретного исполнителя (качество, обрезка...).
+    """
+    kind: str
+    chat_id: int
+    chat_type: str
+    message_id: int
+    user_id: int
+    url: str
+    options: dict = field(default_factory=dict)
+    payment_charge_id: str | None = None
+    thread_id: int | None = None
+    attempts: int = 0
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def for_message(cls, kind: str, message, user_id: int, url: str, **kwargs) -> "DownloadJob":
+        return cls(
+            kind=kind,
+            chat_id=message.chat.id,
+            chat_type=message.chat.type,
+            message_id=message.message_id,
+            user_id=user_id,
+            url=url,
+            thread_id=message.message_thread_id if message.is_topic_message else None,
+            **kwargs,
+        )
+
+    def dumps(self) -> str:
+        return json_codec.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, data: str) -> "DownloadJob":
+        return cls(**json_codec.loads(data))
+
+    def message(self, message_id: int | None = None):
+        """Message, привязанный к боту: answer/reply/delete работают как у исходного"""
+        from aiogram.types import Chat, Message, User
+
+        from core.loader import bot
+
+        return Message(
+            message_id=message_id or self.message_id,
+            date=datetime.datetime.now(datetime.timezone.utc),
+            chat=Chat(id=self.chat_id, type=self.chat_type),
+            from_user=User(id=self.user_id, is_bot=False, first_name=""),
+            message_thread_id=self.thread_id,
+            is_topic_message=self.thread_id is not None or None,
+        ).as_(bot)
+
+
+JobHandler = Callable[[DownloadJob], Awaitable[None]]
+# Задача ушла в dead-letter: сообщить пользователю и вернуть оплату
+FailureHandler = Callable[[DownloadJob, str], Awaitable[None]]
+
+# Lua: переносит наступившие повторы из ZSET (score - срок) обратно в стрим
+_PROMOTE_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, data in ipairs(due) do
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'job', data)
+    redis.call('ZREM', KEYS[1], data)
+end
+return #due
+"""
+
+
+class JobQueue:
+    """Очередь загрузок на Redis Streams с consumer group.
+
+    Хендлер кладёт задачу (XADD) и сразу отвечает, а ``concurrency``
+    воркеров в каждом процессе забирают её через XREADGROUP. Задача
+    подтверждается (XACK) после выполнения. Упавшая с исключением
+    повторяется до ``max_attempts`` раз с паузой ``retry_delay``,
+    удваивающейся с каждой попыткой (ждёт в ZSET), потом уходит в
+    dead-letter стрим, а пользователю сообщает ``on_failure`` хендлера. Задачи процесса, который умер посреди загрузки, через
+    ``claim_idle`` секунд забирает другой процесс (XAUTOCLAIM); свои
+    текущие задачи воркер периодически "трогает", чтобы их не забрали.
+
+    Без Redis задачи выполняются сразу в этом процессе, как раньше.
+    """
+
+    STREAM = "jobs:downloads"
+    DEAD_STREAM = "jobs:downloads:dead"
+    DELAYED = "jobs:downloads:delayed"
+    GROUP = "downloaders"
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        claim_idle: float = 300.0,
+        drain_timeout: float = 120.0,
+        maxlen: int = 100_000,
+    ):
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._claim_idle_ms = int(claim_idle * 1000)
+        self._drain_timeout = drain_timeout
+        self._maxlen = maxlen
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._handlers: dict[str, JobHandler] = {}
+        self._failure_handlers: dict[str, FailureHandler] = {}
+        self._workers: list[asyncio.Task] = []
+        self._in_flight: dict[str, asyncio.Task] = {}  # stream id -> выполнение
+        self._local: set[asyncio.Task] = set()
+        self._draining = False
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    def register(self, kind: str, handler: JobHandler, on_failure: FailureHandler | None = None) -> None:
+        self._handlers[kind] = handler
+        if on_failure is not None:
+            self._failure_handlers[kind] = on_failure
+
+    def is_last_attempt(self, job: DownloadJob) -> bool:
+        """После этой попытки задача уйдёт в dead-letter: хендлеру пора сообщить об ошибке и вернуть оплату"""
+        return job.attempts + 1 >= self._max_attempts
+
+    async def enqueue(self, job: DownloadJob) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.xadd(
+                    self.STREAM, {"job": job.dumps()}, maxlen=self._maxlen, approximate=True
+                )
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Failed to enqueue job {job.job_id}, running it here: {e}")
+
+        # Локально повторять некому: первая попытка сразу последняя
+        job.attempts = self._max_attempts - 1
+        task = asyncio.create_task(self._execute(job))
+        self._local.add(task)
+        task.add_done_callback(self._local.discard)
+
+    async def start(self) -> None:
+        if self._redis is None or self._workers or self._concurrency <= 0:
+            return
+        try:
+            await self._redis.xgroup_create(self.STREAM, self.GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._draining = False
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._concurrency)]
+        self._workers.append(asyncio.create_task(self._maintain()))
+        self._workers.append(asyncio.create_task(self._promote_delayed()))
+        logger.info(f"Job queue started: {self._concurrency} workers as {self._consumer}")
+
+    async def stop(self) -> None:
+        """Перестаёт брать новые задачи и ждёт текущие не дольше drain_timeout.
+        Недоделанные остаются неподтверждёнными и достанутся другому процессу."""
+        self._draining = True
+        # Выполнение задач защищено shield, отмена воркеров прерывает только чтение
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+        running = [*self._in_flight.values(), *self._local]
+        if running:
+            logger.info(f"Draining {len(running)} running jobs...")
+            done, pending = await asyncio.wait(running, timeout=self._drain_timeout)
+            if pending:
+                logger.warning(f"{len(pending)} jobs still running after drain, they will be reclaimed")
+
+    async def _execute(self, job: DownloadJob) -> None:
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        await handler(job)
+
+    async def _work(self) -> None:
+        while not self._draining:
+            try:
+                response = await self._redis.xreadgroup(
+                    self.GROUP, self._consumer, {self.STREAM: ">"}, count=1, block=2000
+                )
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                logger.warning(f"Job queue read failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for _, messages in response or []:
+                for stream_id, fields in messages:
+                    await self._process(stream_id, fields)
+
+    async def _process(self, stream_id: str, fields: dict) -> None:
+        try:
+            job = DownloadJob.loads(fields["job"])
+        except Exception as e:
+            await self._dead_letter(stream_id, fields.get("job", ""), f"Malformed job: {e}")
+            return
+
+        # Отдельная задача вместе с ack: stop() ждёт её, а отмена воркера не обрывает загрузку
+        task = asyncio.create_task(self._run(stream_id, job))
+        self._in_flight[stream_id] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(stream_id, None))
+        await asyncio.shield(task)
+
+    async def _run(self, stream_id: str, job: DownloadJob) -> None:
+        try:
+            await self._execute(job)
+        except Exception as e:
+            logger.exception(f"Job {job.job_id} ({job.kind}) failed on attempt {job.attempts + 1}: {e}")
+            await self._retry(stream_id, job, str(e))
+            return
+        await self._ack(stream_id)
+
+    async def _retry(self, stream_id: str, job: DownloadJob, error: str) -> None:
+        job.attempts += 1
+        if job.attempts >= self._max_attempts:
+            await self._fail(job, error)
+            await self._dead_letter(stream_id, job.dumps(), error)
+            return
+        # Сразу повторять бессмысленно: 5xx и таймауты за секунды не проходят, а предохранитель разомкнётся
+        delay = self._retry_delay * 2 ** (job.attempts - 1)
+        due = int((time.time() + delay) * 1000)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.DELAYED, {job.dumps(): due})
+                pipe.xack(self.STREAM, self.GROUP, stream_id)
+                pipe.xdel(self.STREAM, stream_id)
+                await pipe.execute()
+            logger.info(f"Job {job.job_id} ({job.kind}) will retry in {delay:.0f}s")
+        except redis.RedisError as e:
+            logger.warning(f"Failed to requeue job {job.job_id}, it will be reclaimed: {e}")
+
+    async def _fail(self, job: DownloadJob, error: str) -> None:
+        """Последняя попытка не удалась, а хендлер не сообщил об ошибке сам (упал он или процесс)"""
+        on_failure = self._failure_handlers.get(job.kind)
+        if on_failure is None:
+            return
+        try:
+            await on_failure(job, error)
+        except Exception as e:
+            logger.exception(f"Failure handler for job {job.job_id} ({job.kind}) failed: {e}")
+
+    async def _promote_delayed(self) -> None:
+        """Возвращает в стрим повторы, срок которых наступил. Lua атомарна, процессы не дублируют друг друга"""
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self._redis.eval(
+                    _PROMOTE_DUE, 2, self.DELAYED, self.STREAM, int(time.time() * 1000), self._maxlen
+                )
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                logger.warning(f"Failed to promote delayed jobs: {e}")
+
+    async def _dead_letter(self, stream_id: str, data: str, error: str) -> None:
+        logger.error(f"Job {stream_id} moved to dead-letter stream: {error}")
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.xadd(
+                    self.DEAD_STREAM,
+                    {"job": data, "error": error[:1000], "failed_at": int(time.time())},
+                    maxlen=10_000,
+                    approximate=True,
+                )
+                pipe.xack(self.STREAM, self.GROUP, stream_id)
+                pipe.xdel(self.STREAM, stream_id)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to dead-letter job {stream_id}: {e}")
+
+    async def _ack(self, stream_id: str) -> None:
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.xack(self.STREAM, self.GROUP, stream_id)
+                pipe.xdel(self.STREAM, stream_id)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to ack job {stream_id}, it may run again: {e}")
+
+    async def _maintain(self) -> None:
+        """Продлевает свои задачи и забирает задачи умерших процессов"""
+        interval = self._claim_idle_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self._in_flight:
+                    # XCLAIM самим себе сбрасывает idle, другие процессы задачу не заберут
+                    await self._redis.xclaim(
+                        self.STREAM, self.GROUP, self._consumer, 0, list(self._in_flight), justid=True
+                    )
+                if self._draining:
+                    continue
+
+                result = await self._redis.xautoclaim(
+                    self.STREAM, self.GROUP, self._consumer, self._claim_idle_ms, "0-0", count=10
+                )
+                claimed = result[1]
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                logger.warning(f"Job queue maintenance failed: {e}")
+                continue
+
+            for stream_id, fields in claimed:
+                # Процесс умер посреди загрузки - считаем это неудачной попыткой
+                try:
+                    job = DownloadJob.loads(fields["job"])
+                except Exception as e:
+                    await self._dead_letter(stream_id, (fields or {}).get("job", ""), f"Malformed job: {e}")
+                    continue
+                logger.warning(f"Reclaimed abandoned job {job.job_id} ({job.kind})")
+                await self._retry(stream_id, job, "Worker died while running the job")
+
+
+job_queue = JobQueue(concurrency=int(os.getenv("JOB_WORKERS", "10")))
@@ -9,8 +9,6 @@ from pathlib import Path
 from aiogram import Bot
 from sqlalchemy import delete, select, update
 
-from utils.url_cache import cleanup_expired as cleanup_expired_urls
-
 logger = logging.getLogger(__name__)
 
 
@@ -61,16 +59,6 @@ async def cleanup_old_downloads():
             logger.error(f"Failed to clean old downloads: {e}")
 
 
-async def cleanup_url_cache():
-    """Clean expired in-memory URL cache entries - runs every hour"""
-    while True:
-        await asyncio.sleep(3600)
-        try:
-            cleanup_expired_urls()
-        except Exception as e:
-            logger.error(f"Failed to clean url cache: {e}")
-
-
 # async def notify_expired_premium(bot: Bot):
 #     """Scan and notify users about expired premium - runs every 24 hours"""
 #     while True:
@@ -129,6 +117,5 @@ def start_scheduled_tasks(bot: Bot):
     """Start all scheduled background tasks"""
     asyncio.create_task(cleanup_old_statistics())
     asyncio.create_task(cleanup_old_downloads())
-    asyncio.create_task(cleanup_url_cache())
     # asyncio.create_task(notify_expired_premium(bot))
     logger.info("✅ Scheduled tasks started")
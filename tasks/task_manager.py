@@ -1,39 +1,243 @@
 import asyncio
+import contextlib
+import logging
+import time
+import uuid
 from collections import defaultdict
 
+import redis.asyncio as redis
+
+from core.config import settings
+from storage.cache import redis_client as _redis_module
+from tasks.adaptive_limiter import AIMDLimiter, BackendLimits, backend_limits
+from tasks.download_scheduler import DownloadScheduler, Lane
+
+logger = logging.getLogger(__name__)
+
+
+def _cancelled_error():
+    from models.errors import BotError, ErrorCode
+
+    return BotError(code=ErrorCode.DOWNLOAD_CANCELLED, message="Загрузка отменена пользователем.")
+
+
+async def _is_sponsor(user_id: int) -> bool:
+    from middlewares.button_owner import current_user_id
+    from storage.db import database_manager
+    from storage.db.crud import get_user
+
+    # Музыкальные хендлеры передают chat_id, спонсорство смотрим у того, кто прислал ссылку
+    user_id = current_user_id.get() or user_id
+    try:
+        async with database_manager.async_session() as session:
+            user = await get_user(session, user_id)
+        return bool(user and user.is_premium)
+    except Exception as e:
+        logger.warning(f"Failed to resolve sponsor status for {user_id}: {e}")
+        return False
+
+
+class _QueueStatus:
+    """Сообщение "ты #N в очереди", которое редактируется по мере продвижения"""
+
+    def __init__(self, scheduler: DownloadScheduler):
+        from core.loader import bot
+        from middlewares.button_owner import current_chat_id
+        from middlewares.i18n import current_i18n
+
+        self._scheduler = scheduler
+        self._bot = bot
+        self._chat_id = current_chat_id.get()
+        self._i18n = current_i18n.get()
+        self._message = None
+        self._last_text = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self._bot and self._chat_id and self._i18n)
+
+    def render(self, key: str, position: int) -> str:
+        minutes = max(1, round(self._scheduler.estimate_wait(position) / 60))
+        return self._i18n.get(key, position=position, minutes=minutes)
+
+    async def send_once(self, key: str, position: int) -> None:
+        if not self.available:
+            return
+        try:
+            await self._bot.send_message(self._chat_id, self.render(key, position))
+        except Exception as e:
+            logger.debug(f"Failed to send queue message to {self._chat_id}: {e}")
+
+    async def update(self, job) -> None:
+        if not self.available:
+            return
+        text = self.render("queue-position", self._scheduler.position(job))
+        if text == self._last_text:
+            return
+        try:
+            if self._message is None:
+                self._message = await self._bot.send_message(
+                    self._chat_id, text, disable_notification=True
+                )
+            else:
+                await self._message.edit_text(text)
+            self._last_text = text
+        except Exception as e:
+            logger.debug(f"Failed to update queue status in {self._chat_id}: {e}")
+
+    async def close(self) -> None:
+        if self._message is not None:
+            try:
+                await self._message.delete()
+            except Exception:
+                pass
+
 
 class TaskManager:
-    def __init__(self):
-        self._user_semaphores = defaultdict(lambda: asyncio.Semaphore(1))
-        self._global_semaphore = asyncio.Semaphore(10)
+    """In-memory очередь загрузок: 10 слотов на процесс, WFQ между пользователями,
+    приоритет спонсорам и оплаченным загрузкам.
+
+    Бесплатные загрузки не принимаются, если ожидание дольше ``max_wait``
+    секунд или в очереди уже ``max_queue`` задач (пользователь получает
+    "занято, перед тобой N"). Принятые задачи, которые ждут, видят
+    сообщение с местом в очереди.
+
+    Загрузка с ``backend`` (ключ эндпоинта, как в BackendLimits) сначала
+    берёт разрешение AIMD-лимитера этого эндпоинта и только потом слот:
+    медленный или перегруженный бэкенд держит не больше слотов, чем
+    его текущий лимит, а остальные сервисы не стоят за ним в очереди.
+    """
+
+    def __init__(self, global_limit: int = 10, max_wait: float = 600.0, max_queue: int = 200):
+        self._scheduler = DownloadScheduler(slots=global_limit)
+        self._max_wait = max_wait
+        self._max_queue = max_queue
 
         self._cancelled_users = set()
-        self._active_tasks = {}
+        self._active_tasks: dict[int, set[asyncio.Task]] = defaultdict(set)
 
-    async def run_download(self, user_id: int, url: str, coro):
+    @property
+    def scheduler(self) -> DownloadScheduler:
+        return self._scheduler
+
+    async def busy_slots(self) -> int:
+        """Сколько слотов загрузок занято сейчас"""
+        return self._scheduler.running
+
+    async def start(self) -> None:
+        pass
+
+    async def _classify(self, user_id: int, paid: bool, is_sponsor: bool | None) -> tuple[Lane, bool]:
+        if is_sponsor is None:
+            is_sponsor = await _is_sponsor(user_id)
+        lane = Lane.PRIORITY if paid or is_sponsor else Lane.FREE
+        return lane, is_sponsor
+
+    async def run_download(
+        self,
+        user_id: int,
+        url: str,
+        coro,
+        *,
+        paid: bool = False,
+        is_sponsor: bool | None = None,
+        backend: str | None = None,
+    ):
         self._cancelled_users.discard(user_id)
+        lane, is_sponsor = await self._classify(user_id, paid, is_sponsor)
+        limiter = await self._acquire_backend(user_id, backend, coro)
+        try:
+            await self._enter_queue(user_id, lane, is_sponsor, coro)
+            try:
+                return await self._run(user_id, coro, backend)
+            finally:
+                self._scheduler.release(user_id)
+        finally:
+            if limiter is not None:
+                await limiter.release(False)
+
+    async def _acquire_backend(self, user_id: int, backend: str | None, coro) -> AIMDLimiter | None:
+        """Ждёт разрешение эндпоинта. При отмене закрывает coro"""
+        if backend is None:
+            return None
+        limiter = backend_limits.get(backend)
+        waiter = asyncio.create_task(limiter.acquire())
+        # /cancel снимает и загрузку, которая ждёт свой бэкенд
+        self._active_tasks[user_id].add(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                await limiter.release(False)
+            waiter.cancel()
+            coro.close()
+            raise _cancelled_error()
+        finally:
+            self._forget_task(user_id, waiter)
+        return limiter
+
+    async def _enter_queue(self, user_id: int, lane: Lane, is_sponsor: bool, coro) -> None:
+        """Допуск в очередь и ожидание слота. При отказе или отмене закрывает coro"""
+        scheduler = self._scheduler
+        status = _QueueStatus(scheduler)
+
+        if lane == Lane.FREE and scheduler.running >= scheduler.slots:
+            position = scheduler.projected_position(lane)
+            if scheduler.estimate_wait(position) > self._max_wait or scheduler.waiting >= self._max_queue:
+                coro.close()
+                await status.send_once("queue-busy", position)
+                from models.errors import BotError, ErrorCode
 
-        async with self._user_semaphores[user_id]:
-            async with self._global_semaphore:
-                task = asyncio.create_task(coro)
-                self._active_tasks[user_id] = task
+                raise BotError(
+                    code=ErrorCode.BUSY,
+                    message=f"Download shed: position {position}, {scheduler.waiting} waiting",
+                    send_user_message=not status.available,
+                )
 
-                try:
-                    return await task
-                except asyncio.CancelledError:
-                    from models.errors import BotError, ErrorCode
+        job = scheduler.enqueue(user_id, lane, is_sponsor)
+        try:
+            await scheduler.wait(job, on_tick=status.update, interval=3.0)
+        except asyncio.CancelledError:
+            coro.close()
+            raise _cancelled_error()
+        finally:
+            await status.close()
 
-                    raise BotError(code=ErrorCode.DOWNLOAD_CANCELLED, message="Загрузка отменена пользователем.")
-                finally:
-                    self._active_tasks.pop(user_id, None)
+    async def _run(self, user_id: int, coro, backend: str | None = None):
+        # Запросы загрузки к её эндпоинту идут под уже взятым разрешением
+        with BackendLimits.holding(backend) if backend else contextlib.nullcontext():
+            task = asyncio.create_task(coro)
+        self._active_tasks[user_id].add(task)
+        started = time.monotonic()
 
-    def cancel_user(self, user_id: int) -> bool:
+        try:
+            result = await task
+            self._scheduler.observe_duration(time.monotonic() - started)
+            return result
+        except asyncio.CancelledError:
+            raise _cancelled_error()
+        finally:
+            self._forget_task(user_id, task)
+
+    def _forget_task(self, user_id: int, task: asyncio.Task) -> None:
+        tasks = self._active_tasks.get(user_id)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self._active_tasks[user_id]
+
+    def _cancel_local(self, user_id: int) -> bool:
         self._cancelled_users.add(user_id)
 
-        if user_id in self._active_tasks:
-            self._active_tasks[user_id].cancel()
-            return True
-        return False
+        had_queued = self._scheduler.cancel_waiting(user_id) > 0
+        tasks = self._active_tasks.get(user_id, set())
+        for task in tasks:
+            task.cancel()
+        return bool(tasks) or had_queued
+
+    async def cancel_user(self, user_id: int) -> bool:
+        return self._cancel_local(user_id)
 
     def is_cancelled(self, user_id: int) -> bool:
         if user_id in self._cancelled_users:
@@ -42,5 +246,188 @@ class TaskManager:
         return False
 
 
-task_manager = TaskManager()
+# Lua: слот в ZSET (member -> срок аренды), просроченные аренды вычищаются
+_ACQUIRE_LEASE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+
+class RedisTaskManager(TaskManager):
+    """Те же лимиты, но общие для всех процессов (supervisor/worker режим).
+
+    Слоты - аренды в Redis с TTL (ZSET токенов на пользователя и общий),
+    которые продлеваются, пока загрузка идёт. Спонсор держит до
+    ``sponsor_concurrency`` аренд одновременно. Упавший процесс не держит слоты дольше одного TTL. Отмена рассылается
+    через pub/sub, так что /cancel работает, даже если загрузка идёт в
+    другом процессе.
+    """
+
+    USER_KEY = "tasks:user:"
+    GLOBAL_KEY = "tasks:global"
+    CANCEL_CHANNEL = "tasks:cancel"
+
+    def __init__(
+        self,
+        global_limit: int = 10,
+        max_wait: float = 600.0,
+        max_queue: int = 200,
+        lease_ttl: float = 30.0,
+        poll_interval: float = 0.5,
+    ):
+        super().__init__(global_limit, max_wait, max_queue)
+        self._global_limit = global_limit
+        self._lease_ms = int(lease_ttl * 1000)
+        self._poll_interval = poll_interval
+        self._listener: asyncio.Task | None = None
+
+    @property
+    def _redis(self):
+        return _redis_module.redis_client
+
+    async def busy_slots(self) -> int:
+        """Живые аренды общего лимита: загрузки во всех процессах, а не только в этом"""
+        if self._redis is None:
+            return await super().busy_slots()
+        try:
+            return await self._redis.zcount(self.GLOBAL_KEY, int(time.time() * 1000), "+inf")
+        except redis.RedisError as e:
+            logger.debug(f"Failed to count task leases, using local slots: {e}")
+            return await super().busy_slots()
+
+    async def start(self) -> None:
+        if self._redis is None or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen_cancellations())
+
+    async def _listen_cancellations(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.CANCEL_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._cancel_local(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Task cancel listener failed, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+    async def _wait_turn(self, user_id: int) -> None:
+        # /cancel снимает и загрузку, которая ещё стоит в очереди за слотом
+        if user_id in self._cancelled_users:
+            raise asyncio.CancelledError()
+        await asyncio.sleep(self._poll_interval)
+
+    async def _acquire_lease(self, key: str, limit: int, user_id: int, token: str) -> None:
+        while True:
+            now = int(time.time() * 1000)
+            acquired = await self._redis.eval(
+                _ACQUIRE_LEASE, 1, key,
+                now, now + self._lease_ms, limit, token, self._lease_ms * 2,
+            )
+            if acquired:
+                return
+            await self._wait_turn(user_id)
+
+    async def _renew(self, user_id: int, token: str) -> None:
+        while True:
+            await asyncio.sleep(self._lease_ms / 3000)
+            expires = int(time.time() * 1000) + self._lease_ms
+            try:
+                await self._redis.zadd(f"{self.USER_KEY}{user_id}", {token: expires}, xx=True)
+                await self._redis.zadd(self.GLOBAL_KEY, {token: expires}, xx=True)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to renew task lease for {user_id}: {e}")
+
+    async def _release(self, user_id: int, token: str) -> None:
+        try:
+            await self._redis.zrem(f"{self.USER_KEY}{user_id}", token)
+            await self._redis.zrem(self.GLOBAL_KEY, token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release task lease for {user_id}, it will expire: {e}")
+
+    async def run_download(
+        self,
+        user_id: int,
+        url: str,
+        coro,
+        *,
+        paid: bool = False,
+        is_sponsor: bool | None = None,
+        backend: str | None = None,
+    ):
+        if self._redis is None:
+            return await super().run_download(
+                user_id, url, coro, paid=paid, is_sponsor=is_sponsor, backend=backend
+            )
+
+        self._cancelled_users.discard(user_id)
+        lane, is_sponsor = await self._classify(user_id, paid, is_sponsor)
+        # Лимитер эндпоинта свой в каждом процессе, аренды ниже - общие
+        limiter = await self._acquire_backend(user_id, backend, coro)
+        try:
+            return await self._run_leased(user_id, lane, is_sponsor, coro, backend)
+        finally:
+            if limiter is not None:
+                await limiter.release(False)
+
+    async def _run_leased(self, user_id: int, lane: Lane, is_sponsor: bool, coro, backend: str | None):
+        user_limit = self._scheduler.sponsor_concurrency if is_sponsor else 1
+        token = uuid.uuid4().hex
+
+        # Локальная очередь задаёт порядок, аренды в Redis - общие лимиты
+        await self._enter_queue(user_id, lane, is_sponsor, coro)
+
+        try:
+            try:
+                await self._acquire_lease(f"{self.USER_KEY}{user_id}", user_limit, user_id, token)
+                await self._acquire_lease(self.GLOBAL_KEY, self._global_limit, user_id, token)
+            except BaseException:
+                await self._release(user_id, token)
+                raise
+        except asyncio.CancelledError:
+            self._scheduler.release(user_id)
+            coro.close()
+            raise _cancelled_error()
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for task leases, using local limits: {e}")
+            try:
+                return await self._run(user_id, coro, backend)
+            finally:
+                self._scheduler.release(user_id)
+
+        renewer = asyncio.create_task(self._renew(user_id, token))
+        try:
+            return await self._run(user_id, coro, backend)
+        finally:
+            renewer.cancel()
+            await self._release(user_id, token)
+            self._scheduler.release(user_id)
+
+    async def cancel_user(self, user_id: int) -> bool:
+        had_local = self._cancel_local(user_id)
+        if self._redis is None:
+            return had_local
+
+        try:
+            had_remote = bool(
+                await self._redis.zcount(f"{self.USER_KEY}{user_id}", int(time.time() * 1000), "+inf")
+            )
+            await self._redis.publish(self.CANCEL_CHANNEL, user_id)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to broadcast cancel for {user_id}: {e}")
+            return had_local
+        return had_local or had_remote
+
 
+_task_manager_cls = RedisTaskManager if settings.BOT_ROLE != "single" else TaskManager
+task_manager: TaskManager = _task_manager_cls(
+    max_wait=settings.DOWNLOAD_QUEUE_MAX_WAIT, max_queue=settings.DOWNLOAD_QUEUE_SIZE
+)
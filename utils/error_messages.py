@@ -24,6 +24,10 @@ def get_i18n_error_message(code: ErrorCode, i18n: TranslatorRunner) -> str | Non
             return i18n.get("error-download-canceled")
         case ErrorCode.PREVIEW_ONLY:
             return i18n.get("error-preview-only")
+        case ErrorCode.BUSY:
+            return i18n.get("error-busy")
+        case ErrorCode.SERVICE_UNAVAILABLE:
+            return i18n.get("error-service-unavailable")
         case ErrorCode.SEND_ERROR:
             return None
         case _:
@@ -21,7 +21,7 @@ async def delete_files(files=None):
             if await aios.path.exists(filename):
                 await aios.remove(filename)
                 deleted_files.append(filename)
-                logger.info(f"Deleted file: {filename}")
+                logger.debug(f"Deleted file: {filename}")
             else:
                 logger.warning(f"File not found: {filename}")
         except Exception as e:
@@ -0,0 +1,45 @@
+import logging
+import time
+
+from models.errors import BotError, ErrorCode
+from storage.cache.redis_client import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "lossless:unavailable:"
+
+# Сколько помнить отказ, по причине. Lossless-источник для трека появляется
+# редко, поэтому помним только окончательные ответы core. Сбой загрузки
+# (INTERNAL_ERROR: 5xx, перегрузка, таймаут) не запоминается: иначе одна
+# перегрузка lossless-core на час лишила бы трек lossless для всех.
+REASON_TTLS = {
+    "not_found": 7 * 24 * 3600,
+    "downgraded": 7 * 24 * 3600,  # core сам отдал standard вместо lossless
+    "preview_only": 3 * 24 * 3600,
+    "region": 3 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+_REASONS = {
+    ErrorCode.NOT_FOUND: "not_found",
+    ErrorCode.PREVIEW_ONLY: "preview_only",
+    ErrorCode.REGION_RESTRICTED: "region",
+}
+
+
+async def get_lossless_unavailable(isrc: str) -> dict | None:
+    """{"reason": ..., "since": unix} если lossless для ISRC недавно не нашёлся"""
+    return await cache_get(f"{_KEY_PREFIX}{isrc}")
+
+
+async def mark_lossless_unavailable(isrc: str, reason: str) -> None:
+    ttl = REASON_TTLS.get(reason, DEFAULT_TTL)
+    await cache_set(f"{_KEY_PREFIX}{isrc}", {"reason": reason, "since": int(time.time())}, ttl=ttl)
+    logger.info(f"Lossless marked unavailable for {isrc}: {reason}")
+
+
+async def remember_lossless_failure(isrc: str, error: BotError) -> None:
+    """Запоминает окончательный отказ lossless-загрузки. Сбои, перегрузка и отмена не запоминаются"""
+    reason = _REASONS.get(error.code)
+    if reason is not None:
+        await mark_lossless_unavailable(isrc, reason)
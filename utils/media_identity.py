@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import httpx
+
+from storage.cache.redis_client import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+# Короткие ссылки, которые ведут редиректом на полную: pin.it/X, vm.tiktok.com/X,
+# tiktok.com/t/X, reddit.com/r/sub/s/X
+SHORT_LINK_HOSTS = ("pin.it", "vm.tiktok.com", "vt.tiktok.com")
+_SHORT_LINK_PATH = re.compile(r"^(?:/r/[A-Za-z0-9_]+)?/s/[A-Za-z0-9]+|^/t/[A-Za-z0-9]+")
+
+SHORT_LINK_TTL = 30 * 24 * 3600  # куда ведёт короткая ссылка, не меняется
+_SHORT_LINK_KEY = "shortlink:"
+_RESOLVE_TIMEOUT = 10.0
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+_HOST_PREFIXES = ("www.", "m.", "old.", "new.", "mobile.")
+_YOUTUBE_HOSTS = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|live|embed|v|e)/([\w-]{6,})")
+
+
+def _host(url: str) -> str:
+    host = urlsplit(url.strip()).hostname or ""
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+def canonical_url(url: str) -> str:
+    """Одна форма ссылки на один и тот же пост: https, без www/m, трекинга и якоря.
+
+    Query сохраняется только у YouTube (``v``) - у остальных сервисов
+    идентификатор в пути, а в query лишь метки шаринга (``?igsh=``, ``?s=20``).
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    host = _host(url)
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+
+    video_id = youtube_video_id(url)
+    if video_id:
+        return f"https://www.youtube.com/watch?v={video_id}"
+    return urlunsplit(("https", host, path, "", ""))
+
+
+def youtube_video_id(url: str) -> str | None:
+    """ID видео из любой формы ссылки: youtu.be/X, watch?si=..&v=X&t=.., shorts/X, live/X, embed/X"""
+    parts = urlsplit(url.strip())
+    host = _host(url)
+    if host == "music.youtube.com" or host.endswith(".youtube.com"):
+        host = "youtube.com"
+    if host not in _YOUTUBE_HOSTS:
+        return None
+
+    if host == "youtu.be":
+        video_id = parts.path.strip("/").split("/", 1)[0]
+        return video_id or None
+
+    video_ids = parse_qs(parts.query).get("v")
+    if video_ids and video_ids[0]:
+        return video_ids[0]
+    match = _YOUTUBE_PATH_ID.match(parts.path)
+    return match.group(1) if match else None
+
+
+def is_short_link(url: str) -> bool:
+    host = _host(url)
+    if host in SHORT_LINK_HOSTS:
+        return True
+    if host in ("reddit.com", "tiktok.com"):
+        return bool(_SHORT_LINK_PATH.match(urlsplit(url.strip()).path))
+    return False
+
+
+async def resolve_short_link(url: str, http_client: httpx.AsyncClient | None = None) -> str:
+    """Полная ссылка, на которую ведёт короткая. Ответ кэшируется в Redis,
+    при ошибке возвращается исходная ссылка.
+
+    Запрос идёт на сторонний хост, поэтому ``http_client`` - обычный клиент,
+    не общий клиент media-core из workflow_data (его лимитер и предохранитель
+    завели бы отдельный ключ на каждую короткую ссылку)."""
+    if not is_short_link(url):
+        return url
+
+    key = f"{_SHORT_LINK_KEY}{hashlib.md5(canonical_url(url).encode('utf-8')).hexdigest()}"
+    cached = await cache_get(key)
+    if cached:
+        return cached["url"]
+
+    try:
+        if http_client is None:
+            async with httpx.AsyncClient() as client:
+                res = await client.get(
+                    url, headers={"User-Agent": _USER_AGENT}, follow_redirects=True, timeout=_RESOLVE_TIMEOUT
+                )
+        else:
+            res = await http_client.get(
+                url, headers={"User-Agent": _USER_AGENT}, follow_redirects=True, timeout=_RESOLVE_TIMEOUT
+            )
+    except Exception as e:
+        logger.warning(f"Failed to resolve short link {url}: {e}")
+        return url
+
+    resolved = str(res.url)
+    if resolved != url and not is_short_link(resolved):
+        await cache_set(key, {"url": resolved}, SHORT_LINK_TTL)
+    return resolved
+
+
+@dataclass
+class MediaIdentity:
+    """Стабильная идентичность поста: по какой ссылке качать, под каким ключом
+    кэшировать и какие ещё ключи (alias) должны вести на тот же кэш"""
+    url: str
+    cache_key: str
+    aliases: list[str] = field(default_factory=list)
+
+
+async def identify_media(
+    url: str,
+    make_key: Callable[[str], str],
+    http_client: httpx.AsyncClient | None = None,
+) -> MediaIdentity:
+    """Раскрывает короткую ссылку и строит канонический ключ.
+
+    Ключ исходной короткой ссылки становится alias канонического: после
+    первой загрузки inline-режим и повторные запросы находят кэш по нему
+    без сетевого запроса.
+    """
+    resolved = await resolve_short_link(url, http_client)
+    cache_key = make_key(resolved)
+    original_key = make_key(url)
+    aliases = [original_key] if original_key != cache_key else []
+    return MediaIdentity(url=resolved, cache_key=cache_key, aliases=aliases)
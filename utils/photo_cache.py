@@ -0,0 +1,95 @@
+import hashlib
+import logging
+
+import httpx
+from aiogram.enums import ContentType, ParseMode
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from aiogram_dialog.api.entities import MediaId
+from aiogram_dialog.api.protocols import MediaIdStorageProtocol
+from aiogram_dialog.context.media_storage import MediaIdStorage
+
+from storage.cache.redis_client import cache_delete, cache_get, cache_set
+from utils.file_utils import delete_files
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "photo_file_id:"
+PHOTO_FILE_ID_TTL = 30 * 24 * 3600  # 30 дней, file_id в Telegram живёт дольше
+
+
+def _key(source: str) -> str:
+    return f"{_KEY_PREFIX}{hashlib.sha1(source.encode('utf-8')).hexdigest()}"
+
+
+async def get_photo_file_id(source: str) -> str | None:
+    """file_id фото, уже загруженного в Telegram из этого URL"""
+    cached = await cache_get(_key(source))
+    return cached.get("file_id") if cached else None
+
+
+async def save_photo_file_id(source: str, file_id: str) -> None:
+    await cache_set(_key(source), {"file_id": file_id}, ttl=PHOTO_FILE_ID_TTL)
+
+
+async def forget_photo_file_id(source: str) -> None:
+    await cache_delete(_key(source))
+
+
+async def send_cover_photo(
+    message: Message, http_client: httpx.AsyncClient, cover_url: str, cover_path: str, caption: str
+) -> None:
+    """Обложка альбома: из кеша по file_id, иначе через media-core с запоминанием file_id"""
+    file_id = await get_photo_file_id(cover_url)
+    if file_id:
+        try:
+            await message.answer_photo(photo=file_id, caption=caption, parse_mode=ParseMode.HTML)
+            return
+        except TelegramBadRequest as e:
+            logger.warning(f"Cached cover file_id rejected, re-uploading: {e}")
+            await forget_photo_file_id(cover_url)
+
+    try:
+        res = await http_client.post(
+            "http://media-core:9546/tools/download-image",
+            json={
+                "url": cover_url,
+                "destination": cover_path
+            },
+            timeout=30.0
+        )
+        if res.status_code != 200:
+            logger.error(f"Failed to download cover via media-core: status={res.status_code}")
+            return
+
+        try:
+            sent = await message.answer_photo(
+                photo=FSInputFile(cover_path), caption=caption, parse_mode=ParseMode.HTML
+            )
+        finally:
+            await delete_files([cover_path])
+        if sent.photo:
+            await save_photo_file_id(cover_url, sent.photo[-1].file_id)
+    except Exception as e:
+        logger.error(f"Failed to download cover via media-core: {e}")
+
+
+class RedisMediaIdStorage(MediaIdStorageProtocol):
+    """file_id фото из диалогов по URL в Redis (общий для процессов и переживает рестарт).
+    Без него Telegram заново скачивает превью YouTube при каждом показе диалога.
+    Локальные файлы и прочие типы - как в aiogram-dialog по умолчанию."""
+
+    def __init__(self):
+        self._local = MediaIdStorage()
+
+    async def get_media_id(self, path: str | None, url: str | None, type: ContentType) -> MediaId | None:
+        if url and not path and type == ContentType.PHOTO:
+            file_id = await get_photo_file_id(url)
+            return MediaId(file_id=file_id) if file_id else None
+        return await self._local.get_media_id(path, url, type)
+
+    async def save_media_id(self, path: str | None, url: str | None, type: ContentType, media_id: MediaId) -> None:
+        if url and not path and type == ContentType.PHOTO:
+            await save_photo_file_id(url, media_id.file_id)
+            return
+        await self._local.save_media_id(path, url, type, media_id)
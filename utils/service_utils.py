@@ -1,4 +1,6 @@
 import httpx
+
+from core.json_codec import response_json
 from models.errors import BotError, ErrorCode
 from models.service_list import Services
 
@@ -10,7 +12,7 @@ def handle_lossless_response(response: httpx.Response, url: str, service: Servic
     """
     data = None
     try:
-        data = response.json()
+        data = response_json(response)
     except Exception:
         pass
 
@@ -1,9 +1,7 @@
-import asyncio
 import html
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
-import translators as ts
+from .translation import caption_translator, translate_blocking
 
 
 def truncate_string(text: str, max_length: int = 1024) -> str:
@@ -43,7 +41,6 @@ def escape_markdown(text: str) -> str:
 
 logger = logging.getLogger(__name__)
 
-executor = ThreadPoolExecutor()
 
 def translate_sync(text: str, target_language: str) -> str:
     """
@@ -53,27 +50,20 @@ def translate_sync(text: str, target_language: str) -> str:
     :param target_language: Target language for translation.
     :return: Translated text.
     """
-    translated = ts.translate_text(text, translator="google", from_language="auto", to_language=target_language)
-    if translated is None:
-        logger.error(f"Translation failed for text: {text}")
+    try:
+        return translate_blocking(text, target_language)
+    except Exception as e:
+        logger.error(f"Translation failed for text: {text}: {e}")
         return "Translation Error"
-    return translated
 
 
 async def translate_text(text: str, target_language: str = "en") -> str:
     """
-    Asynchronously translates text using GoogleTranslator.
+    Asynchronously translates text using the shared caption translator
+    (cached, coalesced, bounded thread pool with timeout).
 
     :param text: Text to be translated.
     :param target_language: Target language for translation.
-    :return: Translated text.
+    :return: Translated text, or the original text if translation failed.
     """
-    loop = asyncio.get_running_loop()
-    try:
-        translated = await loop.run_in_executor(
-            executor, translate_sync, text, target_language
-        )
-        return translated
-    except Exception as e:
-        logger.error(f"Error during translation: {str(e)}")
-        return "Translation Error"
+    return await caption_translator.translate(text, target_language)
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import re
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.service_list import Services
+from utils.service_utils import handle_lossless_response
+
+logger = logging.getLogger(__name__)
+
+
+def spotify_track_key(url: str) -> str | None:
+    match = re.search(r"/track/([\w-]+)", url)
+    if match:
+        return f"spotify:{match.group(1)}"
+    return None
+
+
+def deezer_track_key(url: str) -> str | None:
+    match = re.search(r"/track/(\d+)", url)
+    if match:
+        return f"deezer:{match.group(1)}"
+    return None
+
+
+def apple_music_track_key(url: str) -> str | None:
+    patterns = [
+        r"music\.apple\.com/[a-z]{2}/song/(?:[^/]+/)?(?P<id>\d+)",
+        r"music\.apple\.com/[a-z]{2}/album/(?:[^/]+/)?\d+.*?[?&]i=(?P<id>\d+)",
+    ]
+    for pattern in patterns:
+        if m := re.search(pattern, url):
+            return f"apple:{int(m.group('id'))}"
+    return None
+
+
+def ytmusic_track_key(url: str) -> str | None:
+    match = re.search(r"v=([\w-]+)", url)
+    if match:
+        return f"ytmusic:{match.group(1)}"
+    return None
+
+
+def soundcloud_track_key(url: str) -> str | None:
+    match = re.search(r"soundcloud\.com/([^/?#]+/[^/?#]+)", url)
+    if match:
+        return f"sc:{match.group(1)}"
+    if "on.soundcloud.com" in url:
+        clean_url = url.split('?')[0].rstrip('/')
+        hashed = hashlib.md5(clean_url.encode('utf-8')).hexdigest()
+        return f"sc:{hashed}"
+    return None
+
+
+_TRACK_KEYS = {
+    Services.SPOTIFY: spotify_track_key,
+    Services.DEEZER: deezer_track_key,
+    Services.APPLE_MUSIC: apple_music_track_key,
+    Services.YTMUSIC: ytmusic_track_key,
+    Services.SOUNDCLOUD: soundcloud_track_key,
+}
+
+
+def track_key_for(service: Services, url: str) -> str | None:
+    """Канонический ключ трека или None (альбом, плейлист, короткая ссылка)"""
+    if service == Services.SOUNDCLOUD and "/sets/" in url:
+        return None
+    key_func = _TRACK_KEYS.get(service)
+    return key_func(url) if key_func else None
+
+
+async def _remember(service: Services, url: str, metadata: dict) -> None:
+    from storage.db import database_manager
+    from storage.db.crud import upsert_track_index
+
+    if metadata.get("type") == "song":
+        tracks = [(url, metadata)]
+    else:
+        # Треки альбома тоже запоминаем: потом их часто присылают по одному
+        tracks = [(track.get("url"), {"type": "song", **track}) for track in metadata.get("tracks") or []]
+
+    entries = {}
+    for track_url, data in tracks:
+        key = track_key_for(service, track_url) if track_url else None
+        if key and data.get("isrc"):
+            entries[key] = (service.value, data)
+    if not entries:
+        return
+
+    # Отдельная сессия: запись не должна откатиться, если сама загрузка упадёт
+    try:
+        async with database_manager.async_session() as session:
+            await upsert_track_index(session, entries)
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to store track index for {url}: {e}")
+
+
+async def resolve_track_metadata(
+    session: AsyncSession, http_client: httpx.AsyncClient, url: str, service: Services
+) -> dict:
+    """lossless-core /metadata, но для уже известного трека - без обращения к бэкенду"""
+    from storage.db.crud import get_track_index
+
+    track_key = track_key_for(service, url)
+    if track_key:
+        cached = await get_track_index(session, track_key)
+        if cached:
+            logger.info(f"Track index hit for {track_key}")
+            return cached
+
+    response = await http_client.post(
+        "http://lossless-core:7856/metadata", json={"url": url}
+    )
+    metadata = handle_lossless_response(response, url, service)
+    await _remember(service, url, metadata)
+    return metadata
+
+
+async def lookup_track(session: AsyncSession, url: str, service: Services) -> dict | None:
+    """Только индекс, без бэкенда (для inline режима)"""
+    from storage.db.crud import get_track_index
+
+    track_key = track_key_for(service, url)
+    if track_key is None:
+        return None
+    return await get_track_index(session, track_key)
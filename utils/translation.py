@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import redis.asyncio as redis
+
+from storage.cache import redis_client as _redis_module
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "translation:"
+
+
+class TranslationError(Exception):
+    pass
+
+
+def translate_blocking(text: str, target_language: str) -> str:
+    """Синхронный перевод через Google. Бросает TranslationError при неудаче"""
+    # translators тяжёлый при импорте, грузим его при первом переводе
+    import translators as ts
+
+    translated = ts.translate_text(
+        text, translator="google", from_language="auto", to_language=target_language
+    )
+    if translated is None:
+        raise TranslationError(f"Translator returned nothing for text: {text[:50]}")
+    return translated
+
+
+class CaptionTranslator:
+    """Перевод подписей: локальный LRU -> Redis -> пул потоков.
+
+    Одинаковые запросы, пришедшие одновременно, склеиваются в один вызов
+    переводчика. Ошибки не кэшируются, вызывающий получает исходный текст.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        timeout: float = 15.0,
+        local_size: int = 2048,
+        ttl: int = 30 * 24 * 3600,  # 30 дней
+    ):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="translate"
+        )
+        self._timeout = timeout
+        self._local_size = local_size
+        self._ttl = ttl
+
+        self._local: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+    @staticmethod
+    def _key(text: str, target_language: str) -> tuple[str, str]:
+        return hashlib.sha1(text.encode()).hexdigest(), target_language
+
+    def _local_get(self, key: tuple[str, str]) -> Optional[str]:
+        value = self._local.get(key)
+        if value is not None:
+            self._local.move_to_end(key)
+        return value
+
+    def _local_put(self, key: tuple[str, str], value: str) -> None:
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self._local_size:
+            self._local.popitem(last=False)
+
+    async def translate(self, text: str, target_language: str = "en") -> str:
+        if not text or not text.strip():
+            return text
+
+        key = self._key(text, target_language)
+
+        cached = self._local_get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._resolve(key, text, target_language)
+        except BaseException:
+            # Ждущие получают исходный текст, а не зависают
+            future.set_result(text)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(result)
+        return result
+
+    async def _resolve(self, key: tuple[str, str], text: str, target_language: str) -> str:
+        redis_key = f"{_KEY_PREFIX}{target_language}:{key[0]}"
+        client = _redis_module.redis_client
+
+        if client is not None:
+            try:
+                cached = await client.get(redis_key)
+                if cached is not None:
+                    self._local_put(key, cached)
+                    return cached
+            except redis.RedisError as e:
+                logger.warning(f"translate: Redis error for key '{redis_key}': {e}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            translated = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, translate_blocking, text, target_language),
+                timeout=self._timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Translation to '{target_language}' timed out after {self._timeout}s")
+            return text
+        except Exception as e:
+            logger.error(f"Error during translation: {str(e)}")
+            return text
+
+        self._local_put(key, translated)
+        if client is not None:
+            try:
+                await client.setex(redis_key, self._ttl, translated)
+            except redis.RedisError as e:
+                logger.warning(f"translate: Redis error for key '{redis_key}': {e}")
+        return translated
+
+
+caption_translator = CaptionTranslator()
@@ -1,37 +1,134 @@
+import hashlib
+import logging
 import time
-from typing import Optional, Dict
-from .hash_utils import url_hash
-
-# Простой кеш в памяти: {hash: (url, timestamp)}
-_url_cache: Dict[str, tuple[str, float]] = {}
-CACHE_TTL = 3600  # 1 час
-
-def store_url(url: str) -> str:
-    """Сохраняет URL в кеше и возвращает его хеш"""
-    hash_key = url_hash(url)
-    _url_cache[hash_key] = (url, time.time())
-    return hash_key
-
-def get_url(hash_key: str) -> Optional[str]:
-    """Получает URL по хешу, если он не истек"""
-    if hash_key not in _url_cache:
+from collections import OrderedDict
+from typing import Optional
+
+import redis.asyncio as redis
+
+from storage.cache import redis_client as _redis_module
+
+logger = logging.getLogger(__name__)
+
+# Token lifetimes. A dialog token only has to outlive the format dialog,
+# a payment token has to survive until Telegram delivers successful_payment.
+DIALOG_TTL = 6 * 3600  # 6 часов
+PAYMENT_TTL = 48 * 3600  # 48 часов
+
+TOKEN_LENGTH = 16  # 64 бита, hex (без "_", payload инвойса режется по нему)
+_KEY_PREFIX = "url_token:"
+_MAX_PROBES = 4
+
+# Локальный LRU перед Redis: {token: (url, expires_at)}
+_LOCAL_MAX_SIZE = 4096
+_local: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+
+
+def _make_token(url: str, attempt: int = 0) -> str:
+    """Детерминированный токен: один и тот же URL получает один и тот же токен"""
+    salt = f"#{attempt}" if attempt else ""
+    return hashlib.sha256(f"{url}{salt}".encode()).hexdigest()[:TOKEN_LENGTH]
+
+
+def _local_put(token: str, url: str, ttl: int) -> None:
+    _local[token] = (url, time.monotonic() + ttl)
+    _local.move_to_end(token)
+    while len(_local) > _LOCAL_MAX_SIZE:
+        _local.popitem(last=False)
+
+
+def _local_get(token: str) -> Optional[str]:
+    entry = _local.get(token)
+    if entry is None:
         return None
-    
-    url, timestamp = _url_cache[hash_key]
-    
-    # Проверяем, не истек ли кеш
-    if time.time() - timestamp > CACHE_TTL:
-        del _url_cache[hash_key]
+    url, expires_at = entry
+    if time.monotonic() > expires_at:
+        _local.pop(token, None)
         return None
-    
+    _local.move_to_end(token)
     return url
 
-def cleanup_expired():
-    """Очищает истекшие записи из кеша"""
-    current_time = time.time()
-    expired_keys = [
-        key for key, (_, timestamp) in _url_cache.items()
-        if current_time - timestamp > CACHE_TTL
-    ]
-    for key in expired_keys:
-        del _url_cache[key]
\ No newline at end of file
+
+async def store_url(url: str, ttl: int = DIALOG_TTL) -> str:
+    """Сохраняет URL и возвращает токен для него.
+
+    Токен стабилен для одного URL. При коллизии (токен уже занят другим URL)
+    берётся следующий вариант с солью, так что чужой URL никогда не вернётся.
+    """
+    client = _redis_module.redis_client
+
+    for attempt in range(_MAX_PROBES):
+        token = _make_token(url, attempt)
+
+        local_url = _local_get(token)
+        if local_url is not None and local_url != url:
+            continue
+
+        if client is None:
+            _local_put(token, url, ttl)
+            return token
+
+        key = f"{_KEY_PREFIX}{token}"
+        try:
+            if await client.set(key, url, ex=ttl, nx=True):
+                _local_put(token, url, ttl)
+                return token
+
+            existing = await client.get(key)
+            if existing == url:
+                # Тот же URL: продлеваем, но не укорачиваем платёжный TTL
+                current_ttl = await client.ttl(key)
+                if current_ttl < ttl:
+                    await client.expire(key, ttl)
+                _local_put(token, url, max(ttl, current_ttl))
+                return token
+        except redis.RedisError as e:
+            logger.warning(f"store_url: Redis error for token '{token}': {e}")
+            _local_put(token, url, ttl)
+            return token
+
+    raise RuntimeError(f"Could not allocate URL token after {_MAX_PROBES} attempts")
+
+
+async def get_url(token: str) -> Optional[str]:
+    """Получает URL по токену, если он не истёк"""
+    url = _local_get(token)
+    if url is not None:
+        return url
+
+    client = _redis_module.redis_client
+    if client is None:
+        return None
+
+    key = f"{_KEY_PREFIX}{token}"
+    try:
+        url = await client.get(key)
+        if url is None:
+            return None
+        ttl = await client.ttl(key)
+    except redis.RedisError as e:
+        logger.warning(f"get_url: Redis error for token '{token}': {e}")
+        return None
+
+    if ttl > 0:
+        _local_put(token, url, ttl)
+    return url
+
+
+async def extend_url(token: str, ttl: int = PAYMENT_TTL) -> bool:
+    """Продлевает жизнь токена (например, когда по нему выставлен инвойс)"""
+    url = await get_url(token)
+    if url is None:
+        return False
+
+    _local_put(token, url, ttl)
+
+    client = _redis_module.redis_client
+    if client is None:
+        return True
+
+    try:
+        await client.expire(f"{_KEY_PREFIX}{token}", ttl, gt=True)
+    except redis.RedisError as e:
+        logger.warning(f"extend_url: Redis error for token '{token}': {e}")
+    return True